@@ -12,6 +12,15 @@ from pathlib import Path
 import re
 from datetime import datetime
 
+# 图片目录和GIF转换工具位于仓库根目录的 tools 中，单独拷贝本项目时退回到遍历images目录
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "tools"))
+try:
+    from gif_convert import CONVERTED_SUFFIXES
+    from image_catalog import ImageCatalog
+except ImportError:
+    CONVERTED_SUFFIXES = ('.webp', '.mp4', '.webm')
+    ImageCatalog = None
+
 class ImageCleaner:
     def __init__(self):
         self.base_dir = Path(__file__).parent.parent
@@ -19,6 +28,10 @@ class ImageCleaner:
         self.chapters_dir = self.base_dir / "chapters"
         self.cache_dir = self.base_dir / "cache" / "unused_images_backup"
         
+        # 图片目录（由 tools/image_catalog.py 生成），存在时先与images目录对齐，删除图片后同步删除记录
+        self.catalog_path = self.images_dir / "image_catalog.db"
+        self.catalog = None
+        
         # 创建备份目录
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
@@ -50,16 +63,19 @@ class ImageCleaner:
                     content = f.read()
                     
                 # 查找图片引用
-                # 匹配 src="..." 和 src='...' 格式
-                img_pattern = r'src=["\'](.*?)["\']'
+                # 匹配 src="..." 和 srcset="..." 格式（<picture><source srcset> 中的 .gif.webp）
+                img_pattern = r'\b(?:src|srcset)=["\'](.*?)["\']'
                 matches = re.findall(img_pattern, content, re.IGNORECASE)
                 
                 for match in matches:
-                    # 只处理指向images目录的引用
-                    if 'images/' in match:
-                        # 提取相对于images目录的路径
-                        img_path = match.split('images/')[-1]
-                        found_images.add(img_path)
+                    # srcset 可以列出多个 "地址 尺寸描述"，逗号分隔
+                    for candidate in match.split(','):
+                        url = candidate.strip().split(' ')[0]
+                        # 只处理指向images目录的引用
+                        if 'images/' in url:
+                            # 提取相对于images目录的路径
+                            img_path = url.split('images/')[-1]
+                            found_images.add(img_path)
                         
             except Exception as e:
                 print(f"   ⚠️ 读取文件失败 {html_file}: {e}")
@@ -75,17 +91,57 @@ class ImageCleaner:
         
         for root, dirs, files in os.walk(self.images_dir):
             for file in files:
+                # 跳过隐藏文件（下载中的 .xxx.part 临时文件）
+                if file.startswith('.'):
+                    continue
                 if Path(file).suffix.lower() in self.image_extensions:
                     # 计算相对于images目录的路径
-                    rel_path = os.path.relpath(
-                        os.path.join(root, file), 
-                        self.images_dir
-                    )
+                    rel_path = (Path(root) / file).relative_to(self.images_dir).as_posix()
                     all_images.append(rel_path)
         
         print(f"   ✅ 发现 {len(all_images)} 个图片文件")
+        
+        if self.catalog_path.exists():
+            self.sync_catalog(all_images)
+        
         return all_images
     
+    def sync_catalog(self, all_images):
+        """
+        把图片目录与images目录对齐（收录目录建立前或手动加入的图片，删除失效记录）
+        
+        目录不收录 .svg 和 gif_convert 生成的 .gif.webp 等文件，所以未使用图片仍以扫描结果为准
+        """
+        if ImageCatalog is None:
+            print("   ⚠️ 找不到 tools/image_catalog.py，不更新图片目录")
+            return
+        
+        # 与爬虫共用同一个数据库，连接和加锁方式见 tools/shared_db.py
+        self.catalog = ImageCatalog(self.catalog_path)
+        added, removed = self.catalog.sync(self.images_dir)
+        uncatalogued = len(set(all_images) - set(self.catalog.paths()))
+        print(f"   📇 图片目录：新收录 {added} 张，删除失效记录 {removed} 条，未收录的文件 {uncatalogued} 个")
+    
+    def remove_from_catalog(self, images):
+        """从图片目录中删除已清理图片的记录"""
+        if not images or self.catalog is None:
+            return
+        
+        for img in images:
+            self.catalog.remove(self.images_dir / img)
+    
+    def expand_used(self, used):
+        """GIF和转换生成的 .gif.webp 等文件是同一张动图，引用其中一个时都算正在使用"""
+        expanded = set(used)
+        for img in used:
+            lower = img.lower()
+            if lower.endswith('.gif'):
+                expanded.update(img + suffix for suffix in CONVERTED_SUFFIXES)
+            for suffix in CONVERTED_SUFFIXES:
+                if lower.endswith('.gif' + suffix):
+                    expanded.add(img[:-len(suffix)])
+        return expanded
+    
     def get_file_size(self, file_path):
         """获取文件大小（人类可读格式）"""
         try:
@@ -107,7 +163,7 @@ class ImageCleaner:
         used_in_html = self.scan_html_files()
         
         # 合并已知使用的图片
-        all_used = self.used_images.union(used_in_html)
+        all_used = self.expand_used(self.used_images.union(used_in_html))
         
         # 获取所有图片文件
         all_images = self.find_all_images()
@@ -121,7 +177,7 @@ class ImageCleaner:
         print("=" * 60)
         print("📊 分析结果:")
         print(f"   总图片数量: {len(all_images)}")
-        print(f"   正在使用: {len(all_used)}")
+        print(f"   正在使用: {len(all_images) - len(unused_images)}")
         print(f"   未使用: {len(unused_images)}")
         
         if unused_images:
@@ -164,6 +220,7 @@ class ImageCleaner:
         
         success_count = 0
         error_count = 0
+        removed_images = []
         
         for img in unused_images:
             try:
@@ -183,6 +240,7 @@ class ImageCleaner:
                     elif src_path.is_dir() and not any(src_path.iterdir()):
                         # 删除空目录
                         src_path.rmdir()
+                    removed_images.append(img)
                 
                 success_count += 1
                 
@@ -196,6 +254,7 @@ class ImageCleaner:
             print(f"   失败: {error_count} 个文件")
         
         if not backup_only:
+            self.remove_from_catalog(removed_images)
             print(f"   🗑️ 原文件已删除")
         print(f"   📦 备份保存在: {backup_dir}")
         
@@ -223,7 +282,14 @@ def main():
     print("=" * 60)
     
     cleaner = ImageCleaner()
-    
+    try:
+        run(cleaner)
+    finally:
+        if cleaner.catalog is not None:
+            cleaner.catalog.close()
+
+def run(cleaner):
+    """分析并按所选方式清理未使用的图片"""
     # 分析未使用的图片
     unused_images = cleaner.analyze_unused_images()
     
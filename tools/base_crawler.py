@@ -0,0 +1,580 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片爬虫基类
+各爬虫共用的组件（限速、下载、入库、去重、缓存、检查点、协调队列等）、下载入库流程、
+百度图片搜索、流水线运行和下载报告统计都在这里；具体的爬虫只提供关键词、搜索引擎、分类和任务规划
+"""
+
+import json
+import logging
+import os
+import random
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+
+from content_store import ContentStore
+from crawl_budget import CrawlBudget
+from crawl_checkpoint import CrawlCheckpoint
+from crawl_metrics import CrawlMetrics
+from crawl_pipeline import CrawlPipeline
+from download_engine import DownloadEngine
+from download_ledger import DownloadLedger
+from image_catalog import ImageCatalog
+from image_ingest import ImageIngest
+from job_queue import JobQueue
+from keyword_history import KeywordHistory
+from keyword_scheduler import KeywordScheduler
+from page_yield import PageYieldTracker
+from perceptual_index import PerceptualIndex
+from rate_limiter import HostRateLimiter
+from search_cache import SearchCache
+from search_guard import SearchGuard
+from taxonomy import Taxonomy
+from thumbnail_screen import ThumbnailScreener
+
+# 默认请求头，模拟浏览器
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.8,en-US;q=0.5,en;q=0.3',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# 文件名中保留的图片扩展名
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+
+class BaseImageCrawler:
+    """
+    图片爬虫基类
+
+    子类需设置 name（指标文件名）和 dir_name（图片目录名），在 __init__ 中设置 self.classifier
+    后调用 create_directories()
+    """
+
+    name = None
+    dir_name = None
+    headers = DEFAULT_HEADERS
+
+    def __init__(self, base_dir="images", max_image_mb=20, search_cache_days=7, min_page_yield=0.2,
+                 max_edge=800, webp_quality=80, keep_originals=False, live_progress=False, budget=None):
+        self.base_dir = Path(base_dir)
+        self.crawl_dir = self.base_dir / self.dir_name
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+
+        # 性能指标：按引擎和主机统计请求延迟、流量和状态码，写成Prometheus文本文件；
+        # live_progress 为 True 时在终端实时显示进度视图
+        self.metrics = CrawlMetrics(self.base_dir / "metrics" / f"{self.name}.prom", self.name)
+        self.live_progress = live_progress
+
+        # 爬取预算：下载流量、每个引擎的请求数、磁盘增长和运行时间，所有线程共用，用尽时停止
+        self.budget = budget or CrawlBudget()
+
+        # 并发下载引擎（按主机限制并发）
+        self.engine = DownloadEngine(max_bytes=int(max_image_mb * 1024 * 1024), metrics=self.metrics,
+                                     budget=self.budget)
+        self.engine.configure_session(self.session)
+
+        # 搜索→下载流水线，两个阶段并行
+        self.pipeline = CrawlPipeline(self.engine, metrics=self.metrics)
+
+        # 按主机自适应限速，取代固定的随机延迟
+        self.limiter = HostRateLimiter(metrics=self.metrics, budget=self.budget)
+
+        # 搜索请求保护：可重试的错误按指数退避重试，连续失败的搜索引擎在冷却期内不再请求
+        self.guard = SearchGuard(self.session, self.limiter, metrics=self.metrics)
+
+        # 下载记录（多个爬虫共用），请求前先查询，避免重复下载
+        self.ledger = DownloadLedger(self.base_dir / "download_ledger.db")
+
+        # 图片内容库，同一张图片出现在多个分类时只保存一份
+        self.store = ContentStore(self.base_dir / "content_store")
+
+        # 图片目录，记录每张入库图片的尺寸、格式、来源和分类，下载报告直接查询
+        self.catalog = ImageCatalog(self.base_dir / "image_catalog.db")
+
+        # 入库处理：缩小尺寸、转为WebP、去掉EXIF，在进程池中执行
+        self.ingest = ImageIngest(self.base_dir, max_edge=max_edge, quality=webp_quality,
+                                  keep_originals=keep_originals)
+
+        # 感知哈希索引，识别缩放、重新压缩或加水印后的同一张图片
+        self.phash_index = PerceptualIndex(self.base_dir / "perceptual_index.db")
+
+        # 缩略图筛选，重复或不合格的候选不再下载原图（只对带缩略图地址的任务生效）
+        self.screener = ThumbnailScreener(self.session, self.limiter, self.ledger, self.phash_index)
+
+        # 搜索结果缓存，有效期内重复运行不再请求搜索引擎
+        self.search_cache = SearchCache(self.base_dir / "search_cache.db", ttl=search_cache_days * 24 * 3600)
+
+        # 翻页收益统计，某页新图片比例低于 min_page_yield 时停止翻页
+        self.page_yield = PageYieldTracker(self.base_dir / "page_yield.db", self.ledger.is_known,
+                                           min_yield=min_page_yield)
+
+        # 爬取进度检查点，中断后可继续
+        self.checkpoint = CrawlCheckpoint(self.crawl_dir / "爬取进度.json")
+
+        # 多进程协调队列：同时运行多个爬虫进程时，每页搜索只由一个进程请求，分类名额和文件编号统一分配
+        self.jobs = JobQueue(self.crawl_dir / "job_queue.db")
+
+    def category_names(self):
+        """所有分类（含默认分类）的名称"""
+        return list(dict.fromkeys(self.classifier.categories + [self.classifier.default]))
+
+    def categorize(self, title, keyword):
+        """根据标题和关键词分类，都没有命中时归为默认分类"""
+        return self.classifier.classify(title, keyword)
+
+    def create_directories(self):
+        """创建图片存储目录"""
+        for category in self.category_names():
+            directory = self.crawl_dir / category
+            directory.mkdir(parents=True, exist_ok=True)
+            logging.info(f"创建目录: {directory}")
+
+    def download_image(self, url, filename, save_dir, thumb_url=None, keyword=None):
+        """下载单张图片或动图，有缩略图时先用缩略图筛选"""
+        # 先查下载记录，已下载过或已判定无效的URL不再请求
+        if self.ledger.is_known(url):
+            logging.info(f"下载记录中已存在，跳过: {url}")
+            return False
+
+        # 先取缩略图检查重复和尺寸比例，不合格的候选不再下载原图
+        if thumb_url and not self.screener.screen(thumb_url, url, save_dir):
+            return False
+
+        try:
+            # 流式请求，避免把整张图片读入内存
+            response = self.limiter.get(self.session, url, timeout=30, stream=True)
+            with response:
+                response.raise_for_status()
+
+                # 读取正文前先检查响应头，不是图片或超过大小上限时立即断开
+                content_type = response.headers.get('content-type', '')
+                reason = self.engine.preflight(response)
+                if reason:
+                    logging.warning(f"{reason}，跳过: {url}")
+                    self.ledger.mark_rejected(url)
+                    return False
+
+                # 确定文件扩展名
+                if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                    ext = self.get_image_extension(url, content_type)
+                    filename = f"{filename}{ext}"
+
+                # 文件名已被其他图片占用时追加序号
+                filepath = self.engine.unique_path(save_dir / filename)
+
+                # 分块写入临时文件，文件头不是图片或超过大小上限时中止
+                spool_path = self.engine.spool_stream(response, filepath.parent)
+                if spool_path is None:
+                    self.ledger.mark_rejected(url)
+                    return False
+
+            # 在进程池中校验解码、尺寸和长宽比，通过后缩小并转为WebP保存，不合格的图片只删除临时文件
+            result = self.ingest.process(spool_path, filepath)
+            if result is None:
+                self.ledger.mark_rejected(url)
+                return False
+            filepath, file_size, sha256 = result
+            filename = filepath.name
+
+            # 同一目录中已有相同内容时，删除刚写入的副本
+            existing = self.ledger.record(url, filepath, sha256, file_size)
+            if existing:
+                filepath.unlink()
+                logging.info(f"内容重复，跳过: {filename} (已有 {existing})")
+                return False
+
+            # 同一目录中已有近似重复的图片时，同样删除刚写入的副本
+            similar = self.phash_index.check_and_add(filepath)
+            if similar:
+                filepath.unlink()
+                self.ledger.mark_duplicate(url, similar)
+                logging.info(f"近似重复，跳过: {filename} (相似 {similar})")
+                return False
+
+            # 其他分类中已有相同内容时，改为指向内容库的硬链接
+            if self.store.adopt(filepath, sha256):
+                logging.info(f"内容与其他分类中的图片相同，共用同一份数据: {filename}")
+
+            # 收录到图片目录，下载报告和清理工具直接查询
+            self.catalog.add(filepath, sha256, url=url, keyword=keyword, category=save_dir.name)
+
+            # 记录文件大小信息
+            file_size_mb = file_size / (1024 * 1024)
+            logging.info(f"下载成功: {filename} ({file_size_mb:.2f}MB) -> {save_dir}")
+            return True
+
+        except Exception as e:
+            logging.error(f"下载失败 {url}: {e}")
+            return False
+
+    def get_image_extension(self, url, content_type):
+        """根据URL和content-type确定图片扩展名"""
+        # 先尝试从URL获取扩展名
+        path = urlparse(url).path.lower()
+        if path.endswith(IMAGE_EXTENSIONS):
+            return os.path.splitext(path)[1]
+
+        # 根据content-type确定扩展名
+        if 'jpeg' in content_type:
+            return '.jpg'
+        elif 'png' in content_type:
+            return '.png'
+        elif 'gif' in content_type:
+            return '.gif'
+        elif 'webp' in content_type:
+            return '.webp'
+        else:
+            return '.jpg'  # 默认使用jpg
+
+    def search_baidu_images(self, keyword, max_pages=3, include_gif=False):
+        """百度图片搜索，某页新图片比例低于阈值时停止翻页；include_gif 为 True 时只搜索动图"""
+        images = []
+        paging = self.page_yield.start('baidu', keyword, max_pages)
+
+        for page in range(max_pages):
+            params = {
+                'tn': 'resultjson_com',
+                'word': keyword,
+                'pn': page * 30,
+                'rn': 30,
+                'ct': 1,
+                'ic': 0,
+                'lm': -1,
+                'nc': 1,
+                'ie': 'utf-8',
+                'oe': 'utf-8',
+                'face': 0,
+            }
+
+            # 如果搜索动图，添加gif参数
+            if include_gif:
+                params['f'] = 'gif'
+
+            # 百度处于熔断冷却期时不再翻页
+            if not self.guard.available('baidu'):
+                break
+
+            # 多个进程同时爬取时，每页只由租到它的进程请求
+            if not self.jobs.claim('baidu', keyword, page):
+                continue
+
+            page_images = self.fetch_baidu_page(keyword, page, params, include_gif)
+            if page_images is None:
+                self.jobs.release('baidu', keyword, page)
+                continue
+            self.jobs.complete('baidu', keyword, page)
+            images.extend(page_images)
+
+            # 按收益翻页：本页大多是已下载过或重复的图片时，不再请求后续页
+            if not paging.add_page(page, [img_info['middle_url'] for img_info in page_images]):
+                self.jobs.skip('baidu', keyword, range(page + 1, max_pages))
+                break
+
+        return images
+
+    def fetch_baidu_page(self, keyword, page, params, include_gif=False):
+        """请求百度图片搜索的一页结果，优先使用缓存；请求失败时返回 None"""
+        base_url = "https://image.baidu.com/search/acjson"
+
+        # 优先使用未过期的缓存结果
+        engine = 'baidu-gif' if 'f' in params else 'baidu'
+        cached = self.search_cache.get(engine, keyword, page)
+        if cached is not None and cached.fresh:
+            logging.info(f"百度搜索 '{keyword}' 第{page+1}页，使用缓存{len(cached.results)}张图片")
+            return cached.results
+
+        try:
+            response = self.guard.get(
+                'baidu', base_url, params=params,
+                headers=self.search_cache.conditional_headers(cached)
+            )
+
+            # 缓存过期但服务器确认内容未变化
+            if self.search_cache.revalidate(engine, keyword, page, cached, response):
+                logging.info(f"百度搜索 '{keyword}' 第{page+1}页，缓存仍有效{len(cached.results)}张图片")
+                return cached.results
+
+            data = response.json()
+
+            page_images = []
+            if 'data' in data:
+                for item in data['data']:
+                    if 'thumbURL' in item and 'middleURL' in item:
+                        page_images.append({
+                            'thumb_url': item['thumbURL'],
+                            'middle_url': item['middleURL'],
+                            'title': item.get('fromPageTitle', ''),
+                            'keyword': keyword,
+                            'is_gif': include_gif
+                        })
+
+            self.guard.record_result('baidu', page_images, first_page=page == 0)
+            self.search_cache.put(engine, keyword, page, page_images, response)
+            logging.info(f"百度搜索 '{keyword}' 第{page+1}页，获取{len(data.get('data', []))}张图片")
+            return page_images
+
+        except Exception as e:
+            self.guard.record_failure('baidu', e)
+            logging.error(f"百度搜索失败 {keyword} 第{page+1}页: {e}")
+            return None
+
+    def crawl(self, keywords, completed, search, plan, on_result, should_stop, on_progress,
+              resume=False, pick=None):
+        """
+        加入协调队列，在搜索→下载流水线中运行，结束后退出协调队列；
+        completed 为已完成的关键词序号，其他参数见 CrawlPipeline.run
+        """
+        # 上次运行被终止时留在分类目录中的下载临时文件
+        self.engine.sweep_spool_files(self.crawl_dir)
+
+        # 加入协调队列：没有其他进程在运行时开始新的一轮，否则和它们分担同一轮的任务
+        self.jobs.join(resume=resume, completed=[keywords[index] for index in completed],
+                       count_slots=self.slot_counts)
+
+        # 搜索和下载在流水线中并行进行
+        self.metrics.start(live=self.live_progress)
+        self.budget.start(self.base_dir)
+        try:
+            self.pipeline.run(
+                keywords, completed, search, plan, self.download_image,
+                on_result=on_result, should_stop=should_stop, on_progress=on_progress, pick=pick
+            )
+        finally:
+            self.metrics.stop()
+            self.jobs.leave()
+
+    def slot_counts(self, since):
+        """本轮（since 之后）各分类实际保存的图片数，继续爬取时用来核对协调队列中的名额"""
+        return self.catalog.category_counts(self.crawl_dir, since)
+
+    def finish(self, total_downloaded):
+        """运行结束：预算用尽时保留检查点，否则删除；关闭入库进程池并输出各主机速率"""
+        logging.info(f"爬虫完成！总共下载了 {total_downloaded} 张图片")
+        # 预算用尽时保留检查点，之后可以继续爬取
+        budget_reason = self.budget.exhausted()
+        if budget_reason:
+            logging.info(f"爬取预算已用尽（{budget_reason}），进度已保存，使用 --resume 可继续爬取")
+        else:
+            self.checkpoint.clear()
+        self.ingest.close()
+        self.limiter.log_rates()
+
+    def component_stats(self):
+        """各共用组件的统计，写入下载报告"""
+        return {
+            "主机速率": self.limiter.get_rates(),
+            "搜索保护": self.guard.get_stats(),
+            "下载预检": self.engine.get_stats(),
+            "搜索缓存": self.search_cache.get_stats(),
+            "翻页收益": self.page_yield.get_stats(),
+            "入库处理": self.ingest.get_stats(),
+            "内容库": self.store.get_stats(),
+            "图片目录": self.catalog.get_stats(),
+            "感知哈希索引": self.phash_index.get_stats(),
+            "缩略图筛选": self.screener.get_stats(),
+            "流水线统计": self.pipeline.get_stats(),
+            "性能指标": self.metrics.get_stats(),
+            "爬取预算": self.budget.get_stats(),
+            "多进程协调": self.jobs.get_stats(),
+        }
+
+    def save_report(self, report):
+        """把下载报告写入图片目录中的 下载报告.json"""
+        report_file = self.crawl_dir / "下载报告.json"
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logging.info(f"下载报告已保存: {report_file}")
+
+
+class TaxonomyImageCrawler(BaseImageCrawler):
+    """
+    按分类表爬取的图片爬虫基类：关键词由分类表扩展生成，每个分类有数量上限
+
+    子类另需设置 taxonomy_name（taxonomies/ 中的分类表名称）、max_total（总下载数量上限）、
+    max_per_category（每类默认上限）、max_keywords（关键词数量上限，None 为不限）、
+    url_field（搜索结果中图片地址的字段）、filename_noise（生成文件名时从关键词中去掉的词），
+    并实现 search_images(keyword)
+    """
+
+    taxonomy_name = None
+    max_total = 300
+    max_per_category = 50
+    max_keywords = None
+    url_field = 'url'
+    filename_noise = ()
+    report_title = "图片下载完成!"
+    category_label = "分类"
+
+    def __init__(self, base_dir="images", taxonomy=None, **kwargs):
+        super().__init__(base_dir, **kwargs)
+
+        # 分类表（分类、词语和关键词扩展规则）保存在 taxonomies/ 中，可用 taxonomy 指定其他文件
+        self.taxonomy = Taxonomy.load(taxonomy or self.taxonomy_name)
+
+        # 分类规则编译成多模式自动机
+        self.classifier = self.taxonomy.classifier()
+
+        # 关键词收益历史：连续多次没有新图片的关键词暂停搜索
+        self.keyword_history = KeywordHistory(self.crawl_dir / "keyword_history.db", self.ledger.is_known)
+
+        # 创建目录结构
+        self.create_directories()
+
+    def category_names(self):
+        """分类表中的所有分类"""
+        return list(self.taxonomy.categories)
+
+    def get_search_keywords(self):
+        """获取搜索关键词列表：按分类表的扩展规则生成，规范化后去重"""
+        return self.taxonomy.expand_keywords()
+
+    def search_images(self, keyword):
+        """搜索一个关键词，返回候选图片列表（由子类实现）"""
+        raise NotImplementedError
+
+    def image_filename(self, keyword, serial):
+        """由关键词和文件编号生成文件名（不含扩展名）"""
+        name = keyword.replace(' ', '_')
+        for word in self.filename_noise:
+            name = name.replace(word, '')
+        return f"{name}_{serial:03d}"
+
+    def run(self, max_images_per_category=None, resume=False):
+        """运行爬虫（resume=True 时从上次保存的检查点继续；max_images_per_category 默认为 max_per_category）"""
+        logging.info(f"开始爬取{self.dir_name}图片...")
+        max_images_per_category = max_images_per_category or self.max_per_category
+
+        category_counts = {category: 0 for category in self.category_names()}
+
+        state = self.checkpoint.load() if resume else None
+        if state:
+            # 沿用检查点中的关键词顺序、进度和分类计数
+            keywords = state["关键词队列"]
+            completed = state["已完成关键词"]
+            total_downloaded = state["总下载数量"]
+            category_counts.update(state["分类统计"])
+            max_images_per_category = state["每类上限"] or max_images_per_category
+            logging.info(f"从检查点继续: 已完成{len(completed)}/{len(keywords)}个关键词，已下载{total_downloaded}张")
+        else:
+            if resume:
+                logging.info("未找到检查点，重新开始爬取")
+            # 去掉最近连续多次没有新图片的关键词
+            keywords = self.keyword_history.select(self.get_search_keywords())
+            random.shuffle(keywords)  # 随机打乱关键词顺序
+            if self.max_keywords:
+                keywords = keywords[:self.max_keywords]  # 限制关键词数量，避免过多
+            completed = []
+            total_downloaded = 0
+
+        # 已排队（含下载中）的分类计数，避免超出上限；文件编号由协调队列统一分配，多个进程之间不会冲突
+        queued_counts = dict(category_counts)
+
+        def search(keyword):
+            images = self.search_images(keyword)
+            # 记录本次搜索结果中的新图片数，连续多次没有新图片的关键词以后暂停搜索
+            self.keyword_history.record(keyword, [img_info[self.url_field] for img_info in images])
+            return images
+
+        def plan(keyword, img_info):
+            # 控制总下载数量
+            if sum(queued_counts.values()) >= self.max_total:
+                return None
+
+            # 下载记录中已有的URL不再排队
+            if self.ledger.is_known(img_info[self.url_field]):
+                return None
+
+            # 确定图片分类和保存目录
+            category = self.categorize(img_info.get('title', ''), img_info['keyword'])
+
+            # 检查该分类是否已达到上限
+            if queued_counts[category] >= max_images_per_category:
+                return None
+            serial = self.jobs.allocate_slot(category, max_images_per_category)
+            if serial is None:
+                # 其他进程已经填满该分类，调度器不再为它搜索关键词
+                queued_counts[category] = max_images_per_category
+                return None
+            queued_counts[category] += 1
+
+            return {
+                'url': img_info[self.url_field],
+                'thumb_url': img_info.get('thumb_url'),
+                'filename': self.image_filename(keyword, serial),
+                'keyword': keyword,
+                'save_dir': self.crawl_dir / category,
+                'category': category
+            }
+
+        def on_result(task, success):
+            nonlocal total_downloaded
+            if success:
+                total_downloaded += 1
+                category_counts[task['category']] += 1
+            else:
+                # 下载失败，释放排队名额
+                queued_counts[task['category']] -= 1
+                self.jobs.release_slot(task['category'])
+
+        def all_full():
+            return all(count >= max_images_per_category for count in category_counts.values())
+
+        def should_stop():
+            # 控制总下载数量，所有分类都已达到上限，或爬取预算已用尽
+            return (total_downloaded >= self.max_total or all_full() or
+                    self.budget.exhausted() is not None)
+
+        def save_progress(done):
+            self.checkpoint.save(keywords, done, total_downloaded, category_counts, max_images_per_category)
+
+        # 优先搜索缺口最大的分类，已满分类的关键词不再搜索；缺口相同时优先上次收益高的关键词
+        scheduler = KeywordScheduler(keywords, self.categorize, queued_counts, max_images_per_category,
+                                     keyword_yield=self.page_yield.get_keyword_yield)
+
+        self.crawl(keywords, completed, search, plan, on_result, should_stop, save_progress,
+                   resume=resume, pick=scheduler.pick)
+        scheduler.log_stats()
+
+        if total_downloaded >= self.max_total:
+            logging.info(f"已下载{self.max_total}张图片，停止下载")
+        elif all_full():
+            logging.info("所有分类都已达到下载上限")
+
+        self.finish(total_downloaded)
+
+        # 生成下载报告
+        self.generate_report(total_downloaded)
+
+    def generate_report(self, total_downloaded):
+        """生成下载报告"""
+        report = {
+            "总下载数量": total_downloaded,
+            "下载时间": time.strftime("%Y-%m-%d %H:%M:%S"),
+            **self.component_stats(),
+            "关键词扩展": self.taxonomy.get_stats(),
+            "关键词历史": self.keyword_history.get_stats(),
+            # 各分类的实际图片数量和格式直接从图片目录查询
+            "分类统计": self.catalog.category_summary(self.crawl_dir),
+            self.category_label: self.category_names(),
+        }
+        self.save_report(report)
+
+        print("\n" + "="*60)
+        print(self.report_title)
+        print(f"总共下载: {total_downloaded} 张图片")
+        print("\n分类统计:")
+        for category, stats in report["分类统计"].items():
+            if stats["总数"] > 0:
+                print(f"  📁 {category}: {stats['总数']} 张")
+                if stats["GIF"] > 0:
+                    print(f"     └─ 包含 {stats['GIF']} 张动图")
+        print("="*60)
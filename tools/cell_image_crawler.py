@@ -5,15 +5,38 @@
 专门爬取各种人体细胞的高质量图片，使用英文关键词从国外网站获取
 """
 
-import os
-import requests
-import time
-import random
-from urllib.parse import urljoin, urlparse, quote
-from bs4 import BeautifulSoup
-import json
+import argparse
 import logging
-from pathlib import Path
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit, urlunsplit
+from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+
+from base_crawler import TaxonomyImageCrawler
+from crawl_budget import CrawlBudget, add_budget_arguments
+from crawl_metrics import quiet_console_logging
+from download_ledger import normalize_url
+
+# 只改变尺寸、裁剪、压缩质量或统计用途的查询参数，合并各引擎结果时忽略
+RESIZE_PARAMS = {'w', 'h', 'width', 'height', 'q', 'fit', 'crop', 'auto', 'fm', 'dpr', 'c', 'rs', 'pid',
+                 'ixid', 'ixlib', 'o'}
+
+# 代理图片地址中保存原图地址的查询参数（DuckDuckGo 的 external-content.duckduckgo.com/iu/?u=...）
+PROXY_PARAMS = ('u',)
+
+
+def image_key(url):
+    """
+    合并各引擎结果时的图片标识：先取出代理地址中的原图地址，再去掉尺寸等参数，
+    同一张图片的不同尺寸、经代理和不经代理的地址得到相同的标识
+    """
+    parts = urlsplit(url.strip())
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    for name, value in params:
+        if name in PROXY_PARAMS and value.startswith('http'):
+            return image_key(value)
+    query = urlencode([(name, value) for name, value in params if name.lower() not in RESIZE_PARAMS])
+    return normalize_url(urlunsplit((parts.scheme, parts.netloc, parts.path, query, '')))
+
 
 # 配置日志
 logging.basicConfig(
@@ -25,159 +48,62 @@ logging.basicConfig(
     ]
 )
 
-class CellImageCrawler:
+class CellImageCrawler(TaxonomyImageCrawler):
     """人体细胞图片爬虫类"""
     
-    def __init__(self, base_dir="images"):
-        self.base_dir = Path(base_dir)
-        self.cells_dir = self.base_dir / "人体细胞"
-        self.session = requests.Session()
-        
-        # 设置请求头，模拟浏览器
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9,zh-CN;q=0.8,zh;q=0.7',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Sec-Fetch-User': '?1',
-        })
-        
-        # 人体细胞分类定义（英文关键词）
-        self.cell_categories = {
-            "血液细胞": [
-                "red blood cells", "erythrocytes", "white blood cells", "leukocytes",
-                "platelets", "thrombocytes", "neutrophils", "lymphocytes", "monocytes",
-                "eosinophils", "basophils", "plasma cells", "macrophages"
-            ],
-            "神经细胞": [
-                "neurons", "nerve cells", "glial cells", "astrocytes", "oligodendrocytes",
-                "microglia", "schwann cells", "motor neurons", "sensory neurons",
-                "interneurons", "pyramidal cells", "purkinje cells"
-            ],
-            "肌肉细胞": [
-                "muscle cells", "myocytes", "skeletal muscle cells", "cardiac muscle cells",
-                "smooth muscle cells", "muscle fibers", "myofibrils", "cardiomyocytes",
-                "satellite cells"
-            ],
-            "上皮细胞": [
-                "epithelial cells", "squamous epithelium", "cuboidal epithelium",
-                "columnar epithelium", "ciliated epithelium", "keratinocytes",
-                "melanocytes", "goblet cells"
-            ],
-            "结缔组织细胞": [
-                "fibroblasts", "chondrocytes", "osteoblasts", "osteocytes", "osteoclasts",
-                "adipocytes", "fat cells", "cartilage cells", "bone cells"
-            ],
-            "免疫细胞": [
-                "T cells", "B cells", "NK cells", "dendritic cells", "helper T cells",
-                "cytotoxic T cells", "regulatory T cells", "memory cells"
-            ],
-            "干细胞": [
-                "stem cells", "embryonic stem cells", "adult stem cells", "mesenchymal stem cells",
-                "hematopoietic stem cells", "neural stem cells", "induced pluripotent stem cells"
-            ],
-            "生殖细胞": [
-                "sperm cells", "egg cells", "oocytes", "spermatozoa", "gametes",
-                "follicle cells", "granulosa cells"
-            ],
-            "消化系统细胞": [
-                "hepatocytes", "liver cells", "pancreatic cells", "gastric cells",
-                "intestinal cells", "enterocytes", "parietal cells", "chief cells"
-            ],
-            "肾脏细胞": [
-                "kidney cells", "nephron cells", "glomerular cells", "tubular cells",
-                "podocytes", "mesangial cells"
-            ],
-            "癌细胞": [
-                "cancer cells", "tumor cells", "malignant cells", "carcinoma cells",
-                "adenocarcinoma", "sarcoma cells", "leukemia cells"
-            ],
-            "细胞结构": [
-                "cell nucleus", "mitochondria", "ribosomes", "endoplasmic reticulum",
-                "golgi apparatus", "lysosomes", "cell membrane", "cytoplasm",
-                "chromosomes", "DNA", "cell organelles"
-            ]
-        }
-        
-        # 创建目录结构
-        self.create_directories()
-        
-    def create_directories(self):
-        """创建图片存储目录"""
-        for category in self.cell_categories.keys():
-            directory = self.cells_dir / category
-            directory.mkdir(parents=True, exist_ok=True)
-            logging.info(f"创建目录: {directory}")
+    name = "cell"
+    dir_name = "人体细胞"
+    # 分类表保存在 taxonomies/cell.json
+    taxonomy_name = "cell"
+    max_total = 300
+    max_per_category = 25
+    max_keywords = 50
+    url_field = 'url'
+    filename_noise = ('microscopy', 'histology', 'anatomy')
+    report_title = "🔬 人体细胞图片下载完成! 🔬"
+    category_label = "细胞类型"
     
-    def download_image(self, url, filename, save_dir):
-        """下载单张图片"""
-        try:
-            # 随机延迟，避免请求过快
-            time.sleep(random.uniform(2, 4))
-            
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            
-            # 检查是否为图片
-            content_type = response.headers.get('content-type', '')
-            if 'image' not in content_type.lower():
-                logging.warning(f"URL不是图片: {url}")
-                return False
-                
-            # 确定文件扩展名
-            if not filename.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp')):
-                ext = self.get_image_extension(url, content_type)
-                filename = f"{filename}{ext}"
-            
-            filepath = save_dir / filename
-            
-            # 检查文件是否已存在
-            if filepath.exists():
-                logging.info(f"文件已存在，跳过: {filename}")
-                return True
-                
-            # 保存图片
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
-                
-            # 记录文件大小信息
-            file_size = len(response.content)
-            file_size_mb = file_size / (1024 * 1024)
-            logging.info(f"下载成功: {filename} ({file_size_mb:.2f}MB) -> {save_dir}")
-            return True
-            
-        except Exception as e:
-            logging.error(f"下载失败 {url}: {e}")
-            return False
+    # 请求头，模拟浏览器访问国外网站
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.9,zh-CN;q=0.8,zh;q=0.7',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+        'Sec-Fetch-Dest': 'document',
+        'Sec-Fetch-Mode': 'navigate',
+        'Sec-Fetch-Site': 'none',
+        'Sec-Fetch-User': '?1',
+    }
     
-    def get_image_extension(self, url, content_type):
-        """根据URL和content-type确定图片扩展名"""
-        # 先尝试从URL获取扩展名
-        parsed_url = urlparse(url)
-        path = parsed_url.path.lower()
-        if path.endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp')):
-            return os.path.splitext(path)[1]
+    def __init__(self, base_dir="images", engines=("bing", "unsplash", "duckduckgo"), engine_timeout=20,
+                 **kwargs):
+        super().__init__(base_dir, **kwargs)
         
-        # 根据content-type确定扩展名
-        if 'jpeg' in content_type:
-            return '.jpg'
-        elif 'png' in content_type:
-            return '.png'
-        elif 'gif' in content_type:
-            return '.gif'
-        elif 'webp' in content_type:
-            return '.webp'
-        else:
-            return '.jpg'  # 默认使用jpg
+        # 每个关键词并发查询的搜索引擎，超过 engine_timeout 秒未返回的引擎本次跳过
+        available_engines = {
+            "bing": lambda keyword: self.search_bing_images(keyword, max_pages=2),
+            "unsplash": lambda keyword: self.search_single_page(
+                'unsplash', keyword, self.search_unsplash_images, max_results=10),
+            "duckduckgo": lambda keyword: self.search_single_page(
+                'duckduckgo', keyword, self.search_duckduckgo_images, max_results=20),
+        }
+        self.search_engines = {name: available_engines[name] for name in engines}
+        self.engine_timeout = engine_timeout
+        self.search_executor = ThreadPoolExecutor(
+            max_workers=len(self.search_engines) * self.pipeline.search_workers * 2,
+            thread_name_prefix="engine"
+        )
+    
+    def search_images(self, keyword):
+        """所有搜索引擎并发查询，每个关键词最多15张图"""
+        return self.search_all_engines(keyword, max_results=15)
     
     def search_bing_images(self, keyword, max_pages=3):
-        """Bing图片搜索"""
+        """Bing图片搜索，某页新图片比例低于阈值时停止翻页"""
         images = []
+        paging = self.page_yield.start('bing', keyword, max_pages)
         
         for page in range(max_pages):
             # Bing图片搜索URL
@@ -190,43 +116,90 @@ class CellImageCrawler:
             
             search_url = f"https://www.bing.com/images/search?q={quote(keyword)}&first={page * 20 + 1}&count=20&mkt=en-US"
             
-            try:
-                response = self.session.get(search_url, timeout=30)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # 查找图片链接
-                img_elements = soup.find_all('img', {'class': 'mimg'})
-                
-                for img in img_elements:
-                    src = img.get('src')
-                    if src and src.startswith('http'):
-                        images.append({
-                            'url': src,
-                            'title': img.get('alt', ''),
-                            'keyword': keyword
-                        })
-                
-                logging.info(f"Bing搜索 '{keyword}' 第{page+1}页，获取{len(img_elements)}张图片")
-                time.sleep(random.uniform(3, 5))
-                
-            except Exception as e:
-                logging.error(f"Bing搜索失败 {keyword} 第{page+1}页: {e}")
+            # Bing处于熔断冷却期时不再翻页
+            if not self.guard.available('bing'):
+                break
+            
+            # 多个进程同时爬取时，每页只由租到它的进程请求
+            if not self.jobs.claim('bing', keyword, page):
+                continue
+            
+            page_images = self.fetch_bing_page(keyword, page, search_url)
+            if page_images is None:
+                self.jobs.release('bing', keyword, page)
                 continue
+            self.jobs.complete('bing', keyword, page)
+            images.extend(page_images)
+            
+            # 按收益翻页：本页大多是已下载过或重复的图片时，不再请求后续页
+            if not paging.add_page(page, [img_info['url'] for img_info in page_images]):
+                self.jobs.skip('bing', keyword, range(page + 1, max_pages))
+                break
         
         return images
     
+    def fetch_bing_page(self, keyword, page, search_url):
+        """请求Bing图片搜索的一页结果，优先使用缓存；请求失败时返回 None"""
+        # 优先使用未过期的缓存结果
+        cached = self.search_cache.get('bing', keyword, page)
+        if cached is not None and cached.fresh:
+            logging.info(f"Bing搜索 '{keyword}' 第{page+1}页，使用缓存{len(cached.results)}张图片")
+            return cached.results
+        
+        try:
+            response = self.guard.get(
+                'bing', search_url,
+                headers=self.search_cache.conditional_headers(cached)
+            )
+        
+            # 缓存过期但服务器确认内容未变化
+            if self.search_cache.revalidate('bing', keyword, page, cached, response):
+                logging.info(f"Bing搜索 '{keyword}' 第{page+1}页，缓存仍有效{len(cached.results)}张图片")
+                return cached.results
+        
+            response.raise_for_status()
+        
+            soup = BeautifulSoup(response.text, 'html.parser')
+        
+            # 查找图片链接
+            img_elements = soup.find_all('img', {'class': 'mimg'})
+        
+            page_images = []
+            for img in img_elements:
+                src = img.get('src')
+                if src and src.startswith('http'):
+                    page_images.append({
+                        'url': src,
+                        'title': img.get('alt', ''),
+                        'keyword': keyword
+                    })
+        
+            self.guard.record_result('bing', page_images, first_page=page == 0)
+            self.search_cache.put('bing', keyword, page, page_images, response)
+            logging.info(f"Bing搜索 '{keyword}' 第{page+1}页，获取{len(img_elements)}张图片")
+            return page_images
+        
+        except Exception as e:
+            self.guard.record_failure('bing', e)
+            logging.error(f"Bing搜索失败 {keyword} 第{page+1}页: {e}")
+            return None
+    
     def search_duckduckgo_images(self, keyword, max_results=30):
         """DuckDuckGo图片搜索"""
         images = []
         
+        # 优先使用未过期的缓存结果
+        cached = self.search_cache.get('duckduckgo', keyword, 0)
+        if cached is not None and cached.fresh:
+            logging.info(f"DuckDuckGo搜索 '{keyword}'，使用缓存{len(cached.results)}张图片")
+            return cached.results[:max_results]
+        
         try:
             # DuckDuckGo图片搜索API
             search_url = f"https://duckduckgo.com/"
             
             # 首先获取搜索token
-            response = self.session.get(search_url)
+            response = self.guard.get('duckduckgo', search_url)
             
             # 然后进行图片搜索
             search_params = {
@@ -235,7 +208,7 @@ class CellImageCrawler:
                 'ia': 'images'
             }
             
-            response = self.session.get(search_url, params=search_params)
+            response = self.guard.get('duckduckgo', search_url, params=search_params)
             soup = BeautifulSoup(response.text, 'html.parser')
             
             # 简化的图片提取（实际的DuckDuckGo API更复杂）
@@ -250,10 +223,13 @@ class CellImageCrawler:
                         'keyword': keyword
                     })
             
+            # 页面中解析不到图片时计为失败，连续多次后暂停使用DuckDuckGo
+            self.guard.record_result('duckduckgo', images)
+            self.search_cache.put('duckduckgo', keyword, 0, images, response)
             logging.info(f"DuckDuckGo搜索 '{keyword}'，获取{len(images)}张图片")
-            time.sleep(random.uniform(2, 4))
             
         except Exception as e:
+            self.guard.record_failure('duckduckgo', e)
             logging.error(f"DuckDuckGo搜索失败 {keyword}: {e}")
         
         return images
@@ -270,7 +246,22 @@ class CellImageCrawler:
                 'per_page': max_results
             }
             
-            response = self.session.get(search_url, params=params)
+            # 优先使用未过期的缓存结果（不同的返回数量分别缓存）
+            engine = f"unsplash-{max_results}"
+            cached = self.search_cache.get(engine, keyword, 0)
+            if cached is not None and cached.fresh:
+                logging.info(f"Unsplash搜索 '{keyword}'，使用缓存{len(cached.results)}张图片")
+                return cached.results
+            
+            response = self.guard.get(
+                'unsplash', search_url, params=params,
+                headers=self.search_cache.conditional_headers(cached)
+            )
+            
+            # 缓存过期但服务器确认内容未变化
+            if self.search_cache.revalidate(engine, keyword, 0, cached, response):
+                logging.info(f"Unsplash搜索 '{keyword}'，缓存仍有效{len(cached.results)}张图片")
+                return cached.results
             
             if response.status_code == 200:
                 data = response.json()
@@ -283,202 +274,135 @@ class CellImageCrawler:
                             'keyword': keyword
                         })
                 
+                self.search_cache.put(engine, keyword, 0, images, response)
                 logging.info(f"Unsplash搜索 '{keyword}'，获取{len(images)}张图片")
             
-            time.sleep(random.uniform(2, 3))
+            self.guard.record_result('unsplash', images)
             
         except Exception as e:
+            self.guard.record_failure('unsplash', e)
             logging.error(f"Unsplash搜索失败 {keyword}: {e}")
         
         return images
     
-    def categorize_cell(self, title, keyword):
-        """根据标题和关键词对细胞图片进行分类"""
-        title_lower = title.lower()
-        keyword_lower = keyword.lower()
-        
-        # 检查各个细胞分类
-        for category, cell_types in self.cell_categories.items():
-            for cell_type in cell_types:
-                if cell_type.lower() in title_lower or cell_type.lower() in keyword_lower:
-                    return category
-        
-        # 默认分类为细胞结构
-        return "细胞结构"
-    
-    def get_search_keywords(self):
-        """获取搜索关键词列表"""
-        keywords = []
-        
-        # 为每个分类生成搜索关键词
-        for category, cell_types in self.cell_categories.items():
-            for cell_type in cell_types:
-                # 基础关键词
-                keywords.append(cell_type)
-                # 添加"microscopy"、"histology"等修饰词
-                keywords.append(f"{cell_type} microscopy")
-                keywords.append(f"{cell_type} histology")
-                keywords.append(f"{cell_type} anatomy")
-                
-                # 为特定细胞类型添加特殊关键词
-                if "cells" in cell_type:
-                    keywords.append(f"{cell_type} structure")
-                    keywords.append(f"{cell_type} function")
-        
-        # 添加一些通用的细胞学关键词
-        general_keywords = [
-            "human cells", "cell biology", "cell structure", "cell types",
-            "cellular anatomy", "histological sections", "cell microscopy",
-            "human histology", "cell morphology", "cellular organelles"
-        ]
-        keywords.extend(general_keywords)
-        
-        return keywords
+    def search_single_page(self, engine, keyword, search, **kwargs):
+        """只有一页结果的搜索引擎：租到该任务时才搜索，没有结果时释放租约留待重试"""
+        if not self.jobs.claim(engine, keyword, 0):
+            return []
+        images = search(keyword, **kwargs)
+        if images:
+            self.jobs.complete(engine, keyword, 0)
+        else:
+            self.jobs.release(engine, keyword, 0)
+        return images
     
-    def run(self, max_images_per_category=25):
-        """运行爬虫"""
-        logging.info("开始爬取人体细胞图片...")
-        
-        keywords = self.get_search_keywords()
-        random.shuffle(keywords)  # 随机打乱关键词顺序
-        
-        total_downloaded = 0
-        category_counts = {category: 0 for category in self.cell_categories.keys()}
-        
-        for keyword in keywords[:50]:  # 限制关键词数量，避免过多
-            if total_downloaded >= 300:
-                break
-                
-            logging.info(f"搜索关键词: {keyword}")
-            
-            # 使用多个搜索源
-            all_images = []
-            
-            # Bing搜索
-            try:
-                bing_images = self.search_bing_images(keyword, max_pages=2)
-                all_images.extend(bing_images)
-            except Exception as e:
-                logging.error(f"Bing搜索出错: {e}")
-            
-            # Unsplash搜索
-            try:
-                unsplash_images = self.search_unsplash_images(keyword, max_results=10)
-                all_images.extend(unsplash_images)
-            except Exception as e:
-                logging.error(f"Unsplash搜索出错: {e}")
-            
-            # 处理搜索结果
-            for i, img_info in enumerate(all_images[:15]):  # 每个关键词最多15张图
-                # 确定图片分类和保存目录
-                category = self.categorize_cell(img_info.get('title', ''), img_info['keyword'])
-                
-                # 检查该分类是否已达到上限
-                if category_counts[category] >= max_images_per_category:
-                    continue
-                
-                save_dir = self.cells_dir / category
-                
-                # 生成文件名
-                clean_keyword = keyword.replace(' ', '_').replace('microscopy', '').replace('histology', '').replace('anatomy', '')
-                filename = f"{clean_keyword}_{category_counts[category]+1:03d}"
-                
-                # 下载图片
-                success = self.download_image(
-                    img_info['url'], 
-                    filename, 
-                    save_dir
-                )
-                
-                if success:
-                    total_downloaded += 1
-                    category_counts[category] += 1
-                
-                # 控制总下载数量
-                if total_downloaded >= 300:
-                    logging.info("已下载300张图片，停止下载")
-                    break
-            
-            # 检查是否所有分类都已达到上限
-            if all(count >= max_images_per_category for count in category_counts.values()):
-                logging.info("所有分类都已达到下载上限")
-                break
-        
-        logging.info(f"爬虫完成！总共下载了 {total_downloaded} 张图片")
-        
-        # 生成下载报告
-        self.generate_report(total_downloaded, category_counts)
+    def reopen_search_jobs(self, engine, keyword):
+        """超时引擎的搜索结束后，重新开放它完成的任务（结果已在搜索缓存中，重新搜索时不再请求）"""
+        try:
+            reopened = self.jobs.reopen(engine, keyword)
+        except Exception as e:
+            logging.error(f"重新开放{engine}搜索任务失败 '{keyword}': {e}")
+            return
+        if reopened:
+            logging.info(f"{engine}搜索 '{keyword}' 的结果已丢弃，重新开放{reopened}个搜索任务")
     
-    def generate_report(self, total_downloaded, category_counts):
-        """生成下载报告"""
-        report = {
-            "总下载数量": total_downloaded,
-            "下载时间": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "分类统计": {},
-            "细胞类型": list(self.cell_categories.keys())
+    def search_all_engines(self, keyword, max_results=15):
+        """
+        并发查询所有已配置的搜索引擎，按返回顺序合并结果，同一张图片（见 image_key）只保留一次；
+        图片内容相同但地址不同的，下载后再由内容库和感知哈希去重
+        """
+        # 处于熔断冷却期的引擎本次不再查询
+        futures = {
+            self.search_executor.submit(search, keyword): name
+            for name, search in self.search_engines.items()
+            if self.guard.available(name)
         }
+        merged = []
+        seen_keys = set()
         
-        # 统计各分类的实际图片数量
-        for category_dir in self.cells_dir.iterdir():
-            if category_dir.is_dir():
-                # 统计各种类型的文件
-                jpg_count = len(list(category_dir.glob("*.jpg")))
-                png_count = len(list(category_dir.glob("*.png")))
-                gif_count = len(list(category_dir.glob("*.gif")))
-                webp_count = len(list(category_dir.glob("*.webp")))
-                total_count = jpg_count + png_count + gif_count + webp_count
+        try:
+            for future in as_completed(futures, timeout=self.engine_timeout):
+                name = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logging.error(f"{name}搜索出错: {e}")
+                    continue
                 
-                report["分类统计"][category_dir.name] = {
-                    "总数": total_count,
-                    "JPG": jpg_count,
-                    "PNG": png_count,
-                    "GIF": gif_count,
-                    "WEBP": webp_count
-                }
-        
-        # 保存报告
-        report_file = self.cells_dir / "下载报告.json"
-        with open(report_file, 'w', encoding='utf-8') as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
+                # 先返回的引擎结果先合并，同一张图片只保留一次
+                added = 0
+                for img_info in results:
+                    key = image_key(img_info['url'])
+                    if key in seen_keys:
+                        continue
+                    seen_keys.add(key)
+                    merged.append(img_info)
+                    added += 1
+                logging.info(f"{name}返回 '{keyword}' {len(results)}张图片，去重后新增{added}张")
+        except FuturesTimeout:
+            # 慢的引擎不阻塞本批结果，其返回值直接丢弃；搜索结束后重新开放它完成的任务，
+            # 否则这些页在队列中已完成，其他进程和之后继续爬取时都不会再搜索
+            slow_engines = []
+            for future, name in futures.items():
+                if not future.done():
+                    slow_engines.append(name)
+                    future.add_done_callback(
+                        lambda _, name=name: self.reopen_search_jobs(name, keyword))
+            logging.warning(f"搜索引擎超时，已跳过: {', '.join(slow_engines)} ('{keyword}')")
         
-        logging.info(f"下载报告已保存: {report_file}")
-        print("\n" + "="*60)
-        print("🔬 人体细胞图片下载完成! 🔬")
-        print(f"总共下载: {total_downloaded} 张图片")
-        print("\n分类统计:")
-        for category, stats in report["分类统计"].items():
-            if stats["总数"] > 0:
-                print(f"  📁 {category}: {stats['总数']} 张")
-        print("="*60)
+        return merged[:max_results]
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="人体细胞图片爬虫")
+    parser.add_argument("--resume", action="store_true",
+                       help="从上次中断的检查点继续爬取")
+    parser.add_argument("--keep-originals", action="store_true",
+                       help="转为WebP后另存一份原图到 images/originals")
+    parser.add_argument("--progress", action="store_true",
+                       help="在终端实时显示各引擎的请求延迟、成功率、流量和入库速度")
+    parser.add_argument("--taxonomy",
+                       help="分类表JSON文件（默认 taxonomies/cell.json）")
+    add_budget_arguments(parser)
+    args = parser.parse_args()
+    
+    if args.progress:
+        # 控制台只输出警告和错误，完整日志仍写入日志文件
+        quiet_console_logging()
+    
     print("🔬 人体细胞图片爬虫 🔬")
     print("专门爬取各种人体细胞的高质量图片（使用英文关键词）")
     print("-" * 50)
     
-    # 询问用户配置
-    print("\n配置选项:")
-    print("1. 每个细胞类型下载多少张图片? (默认: 25)")
-    max_images = input("请输入数字 (直接回车使用默认值): ").strip()
-    
-    try:
-        max_images_per_category = int(max_images) if max_images else 25
-    except ValueError:
+    if args.resume:
+        # 每类上限等配置沿用检查点中保存的值
         max_images_per_category = 25
-        print("输入无效，使用默认值: 25")
+        print("\n将从上次中断的检查点继续下载...\n")
+    else:
+        # 询问用户配置
+        print("\n配置选项:")
+        print("1. 每个细胞类型下载多少张图片? (默认: 25)")
+        max_images = input("请输入数字 (直接回车使用默认值): ").strip()
+    
+        try:
+            max_images_per_category = int(max_images) if max_images else 25
+        except ValueError:
+            max_images_per_category = 25
+            print("输入无效，使用默认值: 25")
     
-    print(f"\n将为每个细胞类型下载最多 {max_images_per_category} 张图片")
-    print("搜索源: Bing、Unsplash等国外网站")
-    print("开始下载...\n")
+        print(f"\n将为每个细胞类型下载最多 {max_images_per_category} 张图片")
+        print("搜索源: Bing、Unsplash、DuckDuckGo（并发查询）")
+        print("开始下载...\n")
     
     # 创建爬虫实例并运行
-    crawler = CellImageCrawler()
+    crawler = CellImageCrawler(keep_originals=args.keep_originals, live_progress=args.progress,
+                               budget=CrawlBudget.from_args(args), taxonomy=args.taxonomy)
     
     try:
-        crawler.run(max_images_per_category=max_images_per_category)
+        crawler.run(max_images_per_category=max_images_per_category, resume=args.resume)
     except KeyboardInterrupt:
         print("\n🛑 用户中断了程序")
+        print("💾 进度已保存，使用 --resume 参数可继续爬取")
     except Exception as e:
         print(f"❌ 程序运行出错: {e}")
         logging.error(f"程序异常: {e}")
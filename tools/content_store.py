@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片内容库
+按SHA-256保存每份图片内容，分类目录中的图片都是指向内容库的硬链接，
+同一张图片出现在多个分类时只占用一份磁盘空间
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+
+# 纳入内容库的图片扩展名
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+# 计算文件哈希时的分块大小（字节）
+CHUNK_SIZE = 64 * 1024
+
+
+def file_sha256(filepath):
+    """计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentStore:
+    """图片内容库类（线程安全）"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.reused = 0
+        self.saved_bytes = 0
+        self.link_supported = True
+
+        self._lock = threading.Lock()
+
+    def blob_path(self, sha256):
+        """内容在库中的路径，按哈希前两位分目录"""
+        return self.root / sha256[:2] / sha256
+
+    def adopt(self, filepath, sha256):
+        """
+        把刚写入的图片纳入内容库
+
+        库中已有相同内容时，用指向它的硬链接替换该文件并返回 True；
+        否则在库中为该文件建立硬链接，返回 False。
+        文件系统不支持硬链接时保留原文件，只在日志中提示一次
+        """
+        filepath = Path(filepath)
+        blob = self.blob_path(sha256)
+        with self._lock:
+            if not self.link_supported:
+                return False
+            try:
+                blob.parent.mkdir(exist_ok=True)
+                if not blob.exists():
+                    os.link(filepath, blob)
+                    return False
+                if os.path.samefile(blob, filepath):
+                    return False
+
+                # 先建临时链接再原子替换，中断时不会丢失分类目录中的文件
+                size = filepath.stat().st_size
+                temp_path = filepath.with_name(f".{filepath.name}.link")
+                if temp_path.exists():
+                    temp_path.unlink()
+                os.link(blob, temp_path)
+                os.replace(temp_path, filepath)
+                self.reused += 1
+                self.saved_bytes += size
+                return True
+            except OSError as e:
+                self.link_supported = False
+                logging.warning(f"无法创建硬链接，图片将按普通文件保存: {e}")
+                return False
+
+    def import_tree(self, directory):
+        """把目录中已有的图片纳入内容库，返回 (处理的文件数, 复用的文件数)"""
+        directory = Path(directory)
+        scanned = 0
+        reused = 0
+        for filepath in sorted(directory.rglob('*')):
+            if self.root in filepath.parents:
+                continue
+            if not filepath.is_file() or filepath.suffix.lower() not in IMAGE_SUFFIXES:
+                continue
+            scanned += 1
+            if self.adopt(filepath, file_sha256(filepath)):
+                reused += 1
+        return scanned, reused
+
+    def prune(self):
+        """删除没有任何分类目录引用的内容，返回删除的数量"""
+        removed = 0
+        with self._lock:
+            for blob in self.root.glob('*/*'):
+                if blob.is_file() and blob.stat().st_nlink == 1:
+                    blob.unlink()
+                    removed += 1
+        return removed
+
+    def get_stats(self):
+        """获取本次运行的内容复用统计"""
+        return {
+            "复用内容": self.reused,
+            "节省空间(MB)": round(self.saved_bytes / (1024 * 1024), 2),
+        }
+
+
+def main():
+    """把已下载的图片迁移到内容库并清理无引用的内容"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="图片内容库：合并重复图片、清理无引用的内容")
+    parser.add_argument('images_dir', nargs='?', default='images', help="图片根目录（默认 images）")
+    parser.add_argument('--prune', action='store_true', help="删除没有分类目录引用的内容")
+    args = parser.parse_args()
+
+    images_dir = Path(args.images_dir)
+    store = ContentStore(images_dir / "content_store")
+
+    scanned, reused = store.import_tree(images_dir)
+    stats = store.get_stats()
+    print(f"扫描图片 {scanned} 张，合并重复 {reused} 张，节省 {stats['节省空间(MB)']}MB")
+
+    if args.prune:
+        print(f"删除无引用内容 {store.prune()} 份")
+
+
+if __name__ == "__main__":
+    main()
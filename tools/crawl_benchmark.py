@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫基准测试
+启动本地模拟搜索/图片服务器，让各个爬虫在临时目录中对它完整运行一遍，
+报告每秒入库图片数和每张入库图片消耗的请求数，用于比较优化前后的吞吐量
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import multiprocessing
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+from mock_search_server import FaultProfile, MockSearchServer, route_session
+
+# 基准测试中的爬虫：名称 -> (模块, 类名, 是否按分类设置上限)
+CRAWLERS = {
+    'animal': ('animal_image_crawler', 'AnimalImageCrawler', True),
+    'human_body': ('human_body_crawler', 'HumanBodyCrawler', True),
+    'cell': ('cell_image_crawler', 'CellImageCrawler', True),
+    'luoxiaohei': ('luoxiaohei_image_crawler', 'LuoXiaoHeiCrawler', False),
+}
+
+
+def crawl_once(name, base_url, base_dir, keywords=6, per_category=5):
+    """让一个爬虫实例对模拟服务器运行一遍，返回 (入库图片数, 各引擎指标)；多进程测试时在子进程中执行"""
+    # 子进程中没有配置过日志，先于爬虫模块配置，只输出警告和错误
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    module_name, class_name, has_limit = CRAWLERS[name]
+    crawler_class = getattr(importlib.import_module(module_name), class_name)
+    crawler = crawler_class(base_dir=base_dir)
+    route_session(crawler.session, base_url, crawler.engine.max_workers)
+
+    # 固定抽取一部分关键词，各次运行之间可以直接比较
+    if keywords and hasattr(crawler, 'get_search_keywords'):
+        all_keywords = crawler.get_search_keywords()
+        sample = random.Random(0).sample(all_keywords, min(keywords, len(all_keywords)))
+        crawler.get_search_keywords = lambda: list(sample)
+
+    if has_limit:
+        crawler.run(max_images_per_category=per_category)
+    else:
+        crawler.run()
+    return crawler.catalog.get_stats()["本次收录"], crawler.metrics.engine_summary()
+
+
+def run_crawler(name, server, workdir, keywords=6, per_category=5, workers=1):
+    """
+    运行一个爬虫并返回测量结果；workers 大于 1 时同时启动多个进程共用同一个图片目录，
+    通过协调队列分担搜索任务和分类名额
+    """
+    base_dir = workdir / name / "images"
+    server.reset_counts()
+    start = time.monotonic()
+    if workers == 1:
+        outcomes = [crawl_once(name, server.base_url, base_dir, keywords, per_category)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            outcomes = list(executor.map(
+                crawl_once, repeat(name, workers), repeat(server.base_url), repeat(base_dir),
+                repeat(keywords), repeat(per_category)
+            ))
+    elapsed = time.monotonic() - start
+
+    requests_by_host = server.reset_counts()
+    total_requests = sum(requests_by_host.values())
+    kept = sum(count for count, _ in outcomes)
+    return {
+        "爬虫": name,
+        "进程数": workers,
+        "耗时(秒)": round(elapsed, 2),
+        "入库图片": kept,
+        "请求数": total_requests,
+        "图片/秒": round(kept / elapsed, 3) if elapsed else 0.0,
+        "请求/张": round(total_requests / kept, 2) if kept else None,
+        "各主机请求": dict(sorted(requests_by_host.items())),
+        "引擎指标": [summary for _, summary in outcomes] if workers > 1 else outcomes[0][1],
+    }
+
+
+def main():
+    """运行基准测试并输出结果"""
+    parser = argparse.ArgumentParser(description="用本地模拟服务器测量各爬虫的吞吐量")
+    parser.add_argument('crawlers', nargs='*', metavar='crawler',
+                        help=f"要测试的爬虫：{'、'.join(CRAWLERS)}（默认全部）")
+    parser.add_argument('--keywords', type=int, default=6, help="每个爬虫使用的关键词数（默认 6）")
+    parser.add_argument('--per-category', type=int, default=5, help="每个分类的图片上限（默认 5）")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="同时运行的爬虫进程数（默认 1），用于测量多进程时吞吐量的提升")
+    parser.add_argument('--latency', type=float, default=0.05, help="模拟服务器平均响应延迟（秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="返回500的概率")
+    parser.add_argument('--burst-every', type=float, default=0.0, help="每隔多少秒出现一次429限流")
+    parser.add_argument('--burst-length', type=float, default=0.0, help="每次429限流持续的秒数")
+    parser.add_argument('--duplicate-rate', type=float, default=0.1, help="结果中重复图片的比例（默认 0.1）")
+    parser.add_argument('--workdir', help="保存下载结果的目录（默认使用临时目录，结束后删除）")
+    parser.add_argument('--output', help="把结果写入JSON文件")
+    args = parser.parse_args()
+    unknown = [name for name in args.crawlers if name not in CRAWLERS]
+    if unknown:
+        parser.error(f"未知的爬虫: {'、'.join(unknown)}（可选: {'、'.join(CRAWLERS)}）")
+
+    # 先于爬虫模块配置日志，爬虫运行中只在控制台输出警告和错误
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    profile = FaultProfile(args.latency, error_rate=args.error_rate,
+                           burst_every=args.burst_every, burst_length=args.burst_length, seed=0)
+    server = MockSearchServer(profile=profile, duplicate_rate=args.duplicate_rate).start()
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="crawl_benchmark_"))
+    print(f"🧪 模拟服务器: {server.base_url}，工作目录: {workdir}")
+
+    results = []
+    try:
+        for name in args.crawlers or list(CRAWLERS):
+            print(f"\n▶️ 运行 {name} ...")
+            results.append(run_crawler(name, server, workdir, args.keywords, args.per_category, args.workers))
+    finally:
+        server.stop()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n" + "=" * 60)
+    print("📈 基准测试结果")
+    for result in results:
+        per_image = result["请求/张"] if result["请求/张"] is not None else "-"
+        print(f"  {result['爬虫']} ×{result['进程数']}: {result['入库图片']} 张 / {result['耗时(秒)']} 秒，"
+              f"{result['图片/秒']} 张/秒，{result['请求数']} 个请求，{per_image} 请求/张")
+    print("=" * 60)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"📄 结果已写入: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬取预算
+一次运行可以限制下载流量、每个搜索引擎的请求数、磁盘增长和运行时间；
+所有搜索和下载线程共用同一份预算，每个请求发出前检查，任一预算用尽时不再发出新请求，爬虫保存进度后停止
+"""
+
+import logging
+import shutil
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+from crawl_metrics import engine_of
+
+# 磁盘用量的查询间隔（秒）
+DISK_CHECK_INTERVAL = 1.0
+
+
+class BudgetExhausted(Exception):
+    """爬取预算已用尽，不再发出新请求"""
+
+
+def add_budget_arguments(parser):
+    """在命令行参数中加入各项预算"""
+    parser.add_argument("--max-mb", type=float,
+                        help="本次运行最多下载的流量（MB），含搜索结果和缩略图")
+    parser.add_argument("--max-requests", type=int,
+                        help="每个搜索引擎（含其图片服务器）最多发出的请求数")
+    parser.add_argument("--max-disk-mb", type=float,
+                        help="图片目录所在磁盘最多增长的空间（MB）")
+    parser.add_argument("--max-minutes", type=float,
+                        help="最长运行时间（分钟）")
+
+
+class CrawlBudget:
+    """爬取预算类（线程安全），各项为 None 时不限制"""
+
+    def __init__(self, max_mb=None, max_requests=None, max_disk_mb=None, max_minutes=None):
+        self.max_bytes = int(max_mb * 1024 * 1024) if max_mb is not None else None
+        self.max_requests = max_requests
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024) if max_disk_mb is not None else None
+        self.max_seconds = max_minutes * 60 if max_minutes is not None else None
+
+        self._lock = threading.Lock()
+        self.disk_path = None
+        self.start()
+
+    @classmethod
+    def from_args(cls, args):
+        """由 add_budget_arguments 加入的命令行参数创建预算"""
+        return cls(args.max_mb, args.max_requests, args.max_disk_mb, args.max_minutes)
+
+    def start(self, disk_path=None):
+        """开始一次运行：重置计数和计时，记录磁盘用量的基准"""
+        with self._lock:
+            self.started = time.monotonic()
+            self.bytes = 0
+            self.requests = {}
+            self.refused = 0
+            self.reason = None
+            if disk_path is not None:
+                self.disk_path = Path(disk_path)
+                self.disk_path.mkdir(parents=True, exist_ok=True)
+            self.disk_base = self._disk_used() if self.max_disk_bytes is not None else None
+            self.disk_growth = 0
+            self.disk_checked = time.monotonic()
+
+    def _disk_used(self):
+        """磁盘已用空间；未指定目录时返回 None"""
+        if self.disk_path is None:
+            return None
+        return shutil.disk_usage(self.disk_path).used
+
+    def _check(self, now):
+        """检查流量、运行时间和磁盘增长，返回用尽的原因或 None，调用方需持有锁"""
+        if self.reason is not None:
+            return self.reason
+        reason = None
+        if self.max_bytes is not None and self.bytes >= self.max_bytes:
+            reason = f"下载流量达到 {self.max_bytes / (1024 * 1024):.0f}MB"
+        elif self.max_seconds is not None and now - self.started >= self.max_seconds:
+            reason = f"运行时间达到 {self.max_seconds / 60:.0f} 分钟"
+        elif self.disk_base is not None:
+            # 查询磁盘用量要访问文件系统，按间隔进行
+            if now - self.disk_checked >= DISK_CHECK_INTERVAL:
+                self.disk_checked = now
+                self.disk_growth = max(0, self._disk_used() - self.disk_base)
+            if self.disk_growth >= self.max_disk_bytes:
+                reason = f"磁盘增长达到 {self.max_disk_bytes / (1024 * 1024):.0f}MB"
+        if reason is None and self.max_requests is not None and self.requests \
+                and all(count >= self.max_requests for count in self.requests.values()):
+            # 用到的每个引擎都已达到请求数上限，没有可以继续请求的引擎
+            reason = f"各引擎请求数达到 {self.max_requests}"
+        if reason is not None:
+            self.reason = reason
+            logging.warning(f"爬取预算已用尽（{reason}），不再发出新请求")
+        return reason
+
+    def exhausted(self):
+        """返回预算用尽的原因，尚未用尽时返回 None"""
+        with self._lock:
+            return self._check(time.monotonic())
+
+    def allows(self, engine):
+        """预算是否还允许向该搜索引擎发出请求"""
+        with self._lock:
+            if self._check(time.monotonic()) is not None:
+                return False
+            return self.max_requests is None or self.requests.get(engine, 0) < self.max_requests
+
+    def allows_url(self, url):
+        """预算是否还允许请求该地址，不允许时计入拒绝的请求"""
+        allowed = self.allows(engine_of(urlparse(url).netloc.lower()))
+        if not allowed:
+            with self._lock:
+                self.refused += 1
+        return allowed
+
+    def charge_request(self, url):
+        """请求发出前计入请求数；预算已用尽时抛出 BudgetExhausted"""
+        engine = engine_of(urlparse(url).netloc.lower())
+        with self._lock:
+            reason = self._check(time.monotonic())
+            if reason is None and self.max_requests is not None \
+                    and self.requests.get(engine, 0) >= self.max_requests:
+                reason = f"{engine} 请求数达到 {self.max_requests}"
+            if reason is not None:
+                self.refused += 1
+                raise BudgetExhausted(reason)
+            self.requests[engine] = self.requests.get(engine, 0) + 1
+
+    def add_bytes(self, n):
+        """计入下载的字节数"""
+        with self._lock:
+            self.bytes += n
+
+    def get_stats(self):
+        """获取预算使用情况"""
+        with self._lock:
+            now = time.monotonic()
+            stats = {
+                "停止原因": self.reason,
+                "下载流量(MB)": round(self.bytes / (1024 * 1024), 2),
+                "各引擎请求数": dict(sorted(self.requests.items())),
+                "运行时间(分钟)": round((now - self.started) / 60, 2),
+                "拒绝的请求": self.refused,
+            }
+            if self.disk_base is not None:
+                stats["磁盘增长(MB)"] = round(self.disk_growth / (1024 * 1024), 2)
+            stats["预算"] = {
+                "流量(MB)": self.max_bytes / (1024 * 1024) if self.max_bytes is not None else None,
+                "每引擎请求数": self.max_requests,
+                "磁盘增长(MB)": self.max_disk_bytes / (1024 * 1024) if self.max_disk_bytes is not None else None,
+                "运行时间(分钟)": self.max_seconds / 60 if self.max_seconds is not None else None,
+            }
+            return stats
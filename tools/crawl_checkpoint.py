@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬取进度检查点
+定期把关键词队列、已完成的关键词和分类计数写入JSON文件，中断后可用 --resume 继续
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+
+class CrawlCheckpoint:
+    """爬取进度检查点类"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def load(self):
+        """读取检查点，不存在或已损坏时返回 None"""
+        if not self.path.exists():
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"检查点读取失败，将重新开始: {e}")
+            return None
+
+    def save(self, keywords, completed, total_downloaded, category_counts=None,
+             max_images_per_category=None):
+        """保存检查点（先写临时文件再原子替换，避免写入中断损坏检查点）"""
+        state = {
+            "关键词队列": keywords,
+            "已完成关键词": list(completed),
+            "总下载数量": total_downloaded,
+            "分类统计": category_counts or {},
+            "每类上限": max_images_per_category,
+            "保存时间": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 临时文件名带进程号，多个爬虫进程同时保存时不会互相覆盖
+        temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        """爬取完成后删除检查点"""
+        if self.path.exists():
+            self.path.unlink()
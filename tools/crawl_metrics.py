@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫性能指标
+按搜索引擎和主机统计请求延迟分布、流量、成功率和4xx/5xx比例，按分类统计每分钟入库图片数，
+定期写成Prometheus文本格式文件（可由node_exporter的textfile收集器读取），
+并可在终端中实时刷新进度视图，查看爬取时间花在哪里
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from urllib.parse import urlparse
+
+# 请求延迟直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 主机所属的搜索引擎（按域名后缀匹配），其余主机归为 other
+ENGINE_DOMAINS = (
+    ('baidu.com', 'baidu'),
+    ('bdimg.com', 'baidu'),
+    ('bdstatic.com', 'baidu'),
+    ('bing.com', 'bing'),
+    ('bing.net', 'bing'),
+    ('unsplash.com', 'unsplash'),
+    ('duckduckgo.com', 'duckduckgo'),
+)
+
+# 进度视图中列出的耗时最多的主机数
+TOP_HOSTS = 5
+
+
+def engine_of(host):
+    """根据主机名判断所属的搜索引擎"""
+    for domain, engine in ENGINE_DOMAINS:
+        if host == domain or host.endswith(f".{domain}"):
+            return engine
+    return 'other'
+
+
+def status_class(status_code):
+    """把状态码归为 2xx/3xx/4xx/5xx，请求异常时为 error"""
+    if status_code is None:
+        return 'error'
+    return f"{status_code // 100}xx"
+
+
+def quiet_console_logging(level=logging.WARNING):
+    """提高控制台日志级别，避免刷屏覆盖实时进度视图；写入文件的日志不受影响"""
+    for handler in logging.getLogger().handlers:
+        if type(handler) is logging.StreamHandler:
+            handler.setLevel(level)
+
+
+class HostSeries:
+    """单个主机的请求统计"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.count = 0
+        self.statuses = {}
+        self.bytes = 0
+
+    def observe(self, status, latency):
+        """记录一次请求"""
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if latency is None:
+            return
+        self.count += 1
+        self.latency_sum += latency
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.buckets[index] += 1
+                break
+
+
+def quantile(buckets, count, q):
+    """按直方图估算分位数，返回所在桶的上界；超过最大桶时返回 None"""
+    if not count:
+        return None
+    target = q * count
+    cumulative = 0
+    for bound, bucket in zip(LATENCY_BUCKETS, buckets):
+        cumulative += bucket
+        if cumulative >= target:
+            return bound
+    return None
+
+
+def display_width(text):
+    """文本在终端中占用的列数，中文等全角字符占两列"""
+    return sum(2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1 for char in text)
+
+
+def format_row(cells, widths):
+    """按列宽排版一行，第一列左对齐，其余右对齐"""
+    parts = []
+    for index, (cell, width) in enumerate(zip(cells, widths)):
+        padding = " " * max(width - display_width(cell), 0)
+        parts.append(cell + padding if index == 0 else padding + cell)
+    return "".join(parts)
+
+
+def escape_label(value):
+    """转义Prometheus标签值中的特殊字符"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class CrawlMetrics:
+    """爬虫性能指标类（线程安全）"""
+
+    def __init__(self, textfile, crawler, interval=15, refresh=2):
+        """
+        textfile 为Prometheus文本文件路径，每隔 interval 秒原子覆盖一次；
+        refresh 为实时进度视图的刷新间隔（秒）
+        """
+        self.textfile = Path(textfile)
+        self.crawler = crawler
+        self.interval = interval
+        self.refresh = refresh
+
+        self.started = time.monotonic()
+        self.started_at = time.time()
+        self.hosts = {}
+        self.images = {}
+        self._gauges = {}
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._live = False
+        self._drawn_lines = 0
+
+    def _series(self, url):
+        """获取（必要时创建）URL所属主机的统计，调用方需持有锁"""
+        host = urlparse(url).netloc.lower()
+        series = self.hosts.get(host)
+        if series is None:
+            series = self.hosts[host] = HostSeries(engine_of(host))
+        return series
+
+    def observe_request(self, url, status_code, latency):
+        """记录一次请求的状态码和延迟（到收到响应头为止），status_code 为 None 表示请求异常"""
+        with self._lock:
+            self._series(url).observe(status_class(status_code), latency)
+
+    def add_bytes(self, url, count):
+        """记录从主机收到的正文字节数"""
+        with self._lock:
+            self._series(url).bytes += count
+
+    def record_image(self, category):
+        """记录一张成功入库的图片"""
+        with self._lock:
+            self.images[category] = self.images.get(category, 0) + 1
+
+    def register_gauge(self, name, help_text, func):
+        """登记一个在输出时才读取当前值的指标，如队列深度"""
+        with self._lock:
+            self._gauges[name] = (help_text, func)
+
+    def _elapsed(self):
+        """已运行的秒数"""
+        return max(time.monotonic() - self.started, 1e-6)
+
+    def render(self):
+        """生成Prometheus文本格式的指标"""
+        crawler = escape_label(self.crawler)
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            hosts = sorted(self.hosts.items())
+            images = sorted(self.images.items())
+            gauges = sorted(self._gauges.items())
+
+            header('crawler_request_duration_seconds', 'histogram', "请求延迟（到收到响应头为止）")
+            for host, series in hosts:
+                labels = f'crawler="{crawler}",engine="{series.engine}",host="{escape_label(host)}"'
+                cumulative = 0
+                for bound, bucket in zip(LATENCY_BUCKETS, series.buckets):
+                    cumulative += bucket
+                    lines.append(f'crawler_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'crawler_request_duration_seconds_bucket{{{labels},le="+Inf"}} {series.count}')
+                lines.append(f'crawler_request_duration_seconds_sum{{{labels}}} {series.latency_sum:.6f}')
+                lines.append(f'crawler_request_duration_seconds_count{{{labels}}} {series.count}')
+
+            header('crawler_requests_total', 'counter', "按状态码类别统计的请求数")
+            for host, series in hosts:
+                labels = f'crawler="{crawler}",engine="{series.engine}",host="{escape_label(host)}"'
+                for status, count in sorted(series.statuses.items()):
+                    lines.append(f'crawler_requests_total{{{labels},status="{status}"}} {count}')
+
+            header('crawler_response_bytes_total', 'counter', "收到的正文字节数")
+            for host, series in hosts:
+                labels = f'crawler="{crawler}",engine="{series.engine}",host="{escape_label(host)}"'
+                lines.append(f'crawler_response_bytes_total{{{labels}}} {series.bytes}')
+
+            header('crawler_images_total', 'counter', "按分类统计的入库图片数")
+            for category, count in images:
+                lines.append(f'crawler_images_total{{crawler="{crawler}",category="{escape_label(category)}"}} {count}')
+
+            header('crawler_images_per_minute', 'gauge', "本次运行按分类平均每分钟入库的图片数")
+            minutes = self._elapsed() / 60
+            for category, count in images:
+                lines.append(
+                    f'crawler_images_per_minute{{crawler="{crawler}",category="{escape_label(category)}"}} '
+                    f'{count / minutes:.3f}'
+                )
+
+        for name, (help_text, func) in gauges:
+            header(name, 'gauge', help_text)
+            lines.append(f'{name}{{crawler="{crawler}"}} {func()}')
+
+        header('crawler_start_time_seconds', 'gauge', "本次运行的开始时间（Unix时间戳）")
+        lines.append(f'crawler_start_time_seconds{{crawler="{crawler}"}} {self.started_at:.0f}')
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self):
+        """把指标写入文本文件，先写临时文件再原子替换，收集器不会读到写了一半的文件"""
+        self.textfile.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.textfile.with_name(f".{self.textfile.name}.part")
+        temp_path.write_text(self.render(), encoding='utf-8')
+        os.replace(temp_path, self.textfile)
+
+    def engine_summary(self):
+        """按搜索引擎汇总请求数、成功率、4xx/5xx比例、延迟分位数、耗时和流量"""
+        engines = {}
+        with self._lock:
+            for series in self.hosts.values():
+                entry = engines.setdefault(series.engine, {
+                    'requests': 0, 'statuses': {}, 'buckets': [0] * len(LATENCY_BUCKETS),
+                    'count': 0, 'latency_sum': 0.0, 'bytes': 0,
+                })
+                for status, count in series.statuses.items():
+                    entry['statuses'][status] = entry['statuses'].get(status, 0) + count
+                    entry['requests'] += count
+                entry['buckets'] = [a + b for a, b in zip(entry['buckets'], series.buckets)]
+                entry['count'] += series.count
+                entry['latency_sum'] += series.latency_sum
+                entry['bytes'] += series.bytes
+
+        elapsed = self._elapsed()
+        summary = {}
+        for engine, entry in sorted(engines.items()):
+            requests = entry['requests'] or 1
+            statuses = entry['statuses']
+            p50 = quantile(entry['buckets'], entry['count'], 0.5)
+            p95 = quantile(entry['buckets'], entry['count'], 0.95)
+            summary[engine] = {
+                "请求数": entry['requests'],
+                "成功率": round(statuses.get('2xx', 0) / requests, 3),
+                "4xx比例": round(statuses.get('4xx', 0) / requests, 3),
+                "5xx比例": round(statuses.get('5xx', 0) / requests, 3),
+                "异常比例": round(statuses.get('error', 0) / requests, 3),
+                "P50延迟(秒)": p50,
+                "P95延迟(秒)": p95,
+                "请求耗时(秒)": round(entry['latency_sum'], 1),
+                "流量(MB)": round(entry['bytes'] / (1024 * 1024), 2),
+                "速度(KB/秒)": round(entry['bytes'] / 1024 / elapsed, 1),
+            }
+        return summary
+
+    def slowest_hosts(self, limit=TOP_HOSTS):
+        """请求总耗时最多的主机，返回 [(主机, 总耗时, 请求数)]"""
+        with self._lock:
+            hosts = [(host, series.latency_sum, series.count) for host, series in self.hosts.items()]
+        return sorted(hosts, key=lambda item: item[1], reverse=True)[:limit]
+
+    def render_progress(self):
+        """生成终端进度视图的文本行"""
+        elapsed = self._elapsed()
+        minutes, seconds = divmod(int(elapsed), 60)
+        with self._lock:
+            gauges = sorted(self._gauges.items())
+            images = sorted(self.images.items())
+        gauge_text = "  ".join(f"{help_text} {func()}" for _, (help_text, func) in gauges)
+
+        lines = [f"📊 {self.crawler} 运行 {minutes}分{seconds:02d}秒  {gauge_text}".rstrip()]
+        widths = (12, 7, 8, 7, 7, 8, 8, 9, 9)
+        lines.append(format_row(("引擎", "请求", "成功", "4xx", "5xx", "P50", "P95", "耗时", "KB/秒"), widths))
+        for engine, stats in self.engine_summary().items():
+            latency = [f"{value}s" if value is not None else "-"
+                       for value in (stats['P50延迟(秒)'], stats['P95延迟(秒)'])]
+            lines.append(format_row((
+                engine, str(stats['请求数']), f"{stats['成功率']:.1%}", f"{stats['4xx比例']:.1%}",
+                f"{stats['5xx比例']:.1%}", *latency, f"{stats['请求耗时(秒)']}s", str(stats['速度(KB/秒)'])
+            ), widths))
+
+        slowest = self.slowest_hosts()
+        if slowest:
+            lines.append("耗时最多的主机: " + "，".join(
+                f"{host} {total:.0f}s/{count}次" for host, total, count in slowest
+            ))
+
+        if images:
+            lines.append("入库图片: " + "，".join(
+                f"{category} {count}张 ({count / (elapsed / 60):.1f}/分钟)" for category, count in images
+            ))
+        return lines
+
+    def _draw(self):
+        """刷新终端进度视图；输出到终端时原地覆盖上一次的内容"""
+        lines = self.render_progress()
+        if sys.stdout.isatty():
+            if self._drawn_lines:
+                # 光标上移到上一次视图的开头并清除到屏幕末尾
+                sys.stdout.write(f"\x1b[{self._drawn_lines}F\x1b[J")
+            self._drawn_lines = len(lines)
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+
+    def _run(self):
+        """后台线程：定期写指标文件，启用时刷新进度视图"""
+        next_write = 0.0
+        while True:
+            stopped = self._stopped.wait(self.refresh if self._live else self.interval)
+            now = time.monotonic()
+            try:
+                if stopped or now >= next_write:
+                    self.write_textfile()
+                    next_write = now + self.interval
+                if self._live:
+                    self._draw()
+            except Exception as e:
+                logging.warning(f"性能指标输出失败: {e}")
+            if stopped:
+                return
+
+    def start(self, live=False):
+        """启动后台输出线程，live 为 True 时在终端实时显示进度视图"""
+        self._live = live
+        self.started = time.monotonic()
+        self.started_at = time.time()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="crawl-metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台线程，并最后写一次指标文件"""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        logging.info(f"性能指标已写入: {self.textfile}")
+
+    def get_stats(self):
+        """获取按搜索引擎汇总的性能指标，写入下载报告"""
+        return {
+            "引擎": self.engine_summary(),
+            "耗时最多的主机": {host: round(total, 1) for host, total, _ in self.slowest_hosts()},
+            "入库图片": dict(self.images),
+            "指标文件": str(self.textfile),
+        }
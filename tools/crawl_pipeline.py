@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜索→下载流水线
+搜索线程把候选图片放入有界队列，下载线程从队列取出并下载，两个阶段的等待时间互相重叠；
+队列满时搜索线程会等待（背压），运行中定期输出队列深度和各阶段吞吐量
+"""
+
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+
+
+class CrawlPipeline:
+    """搜索→下载流水线类"""
+
+    def __init__(self, engine, search_workers=2, queue_size=32, report_interval=30, metrics=None,
+                 progress_interval=5.0):
+        self.engine = engine
+        self.search_workers = search_workers
+        self.download_workers = engine.max_workers
+        self.queue_size = queue_size
+        self.report_interval = report_interval
+        self.progress_interval = progress_interval  # 没有关键词完成时，两次保存进度的最短间隔（秒）
+        self.metrics = metrics
+
+        self.tasks = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._reset_stats()
+
+        if metrics is not None:
+            metrics.register_gauge('crawler_queue_depth', "下载队列深度", self.tasks.qsize)
+
+    def _reset_stats(self):
+        """重置运行统计"""
+        self.started = time.monotonic()
+        self.keywords_searched = 0
+        self.candidates_queued = 0
+        self.downloads_done = 0
+        self.downloads_ok = 0
+        self.max_queue_depth = 0
+
+    def run(self, keywords, completed, search, plan, download,
+            on_result=None, should_stop=None, on_progress=None, pick=None):
+        """
+        运行流水线
+
+        completed 为已完成的关键词序号集合（从检查点恢复时跳过这些关键词）；
+        search(keyword) 返回候选图片列表；plan(keyword, img_info) 返回下载任务字典或 None
+        （在流水线锁内调用，可安全修改计数）；download(url, filename, save_dir) 返回是否成功；
+        on_result(task, success) 和 should_stop() 同样在锁内调用；
+        on_progress(completed) 在有关键词完成时、有新结果时（至多每 progress_interval 秒一次）
+        以及结束时调用，用于保存检查点；
+        pick(candidates) 从尚未搜索的关键词序号中选出下一个，返回 None 表示暂时没有值得搜索的关键词，
+        默认按顺序选择
+        """
+        self._reset_stats()
+        self._stopped.clear()
+        should_stop = should_stop or (lambda: False)
+        pick = pick or (lambda candidates: candidates[0] if candidates else None)
+
+        completed = set(completed)
+        remaining = [index for index in range(len(keywords)) if index not in completed]
+        pending = {}      # 关键词序号 -> 尚未完成的下载任务数
+        searched = set()  # 已完成搜索、但下载尚未全部结束的关键词序号
+        changed = threading.Condition(self._lock)
+        last_progress = time.monotonic()
+
+        def save_progress():
+            """保存进度，调用方需持有锁"""
+            nonlocal last_progress
+            if on_progress:
+                on_progress(sorted(completed))
+            last_progress = time.monotonic()
+
+        def finish(index):
+            """
+            关键词搜索和下载都已结束时记为完成并保存进度，调用方需持有锁；
+            其他下载结果按时间间隔合并保存，不必每张图片都重写检查点
+            """
+            if index in searched and pending.get(index, 0) == 0:
+                searched.discard(index)
+                pending.pop(index, None)
+                completed.add(index)
+                save_progress()
+            elif time.monotonic() - last_progress >= self.progress_interval:
+                save_progress()
+
+        def next_index():
+            """选出下一个要搜索的关键词，没有可选关键词时等待下载结果再试，调用方需持有锁"""
+            while True:
+                if should_stop() or not remaining:
+                    return None
+                index = pick(remaining)
+                if index is not None:
+                    remaining.remove(index)
+                    return index
+                # 暂时没有值得搜索的关键词；若仍有关键词在搜索或下载，其结果可能释放名额
+                if not pending:
+                    return None
+                changed.wait(timeout=1.0)
+
+        def search_worker():
+            while True:
+                with self._lock:
+                    index = next_index()
+                    if index is None:
+                        return
+                    pending[index] = 0
+
+                keyword = keywords[index]
+                logging.info(f"搜索关键词: {keyword}")
+                try:
+                    images = search(keyword)
+                except Exception as e:
+                    logging.error(f"搜索出错 {keyword}: {e}")
+                    images = []
+
+                for img_info in images:
+                    with self._lock:
+                        if should_stop():
+                            break
+                        task = plan(keyword, img_info)
+                        if task is None:
+                            continue
+                        task['keyword_index'] = index
+                        pending[index] += 1
+                        self.candidates_queued += 1
+                    # 队列满时在这里等待，形成背压
+                    self.tasks.put(task)
+                    self.max_queue_depth = max(self.max_queue_depth, self.tasks.qsize())
+
+                with self._lock:
+                    searched.add(index)
+                    self.keywords_searched += 1
+                    finish(index)
+                    changed.notify_all()
+
+        def download_worker():
+            while True:
+                task = self.tasks.get()
+                if task is None:
+                    return
+                with self._lock:
+                    stopping = should_stop()
+                try:
+                    # 已满足停止条件（如爬取预算用尽）时，队列中剩余的任务不再下载
+                    success = False if stopping else self.engine.run_task(download, task)
+                except Exception as e:
+                    logging.error(f"下载任务异常 {task['url']}: {e}")
+                    success = False
+                if success and self.metrics is not None:
+                    self.metrics.record_image(task.get('category') or Path(task['save_dir']).name)
+                with self._lock:
+                    self.downloads_done += 1
+                    if success:
+                        self.downloads_ok += 1
+                    if on_result:
+                        on_result(task, success)
+                    pending[task['keyword_index']] -= 1
+                    finish(task['keyword_index'])
+                    changed.notify_all()
+
+        def monitor():
+            while not self._stopped.wait(self.report_interval):
+                self.log_stats()
+
+        searchers = [threading.Thread(target=search_worker, name=f"search-{i}", daemon=True)
+                     for i in range(self.search_workers)]
+        downloaders = [threading.Thread(target=download_worker, name=f"download-{i}", daemon=True)
+                       for i in range(self.download_workers)]
+        monitor_thread = threading.Thread(target=monitor, name="pipeline-monitor", daemon=True)
+
+        for thread in searchers + downloaders + [monitor_thread]:
+            thread.start()
+        try:
+            for thread in searchers:
+                self._join(thread)
+            # 搜索结束后通知下载线程退出
+            for _ in downloaders:
+                self.tasks.put(None)
+            for thread in downloaders:
+                self._join(thread)
+        finally:
+            self._stopped.set()
+            # 保存最后一次间隔内的结果，中断时也不丢失
+            with self._lock:
+                save_progress()
+        self.log_stats()
+
+    def _join(self, thread):
+        """等待线程结束，同时保持主线程可以响应 Ctrl+C"""
+        while thread.is_alive():
+            thread.join(timeout=0.5)
+
+    def get_stats(self):
+        """获取流水线运行统计"""
+        minutes = max(time.monotonic() - self.started, 1e-6) / 60
+        return {
+            "已搜索关键词": self.keywords_searched,
+            "排队候选图片": self.candidates_queued,
+            "已完成下载": self.downloads_done,
+            "下载成功": self.downloads_ok,
+            "当前队列深度": self.tasks.qsize(),
+            "最大队列深度": self.max_queue_depth,
+            "队列容量": self.queue_size,
+            "搜索速度(关键词/分钟)": round(self.keywords_searched / minutes, 2),
+            "下载速度(张/分钟)": round(self.downloads_ok / minutes, 2),
+        }
+
+    def log_stats(self):
+        """在日志中输出队列深度和各阶段吞吐量"""
+        stats = self.get_stats()
+        logging.info(
+            f"流水线状态: 队列 {stats['当前队列深度']}/{self.queue_size}，"
+            f"已搜索 {stats['已搜索关键词']} 个关键词 ({stats['搜索速度(关键词/分钟)']}/分钟)，"
+            f"已下载 {stats['下载成功']}/{stats['已完成下载']} 张 ({stats['下载速度(张/分钟)']}/分钟)"
+        )
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发下载引擎
+供各个图片爬虫的下载线程共用，按主机限制并发数，保持对单个站点的礼貌访问
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+
+# 单张图片默认大小上限（字节）
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+
+# 流式写入的分块大小（字节）
+CHUNK_SIZE = 64 * 1024
+
+# 下载和入库时写入的隐藏临时文件
+SPOOL_PATTERN = '.*.part'
+
+# 超过该时间（秒）没有写入的临时文件视为进程中断后的残留；正在写入的文件会不断更新修改时间
+STALE_SPOOL_SECONDS = 3600
+
+# 常见图片格式的文件头
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+    (b'BM', '.bmp'),
+)
+
+# 不说明具体格式的通用类型，需要靠文件头判断
+GENERIC_CONTENT_TYPES = ('application/octet-stream', 'binary/octet-stream')
+
+# 预检拒绝原因
+REJECT_NOT_IMAGE = "不是图片"
+REJECT_TOO_LARGE = "超过大小上限"
+REJECT_BAD_MAGIC = "文件头不是图片格式"
+
+# 任务中存在时作为关键字参数传给下载函数的可选字段
+TASK_OPTIONAL_FIELDS = ('thumb_url', 'keyword')
+
+
+def sniff_image_type(head):
+    """根据文件头判断图片格式，返回扩展名；不是已知图片格式时返回 None"""
+    for signature, ext in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return '.webp'
+    return None
+
+
+def declared_length(response):
+    """响应头中声明的正文长度，未声明时返回 None"""
+    content_length = response.headers.get('content-length', '')
+    return int(content_length) if content_length.isdigit() else None
+
+
+class DownloadEngine:
+    """并发下载引擎类"""
+
+    def __init__(self, max_workers=8, max_per_host=2, max_bytes=DEFAULT_MAX_BYTES, metrics=None, budget=None):
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.max_bytes = max_bytes
+        self.metrics = metrics  # 可选的 CrawlMetrics，记录流式读取的字节数
+        self.budget = budget    # 可选的 CrawlBudget，流式读取的字节数计入下载流量
+
+        # 每个主机一个信号量，限制同时访问该主机的线程数
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+        # 预检统计：各拒绝原因的次数，以及因提前断开而未下载的字节数
+        self.rejections = {}
+        self.saved_bytes = 0
+
+    def configure_session(self, session):
+        """扩大会话的连接池，使其与工作线程数匹配"""
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def get_host(self, url):
+        """获取URL对应的主机名"""
+        return urlparse(url).netloc.lower()
+
+    def host_slot(self, url):
+        """获取主机对应的并发信号量"""
+        host = self.get_host(url)
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.max_per_host)
+                self._host_slots[host] = slot
+            return slot
+
+    def preflight(self, response):
+        """
+        读取正文前根据响应头检查流式响应，返回拒绝原因或 None
+
+        Content-Type 明确不是图片、或 Content-Length 超过 max_bytes 时拒绝，调用方关闭响应即可断开连接；
+        未声明类型或只声明为通用二进制类型时放行，交给 spool_stream 按文件头判断
+        """
+        content_type = response.headers.get('content-type', '').split(';')[0].strip().lower()
+        if content_type and not content_type.startswith('image/') and content_type not in GENERIC_CONTENT_TYPES:
+            self._reject(REJECT_NOT_IMAGE, declared_length(response))
+            return REJECT_NOT_IMAGE
+
+        length = declared_length(response)
+        if length is not None and length > self.max_bytes:
+            self._reject(REJECT_TOO_LARGE, length)
+            return REJECT_TOO_LARGE
+        return None
+
+    def _reject(self, reason, unread_bytes=None):
+        """记录一次预检拒绝和因此未下载的字节数"""
+        with self._lock:
+            self.rejections[reason] = self.rejections.get(reason, 0) + 1
+            if unread_bytes:
+                self.saved_bytes += unread_bytes
+
+    def _check_chunk(self, response, chunk, received, length):
+        """检查流式读取的一块数据并计入流量，返回拒绝原因或 None；received 为加上本块后已读取的字节数"""
+        if self.metrics is not None:
+            self.metrics.add_bytes(response.url, len(chunk))
+        if self.budget is not None:
+            self.budget.add_bytes(len(chunk))
+        if received == len(chunk) and chunk and sniff_image_type(chunk) is None:
+            logging.warning(f"文件头不是图片格式，中止下载: {response.url}")
+            self._reject(REJECT_BAD_MAGIC, max(length - received, 0) if length else None)
+            return REJECT_BAD_MAGIC
+        if received > self.max_bytes:
+            logging.warning(f"图片超过大小上限，中止下载: {response.url}")
+            self._reject(REJECT_TOO_LARGE)
+            return REJECT_TOO_LARGE
+        return None
+
+    def spool_stream(self, response, directory):
+        """
+        把流式响应分块写入目录中的隐藏临时文件，返回临时文件路径；正文不在内存中累积，
+        内存占用与图片大小无关，校验通过后再由入库处理保存，临时文件由入库处理删除
+
+        应先调用 preflight 检查响应头；第一块数据的文件头不是图片格式、或超过 max_bytes 时
+        立即中止并删除临时文件，返回 None
+        """
+        length = declared_length(response)
+
+        # 临时文件放在保存目录中，按原样保存的图片可以原子重命名到位
+        fd, temp_path = tempfile.mkstemp(prefix=".download_", suffix=".part", dir=directory)
+        received = 0
+        completed = False
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    received += len(chunk)
+                    if self._check_chunk(response, chunk, received, length):
+                        break
+                    f.write(chunk)
+                else:
+                    completed = True
+        finally:
+            if not completed and os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+        return Path(temp_path) if completed else None
+
+    def sweep_spool_files(self, directory, max_age=STALE_SPOOL_SECONDS):
+        """
+        删除目录中进程被终止后残留的临时文件（.download_*.part 和入库时的 .*.part），返回删除数量；
+        其他进程可能正在使用同一目录，只删除超过 max_age 秒没有修改的文件
+        """
+        cutoff = time.time() - max_age
+        removed = 0
+        for temp_path in Path(directory).rglob(SPOOL_PATTERN):
+            try:
+                if temp_path.is_file() and temp_path.stat().st_mtime < cutoff:
+                    temp_path.unlink()
+                    removed += 1
+            except OSError as e:
+                logging.warning(f"删除残留临时文件失败 {temp_path}: {e}")
+        if removed:
+            logging.info(f"删除了 {removed} 个残留的下载临时文件: {directory}")
+        return removed
+
+    def unique_path(self, filepath):
+        """文件名已被占用时，在文件名后追加序号"""
+        candidate = filepath
+        index = 2
+        while candidate.exists():
+            candidate = filepath.with_name(f"{filepath.stem}_{index}{filepath.suffix}")
+            index += 1
+        return candidate
+
+    def run_task(self, download_func, task):
+        """
+        在主机并发限制内执行单个下载任务；任务带有缩略图地址时一并传入，供下载前筛选，
+        带有搜索关键词时一并传入，供写入图片目录
+        """
+        # 爬取预算不再允许请求该主机时直接放弃，不再逐个请求失败
+        if self.budget is not None and not self.budget.allows_url(task['url']):
+            return False
+        kwargs = {field: task[field] for field in TASK_OPTIONAL_FIELDS if task.get(field)}
+        with self.host_slot(task['url']):
+            return download_func(task['url'], task['filename'], task['save_dir'], **kwargs)
+
+    def get_stats(self):
+        """获取下载预检统计"""
+        with self._lock:
+            return {
+                "预检拒绝": dict(self.rejections),
+                "节省流量(MB)": round(self.saved_bytes / (1024 * 1024), 2),
+            }
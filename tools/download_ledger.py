@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+下载记录
+用SQLite保存已下载图片的规范化URL和内容哈希，请求前先查询，避免重复下载
+"""
+
+import time
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from shared_db import FileLock, connect_shared
+
+# 记录状态
+STATUS_OK = 'ok'                # 已保存为图片文件
+STATUS_DUPLICATE = 'duplicate'  # 与同一目录中的已有图片相同或近似，未单独保存
+STATUS_REJECTED = 'rejected'    # 不是图片或超过大小上限
+
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+
+def normalize_url(url):
+    """规范化URL：小写协议和主机、去掉默认端口和锚点、排序查询参数"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    host, _, port = netloc.rpartition(':')
+    if host and DEFAULT_PORTS.get(scheme) == port:
+        netloc = host
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or '/', query, ''))
+
+
+class DownloadLedger:
+    """下载记录类（线程安全）"""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.root = self.db_path.parent
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        # 多个进程可能同时使用同一个图片目录，加锁方式和日志模式见 shared_db
+        self._lock = FileLock(self.db_path)
+        self.conn = connect_shared(self.db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS downloads (
+                url TEXT PRIMARY KEY,
+                sha256 TEXT,
+                path TEXT,
+                size INTEGER,
+                status TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_downloads_sha256 ON downloads(sha256)")
+        self.conn.commit()
+
+    def _relative(self, filepath):
+        """把文件路径转换为相对于记录库目录的路径"""
+        try:
+            return Path(filepath).resolve().relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return str(filepath)
+
+    def _exists(self, path):
+        """检查记录中的文件是否仍然存在"""
+        return path is not None and (self.root / path).exists()
+
+    def is_known(self, url):
+        """URL是否已处理过：已判定无效，或对应的图片文件仍然存在"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT status, path FROM downloads WHERE url = ?", (normalize_url(url),)
+            ).fetchone()
+        if row is None:
+            return False
+        status, path = row
+        return status == STATUS_REJECTED or self._exists(path)
+
+    def record(self, url, filepath, sha256, size):
+        """
+        记录一次成功下载
+
+        如果同一目录中已有相同内容的文件，记为重复并返回已有文件路径；否则返回 None。
+        其他目录中的相同内容不算重复，由内容库（content_store）共用同一份数据
+        """
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
+        relative = self._relative(filepath)
+        with self._lock, self.conn:
+            existing = None
+            for (path,) in self.conn.execute(
+                "SELECT path FROM downloads WHERE sha256 = ? AND status = ?", (sha256, STATUS_OK)
+            ):
+                if Path(path).parent == Path(relative).parent and self._exists(path):
+                    existing = path
+                    break
+
+            status = STATUS_DUPLICATE if existing else STATUS_OK
+            self.conn.execute(
+                "INSERT OR REPLACE INTO downloads (url, sha256, path, size, status, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), sha256, existing or relative, size, status, now)
+            )
+        return existing
+
+    def mark_duplicate(self, url, existing_path):
+        """记录与已有图片近似重复的URL，下次不再请求"""
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO downloads (url, path, status, updated_at) VALUES (?, ?, ?, ?)",
+                (normalize_url(url), existing_path, STATUS_DUPLICATE, now)
+            )
+
+    def mark_rejected(self, url):
+        """记录无效URL，下次不再请求"""
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO downloads (url, status, updated_at) VALUES (?, ?, ?)",
+                (normalize_url(url), STATUS_REJECTED, now)
+            )
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self.conn.close()
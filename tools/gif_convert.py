@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GIF动图转换工具
+把GIF动图转为体积小得多的动画WebP，可选再生成无声MP4/WebM（需要系统安装ffmpeg）；
+还可以把章节HTML中引用GIF的 <img> 改为 <picture>，优先加载WebP，不支持时回退到原GIF。
+转换结果在GIF文件名后追加扩展名（如 猫.gif.webp），不会覆盖或误用同名的其他图片
+"""
+
+import argparse
+import logging
+import re
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from PIL import Image, ImageSequence
+
+# 默认动画WebP质量
+DEFAULT_QUALITY = 75
+
+# 各视频格式的ffmpeg编码参数（无声、循环播放用）
+VIDEO_CODECS = {
+    'mp4': ['-c:v', 'libx264', '-crf', '28', '-pix_fmt', 'yuv420p', '-movflags', '+faststart'],
+    'webm': ['-c:v', 'libvpx-vp9', '-crf', '40', '-b:v', '0'],
+}
+
+# 转换结果的扩展名：追加在GIF文件名之后
+CONVERTED_SUFFIXES = ('.webp', '.mp4', '.webm')
+
+# 章节中引用GIF的 <img> 标签
+GIF_IMG_PATTERN = re.compile(r'<img\b[^>]*?\bsrc=(["\'])([^"\']+?\.gif)\1[^>]*>', re.IGNORECASE)
+
+
+def converted_path(gif_path, suffix='.webp'):
+    """GIF的转换结果路径：猫.gif → 猫.gif.webp"""
+    gif_path = Path(gif_path)
+    return gif_path.with_name(gif_path.name + suffix)
+
+
+def is_converted(path):
+    """是否为批量转换生成的文件（原GIF仍在旁边）；图片目录和感知哈希索引只计原GIF，不重复计算"""
+    name = Path(path).name.lower()
+    return (any(name.endswith('.gif' + suffix) for suffix in CONVERTED_SUFFIXES) and
+            Path(path).with_suffix('').exists())
+
+
+def save_animated_webp(image, dest, quality=DEFAULT_QUALITY, max_edge=None):
+    """把已打开的动图逐帧写成动画WebP，保留每帧时长和循环次数；max_edge 不为 None 时同时缩小"""
+    frames = []
+    durations = []
+    for frame in ImageSequence.Iterator(image):
+        durations.append(frame.info.get('duration', 100))
+        frame = frame.convert('RGBA')
+        if max_edge:
+            frame.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        frames.append(frame)
+
+    frames[0].save(
+        dest, 'WEBP', save_all=True, append_images=frames[1:],
+        duration=durations, loop=image.info.get('loop', 0), quality=quality, method=4
+    )
+
+
+def convert_video(gif_path, dest, video_format):
+    """用ffmpeg把GIF转为无声视频，成功时返回 True"""
+    command = [
+        'ffmpeg', '-y', '-loglevel', 'error', '-i', str(gif_path), '-an',
+        # 多数编码器要求宽高为偶数
+        '-vf', 'scale=trunc(iw/2)*2:trunc(ih/2)*2',
+        *VIDEO_CODECS[video_format], str(dest)
+    ]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        logging.warning(f"视频转换失败 {gif_path}: {result.stderr.strip()}")
+        return False
+    return True
+
+
+def convert_gif(gif_path, quality=DEFAULT_QUALITY, video_format=None, force=False):
+    """
+    在GIF旁边生成 GIF文件名.webp（以及可选的 .mp4/.webm），原GIF保留作回退
+
+    目标文件比GIF新时跳过（force 为 True 时重新生成）；返回 (GIF大小, 生成的文件路径列表)
+    """
+    gif_path = Path(gif_path)
+    outputs = []
+
+    webp_path = converted_path(gif_path)
+    if force or not webp_path.exists() or webp_path.stat().st_mtime < gif_path.stat().st_mtime:
+        with Image.open(gif_path) as image:
+            save_animated_webp(image, webp_path, quality)
+    outputs.append(str(webp_path))
+
+    if video_format:
+        video_path = converted_path(gif_path, f'.{video_format}')
+        if force or not video_path.exists() or video_path.stat().st_mtime < gif_path.stat().st_mtime:
+            if convert_video(gif_path, video_path, video_format):
+                outputs.append(str(video_path))
+        else:
+            outputs.append(str(video_path))
+
+    return gif_path.stat().st_size, outputs
+
+
+def rewrite_html(html_path):
+    """
+    把引用GIF、且旁边已有转换生成的WebP的 <img> 改为 <picture>，返回修改的标签数
+
+    已经位于 <picture> 中的标签不重复处理
+    """
+    html_path = Path(html_path)
+    content = html_path.read_text(encoding='utf-8')
+    changed = 0
+
+    def replace(match):
+        nonlocal changed
+        src = match.group(2)
+        prefix = content[max(0, match.start() - 200):match.start()]
+        if re.search(r'<source\b[^>]*>\s*$', prefix, re.IGNORECASE):
+            return match.group(0)
+        if not converted_path(html_path.parent / src).exists():
+            return match.group(0)
+        changed += 1
+        webp_src = src + '.webp'
+        return f'<picture><source srcset="{webp_src}" type="image/webp">{match.group(0)}</picture>'
+
+    new_content = GIF_IMG_PATTERN.sub(replace, content)
+    if changed:
+        html_path.write_text(new_content, encoding='utf-8')
+    return changed
+
+
+def main():
+    """批量转换GIF动图，并可选更新章节HTML中的引用"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="把GIF动图转为动画WebP（可选MP4/WebM）")
+    parser.add_argument('directories', nargs='*', default=['images', 'cache/unused_images_backup'],
+                        help="要扫描的目录（默认 images 和 cache/unused_images_backup）")
+    parser.add_argument('--quality', type=int, default=DEFAULT_QUALITY,
+                        help=f"动画WebP质量（默认 {DEFAULT_QUALITY}）")
+    parser.add_argument('--video', choices=sorted(VIDEO_CODECS), help="同时生成无声视频（需要ffmpeg）")
+    parser.add_argument('--force', action='store_true', help="重新生成已存在的文件")
+    parser.add_argument('--rewrite-html', metavar='DIR',
+                        help="把该目录下HTML中引用GIF的 <img> 改为带WebP的 <picture>")
+    args = parser.parse_args()
+
+    video_format = args.video
+    if video_format and shutil.which('ffmpeg') is None:
+        print("⚠️ 未找到ffmpeg，只生成动画WebP")
+        video_format = None
+
+    gif_files = []
+    for directory in args.directories:
+        if Path(directory).is_dir():
+            gif_files.extend(sorted(p for p in Path(directory).rglob('*') if p.suffix.lower() == '.gif'))
+    print(f"📂 找到 {len(gif_files)} 个GIF动图")
+
+    gif_bytes = 0
+    webp_bytes = 0
+    failed = 0
+    with ProcessPoolExecutor() as executor:
+        futures = {
+            executor.submit(convert_gif, gif_path, args.quality, video_format, args.force): gif_path
+            for gif_path in gif_files
+        }
+        # 单个GIF损坏或转换失败时记录下来，继续转换其他文件
+        for future in as_completed(futures):
+            gif_path = futures[future]
+            try:
+                size, outputs = future.result()
+            except Exception as e:
+                failed += 1
+                logging.error(f"转换失败 {gif_path}: {e}")
+                continue
+            webp_size = Path(outputs[0]).stat().st_size
+            gif_bytes += size
+            webp_bytes += webp_size
+            print(f"   {gif_path.name}: {size / 1024:.0f}KB → {webp_size / 1024:.0f}KB")
+
+    if gif_files:
+        print(f"✅ GIF共 {gif_bytes / (1024 * 1024):.2f}MB，动画WebP共 {webp_bytes / (1024 * 1024):.2f}MB")
+    if failed:
+        print(f"⚠️ {failed} 个GIF转换失败，详见日志")
+
+    if args.rewrite_html:
+        total = 0
+        for html_path in sorted(Path(args.rewrite_html).rglob('*.html')):
+            count = rewrite_html(html_path)
+            if count:
+                print(f"📝 {html_path}: 更新 {count} 处图片引用")
+            total += count
+        print(f"✅ 共更新 {total} 处图片引用")
+
+
+if __name__ == "__main__":
+    main()
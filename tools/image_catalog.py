@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片目录
+每张入库的图片在SQLite中记录一行：路径、内容哈希、尺寸、格式、大小、来源URL、搜索关键词、
+分类和爬取时间，下载时逐张写入；下载报告、未使用图片清理等工具直接查询目录，不再遍历文件夹
+"""
+
+import argparse
+import logging
+import os
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from content_store import file_sha256
+from gif_convert import is_converted
+from shared_db import FileLock, connect_shared
+
+# 收录的图片扩展名
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
+
+# 扫描目录时跳过的子目录（内容库和另存的原图）
+SKIP_DIRS = ('content_store', 'originals')
+
+# 下载报告中按格式统计的列，格式名与 Pillow 识别的名称对应
+REPORT_FORMATS = {"JPG": "JPEG", "PNG": "PNG", "GIF": "GIF", "WEBP": "WEBP"}
+
+
+def image_info(filepath):
+    """读取图片文件头，返回 (宽, 高, 格式)；无法识别时返回 (None, None, None)"""
+    try:
+        with Image.open(filepath) as image:
+            width, height = image.size
+            return width, height, image.format
+    except Exception as e:
+        logging.debug(f"无法识别图片格式 {filepath}: {e}")
+        return None, None, None
+
+
+class ImageCatalog:
+    """图片目录类（线程安全）"""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.root = self.db_path.parent
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.added = 0
+
+        # 多个进程可能同时使用同一个图片目录，加锁方式和日志模式见 shared_db
+        self._lock = FileLock(self.db_path)
+        self.conn = connect_shared(self.db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS images (
+                path TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                width INTEGER,
+                height INTEGER,
+                format TEXT,
+                size INTEGER NOT NULL,
+                url TEXT,
+                keyword TEXT,
+                category TEXT NOT NULL,
+                crawled_at TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_images_category ON images (category)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_images_sha256 ON images (sha256)")
+        self.conn.commit()
+
+    def _relative(self, filepath):
+        """把文件路径转换为相对于目录根的路径"""
+        try:
+            return Path(filepath).resolve().relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return str(Path(filepath).resolve())
+
+    def _prefix(self, directory):
+        """目录下所有文件共同的路径前缀，目录为根目录时返回空字符串"""
+        prefix = self._relative(directory)
+        return "" if prefix == "." else f"{prefix}/"
+
+    def add(self, filepath, sha256=None, url=None, keyword=None, category=None):
+        """
+        收录一张刚写入的图片（已收录时更新），category 默认取所在目录名
+
+        尺寸和格式只读取文件头，不解码整张图片
+        """
+        filepath = Path(filepath)
+        width, height, image_format = image_info(filepath)
+        row = (
+            self._relative(filepath), sha256 or file_sha256(filepath), width, height, image_format,
+            filepath.stat().st_size, url, keyword, category or filepath.parent.name,
+            time.strftime("%Y-%m-%d %H:%M:%S")
+        )
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO images "
+                "(path, sha256, width, height, format, size, url, keyword, category, crawled_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row
+            )
+            self.added += 1
+
+    def remove(self, filepath):
+        """从目录中删除一张图片的记录"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM images WHERE path = ?", (self._relative(filepath),))
+
+    def paths(self, directory=None):
+        """目录中收录的图片路径（相对于目录根），directory 为 None 时返回全部"""
+        prefix = self._prefix(directory) if directory is not None else ""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT path FROM images WHERE substr(path, 1, ?) = ? ORDER BY path",
+                (len(prefix), prefix)
+            ).fetchall()
+        return [path for (path,) in rows]
+
+    def category_summary(self, directory):
+        """按分类统计目录中的图片数量，返回 {分类: {"总数": n, "JPG": n, "PNG": n, "GIF": n, "WEBP": n}}"""
+        prefix = self._prefix(directory)
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT category, format, COUNT(*) FROM images WHERE substr(path, 1, ?) = ? "
+                "GROUP BY category, format ORDER BY category",
+                (len(prefix), prefix)
+            ).fetchall()
+
+        summary = {}
+        for category, image_format, count in rows:
+            stats = summary.setdefault(category, {"总数": 0, **{column: 0 for column in REPORT_FORMATS}})
+            stats["总数"] += count
+            for column, name in REPORT_FORMATS.items():
+                if image_format == name:
+                    stats[column] += count
+        return summary
+
+    def category_counts(self, directory, since=None):
+        """按分类统计目录中文件仍然存在的图片数量，since（"%Y-%m-%d %H:%M:%S"）不为空时只统计此后收录的"""
+        prefix = self._prefix(directory)
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT path, category FROM images WHERE substr(path, 1, ?) = ? AND crawled_at >= ?",
+                (len(prefix), prefix, since or "")
+            ).fetchall()
+
+        counts = {}
+        for path, category in rows:
+            if (self.root / path).exists():
+                counts[category] = counts.get(category, 0) + 1
+        return counts
+
+    def sync(self, directory):
+        """
+        把目录与文件系统对齐：收录新增或大小变化的图片，删除文件已不存在的记录，
+        返回 (收录数, 删除数)；用于手动整理过图片目录之后
+        """
+        directory = Path(directory)
+        prefix = self._prefix(directory)
+        with self._lock:
+            known = dict(self.conn.execute(
+                "SELECT path, size FROM images WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+            ).fetchall())
+
+        added = 0
+        seen = set()
+        for current, dirs, files in os.walk(directory):
+            dirs[:] = [name for name in dirs if name not in SKIP_DIRS]
+            for name in files:
+                filepath = Path(current) / name
+                # gif_convert 批量生成的 .gif.webp 与原GIF是同一张动图，只收录原GIF
+                if filepath.suffix.lower() not in IMAGE_SUFFIXES or is_converted(filepath):
+                    continue
+                path = self._relative(filepath)
+                seen.add(path)
+                if known.get(path) != filepath.stat().st_size:
+                    self.add(filepath)
+                    added += 1
+
+        missing = [(path,) for path in known if path not in seen]
+        with self._lock, self.conn:
+            self.conn.executemany("DELETE FROM images WHERE path = ?", missing)
+        return added, len(missing)
+
+    def get_stats(self):
+        """获取目录统计"""
+        with self._lock:
+            total, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM images").fetchone()
+        return {
+            "收录图片": total,
+            "本次收录": self.added,
+            "总大小(MB)": round(size / (1024 * 1024), 2),
+        }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self.conn.close()
+
+
+def main():
+    """把已有图片收录进目录，并按分类输出统计"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="图片目录：收录已有图片并按分类统计")
+    parser.add_argument('images_dir', nargs='?', default='images', help="图片根目录（默认 images）")
+    args = parser.parse_args()
+
+    images_dir = Path(args.images_dir)
+    catalog = ImageCatalog(images_dir / "image_catalog.db")
+
+    added, removed = catalog.sync(images_dir)
+    print(f"收录图片 {added} 张，删除失效记录 {removed} 条")
+
+    for category, stats in catalog.category_summary(images_dir).items():
+        print(f"  📁 {category}: {stats['总数']} 张")
+    stats = catalog.get_stats()
+    print(f"共 {stats['收录图片']} 张，{stats['总大小(MB)']}MB")
+
+    catalog.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片入库处理
+流式下载到临时文件的图片在进程池中完整解码校验、检查尺寸和长宽比，合格的图片把最长边缩小到上限、
+转为WebP并去掉EXIF等元数据后才保存，可选把原图另存一份；不合格的图片只删除临时文件，不会保存。
+GIF动图转为动画WebP，其他格式的动图保持原样
+"""
+
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from PIL import Image, ImageOps, ImageSequence
+
+from content_store import file_sha256
+from gif_convert import save_animated_webp
+
+# 默认最长边（像素），章节中的图片按200像素显示，留出高分屏的余量
+DEFAULT_MAX_EDGE = 800
+
+# 默认WebP质量
+DEFAULT_QUALITY = 80
+
+# 默认短边下限（像素），过滤1×1跟踪像素和图标
+DEFAULT_MIN_SIDE = 100
+
+# 默认长宽比上限，过滤横幅和长截图
+DEFAULT_MAX_ASPECT = 4.0
+
+# 拒绝原因
+REJECT_UNDECODABLE = "无法解码"
+REJECT_TOO_SMALL = "尺寸过小"
+REJECT_BAD_ASPECT = "比例异常"
+
+
+class IngestRejected(Exception):
+    """图片未通过入库校验，args[0] 为拒绝原因"""
+
+
+def _write_atomic(path, data):
+    """先写临时文件再原子替换"""
+    temp_path = path.with_name(f".{path.name}.part")
+    try:
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+def _copy_atomic(source, path):
+    """先复制到临时文件再原子替换"""
+    temp_path = path.with_name(f".{path.name}.part")
+    try:
+        shutil.copyfile(source, temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+def normalize_image(source_path, filepath, max_edge, quality, min_side, max_aspect, original_path=None):
+    """
+    校验并规范化一张图片（在子进程中执行）
+
+    source_path 为下载到的临时文件，filepath 为原本要保存的路径；校验通过后写入磁盘并返回
+    (实际保存路径, 文件大小, 内容SHA-256)，未通过时抛出 IngestRejected，不写入任何文件。
+    按原样保存的动图直接把临时文件重命名为目标文件，其余情况临时文件保持不变
+    """
+    source_path = Path(source_path)
+    filepath = Path(filepath)
+    try:
+        with Image.open(source_path) as image:
+            # 完整解码一次，截断或损坏的数据在这里报错；动图逐帧解码，只解码第一帧发现不了后面截断的帧
+            image.load()
+            animated = getattr(image, 'is_animated', False)
+            image_format = image.format
+            if animated:
+                for frame in ImageSequence.Iterator(image):
+                    frame.load()
+                image.seek(0)
+
+            width, height = image.size
+            short_side, long_side = sorted((width, height))
+            if short_side < min_side:
+                raise IngestRejected(REJECT_TOO_SMALL)
+            if long_side / short_side > max_aspect:
+                raise IngestRejected(REJECT_BAD_ASPECT)
+
+            output = io.BytesIO()
+            if animated and image_format == 'GIF':
+                save_animated_webp(image, output, quality, max_edge)
+            elif not animated:
+                # 先按EXIF方向旋转，保存时不再写入任何元数据
+                image = ImageOps.exif_transpose(image)
+                if image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info:
+                    image = image.convert('RGBA')
+                elif image.mode != 'RGB':
+                    image = image.convert('RGB')
+                image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+                image.save(output, 'WEBP', quality=quality, method=4)
+    except IngestRejected:
+        raise
+    except Exception as e:
+        raise IngestRejected(REJECT_UNDECODABLE) from e
+
+    if original_path is not None:
+        original_path = Path(original_path)
+        original_path.parent.mkdir(parents=True, exist_ok=True)
+        _copy_atomic(source_path, original_path)
+
+    # 其他格式的动图按原样保存
+    if animated and image_format != 'GIF':
+        size, digest = source_path.stat().st_size, file_sha256(source_path)
+        os.replace(source_path, filepath)
+        return str(filepath), size, digest
+
+    target = filepath.with_suffix('.webp')
+    index = 2
+    while target.exists():
+        target = filepath.with_name(f"{filepath.stem}_{index}.webp")
+        index += 1
+    result = output.getvalue()
+    _write_atomic(target, result)
+    return str(target), len(result), hashlib.sha256(result).hexdigest()
+
+
+class ImageIngest:
+    """图片入库处理类（线程安全，供下载线程调用）"""
+
+    def __init__(self, base_dir, max_edge=DEFAULT_MAX_EDGE, quality=DEFAULT_QUALITY,
+                 keep_originals=False, min_side=DEFAULT_MIN_SIDE, max_aspect=DEFAULT_MAX_ASPECT,
+                 workers=None):
+        """keep_originals 为 True 时，原图按相同的相对路径另存到 base_dir/originals 下"""
+        self.base_dir = Path(base_dir)
+        self.originals_dir = self.base_dir / "originals" if keep_originals else None
+        self.max_edge = max_edge
+        self.quality = quality
+        self.min_side = min_side
+        self.max_aspect = max_aspect
+        self.workers = workers or os.cpu_count() or 2
+
+        self.processed = 0
+        self.accepted = 0
+        self.rejections = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        """第一次使用时再创建进程池"""
+        with self._lock:
+            if self._executor is None:
+                # 下载线程已在运行，用 spawn 启动子进程，避免 fork 复制持有中的锁
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def _discard_executor(self):
+        """丢弃已损坏的进程池"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _original_path(self, filepath):
+        """原图的另存路径，不保留原图时返回 None"""
+        if self.originals_dir is None:
+            return None
+        try:
+            relative = Path(filepath).resolve().relative_to(self.base_dir.resolve())
+        except ValueError:
+            relative = Path(Path(filepath).name)
+        return self.originals_dir / relative
+
+    def process(self, source_path, filepath):
+        """
+        校验下载到临时文件 source_path 的图片并保存，返回 (实际保存路径, 文件大小, SHA-256)；
+        未通过校验时返回 None，磁盘上不会留下任何文件。无论结果如何，临时文件都在这里删除；
+        进程池中只传递路径，不传递图片内容
+        """
+        source_path = Path(source_path)
+        filepath = Path(filepath)
+        try:
+            args = (str(source_path), str(filepath), self.max_edge, self.quality, self.min_side, self.max_aspect,
+                    self._original_path(filepath))
+            return self._process(args, filepath, source_path.stat().st_size)
+        finally:
+            if source_path.exists():
+                source_path.unlink()
+
+    def _process(self, args, filepath, bytes_in):
+        """process 的实现：在进程池中校验保存并更新统计"""
+        try:
+            try:
+                result = self._get_executor().submit(normalize_image, *args).result()
+            except BrokenProcessPool:
+                # 子进程异常退出时在当前线程处理，下次调用再重新创建进程池
+                logging.warning("入库处理进程池异常退出，改在当前线程处理")
+                self._discard_executor()
+                result = normalize_image(*args)
+        except IngestRejected as e:
+            reason = e.args[0]
+            logging.warning(f"图片未通过校验（{reason}），不保存: {filepath.name}")
+            with self._lock:
+                self.processed += 1
+                self.rejections[reason] = self.rejections.get(reason, 0) + 1
+            return None
+
+        path, size, digest = result
+        with self._lock:
+            self.processed += 1
+            self.accepted += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += size
+        return Path(path), size, digest
+
+    def close(self):
+        """关闭进程池"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def get_stats(self):
+        """获取入库处理统计"""
+        with self._lock:
+            return {
+                "已处理": self.processed,
+                "通过": self.accepted,
+                "拒绝原因": dict(self.rejections),
+                "处理前大小(MB)": round(self.bytes_in / (1024 * 1024), 2),
+                "处理后大小(MB)": round(self.bytes_out / (1024 * 1024), 2),
+            }
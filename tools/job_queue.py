@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多进程爬取协调队列
+多个爬虫进程（也可以是共享文件系统的多台机器）通过同一个SQLite文件协调：
+每个 (搜索引擎, 关键词, 页码) 搜索任务先租用再执行，租约过期后其他进程可以接手；
+各分类的名额和文件编号原子分配，不同进程不会超出分类上限，也不会生成相同的文件名
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from shared_db import FileLock, connect_shared
+
+# 默认租约时长（秒）：持有任务的进程超过该时间没有动静时，任务可以被其他进程接手
+DEFAULT_LEASE_SECONDS = 300
+
+# 同一页搜索失败的最多尝试次数，超过后不再分配
+MAX_ATTEMPTS = 3
+
+# 任务状态
+STATUS_LEASED = 'leased'
+STATUS_PENDING = 'pending'
+STATUS_DONE = 'done'
+STATUS_SKIPPED = 'skipped'
+
+
+class JobQueue:
+    """多进程爬取协调队列类（线程安全，也可在多个进程间共享）"""
+
+    def __init__(self, db_path, lease_seconds=DEFAULT_LEASE_SECONDS, worker_id=None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.joined = False
+        self.round_started = None
+        self._stop_heartbeat = threading.Event()
+        self._heartbeat_thread = None
+
+        self.claimed = 0
+        self.contended = 0
+        self.slots_allocated = 0
+
+        # 自行管理事务；加锁方式和日志模式与图片目录中的其他数据库相同，见 shared_db
+        self._lock = FileLock(self.db_path)
+        self.conn = connect_shared(self.db_path, isolation_level=None)
+        with self._transaction():
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    engine TEXT NOT NULL,
+                    keyword TEXT NOT NULL,
+                    page INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    worker TEXT,
+                    lease_until REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (engine, keyword, page)
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS slots (
+                    category TEXT PRIMARY KEY,
+                    used INTEGER NOT NULL,
+                    next_serial INTEGER NOT NULL
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS workers (
+                    worker TEXT PRIMARY KEY,
+                    heartbeat REAL NOT NULL
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS round (
+                    started_at TEXT NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _transaction(self):
+        """独占事务：线程锁 + 锁文件上的 fcntl 锁 + BEGIN IMMEDIATE"""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def _heartbeat(self, conn, now):
+        """更新本进程的心跳，调用方需在事务中"""
+        conn.execute("INSERT OR REPLACE INTO workers (worker, heartbeat) VALUES (?, ?)",
+                     (self.worker_id, now))
+
+    def join(self, resume=False, completed=(), count_slots=None):
+        """
+        加入爬取：有其他进程正在运行时加入它们的这一轮，沿用已分配的任务和名额；
+        没有其他进程且不是继续上次的爬取时，清空上一轮的记录重新开始。
+        没有其他进程、继续上次的爬取时，检查点中未完成关键词（completed 为已完成的关键词）的搜索任务重新开放，
+        已搜索过的页由搜索缓存提供，中断时尚未下载的候选图片不会丢失；
+        分配后未下载成功的名额也随中断丢失，此时用 count_slots(本轮开始时间) 返回的 {名额: 实际图片数}
+        重新核对名额。返回是否加入了已有的一轮
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            active = conn.execute(
+                "SELECT COUNT(*) FROM workers WHERE worker != ? AND heartbeat > ?",
+                (self.worker_id, now - self.lease_seconds)
+            ).fetchone()[0]
+            if not active and not resume:
+                conn.execute("DELETE FROM jobs")
+                conn.execute("DELETE FROM slots")
+                conn.execute("DELETE FROM round")
+                conn.execute("INSERT INTO round (started_at) VALUES (?)", (time.strftime("%Y-%m-%d %H:%M:%S"),))
+            row = conn.execute("SELECT started_at FROM round").fetchone()
+            self.round_started = row[0] if row is not None else None
+            if not active and resume:
+                completed = set(completed)
+                reopened = [
+                    (keyword,) for keyword, in conn.execute("SELECT DISTINCT keyword FROM jobs")
+                    if keyword not in completed
+                ]
+                conn.executemany("DELETE FROM jobs WHERE keyword = ?", reopened)
+                if count_slots is not None:
+                    self._reconcile_slots(conn, count_slots(self.round_started))
+            conn.execute("DELETE FROM workers WHERE heartbeat <= ?", (now - self.lease_seconds,))
+            self._heartbeat(conn, now)
+
+        self.joined = active > 0
+        if self.joined:
+            logging.info(f"加入正在进行的爬取，另有 {active} 个进程在运行")
+
+        # 下载一张大图可能超过租约时长，心跳由后台线程定时更新，不只在租用任务和分配名额时更新
+        self._stop_heartbeat.clear()
+        if self._heartbeat_thread is None:
+            self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, daemon=True,
+                                                      name="job-heartbeat")
+            self._heartbeat_thread.start()
+        return self.joined
+
+    def _heartbeat_loop(self):
+        """每隔租约时长的三分之一更新一次心跳，直到退出爬取"""
+        while not self._stop_heartbeat.wait(max(self.lease_seconds / 3, 1)):
+            try:
+                with self._transaction() as conn:
+                    self._heartbeat(conn, time.time())
+            except Exception as e:
+                logging.warning(f"更新协调队列心跳失败: {e}")
+
+    def _reconcile_slots(self, conn, counts):
+        """把各名额的已用数改为实际图片数；文件编号不回退，调用方需在事务中"""
+        for category, count in counts.items():
+            row = conn.execute("SELECT used FROM slots WHERE category = ?", (category,)).fetchone()
+            if row is None or row[0] == count:
+                continue
+            conn.execute("UPDATE slots SET used = ? WHERE category = ?", (count, category))
+            logging.info(f"名额核对: {category} 已分配{row[0]}个，实际{count}张")
+
+    def leave(self):
+        """退出爬取，其他进程不再把本进程计为活动进程"""
+        self._stop_heartbeat.set()
+        if self._heartbeat_thread is not None:
+            self._heartbeat_thread.join()
+            self._heartbeat_thread = None
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM workers WHERE worker = ?", (self.worker_id,))
+
+    def claim(self, engine, keyword, page):
+        """
+        租用一页搜索任务，返回 True 表示由本进程执行；
+        任务已完成、已跳过、正被其他进程租用或失败次数过多时返回 False
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            self._heartbeat(conn, now)
+            row = conn.execute(
+                "SELECT status, worker, lease_until, attempts FROM jobs "
+                "WHERE engine = ? AND keyword = ? AND page = ?",
+                (engine, keyword, page)
+            ).fetchone()
+            if row is not None:
+                status, worker, lease_until, attempts = row
+                available = (
+                    status == STATUS_PENDING or
+                    (status == STATUS_LEASED and (worker == self.worker_id or lease_until < now))
+                )
+                if not available or attempts >= MAX_ATTEMPTS:
+                    self.contended += 1
+                    return False
+            conn.execute(
+                "INSERT INTO jobs (engine, keyword, page, status, worker, lease_until, attempts, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, 1, ?) "
+                "ON CONFLICT (engine, keyword, page) DO UPDATE SET status = excluded.status, "
+                "worker = excluded.worker, lease_until = excluded.lease_until, "
+                "attempts = attempts + 1, updated_at = excluded.updated_at",
+                (engine, keyword, page, STATUS_LEASED, self.worker_id, now + self.lease_seconds,
+                 time.strftime("%Y-%m-%d %H:%M:%S"))
+            )
+        self.claimed += 1
+        return True
+
+    def _finish(self, engine, keyword, pages, status):
+        """把本进程租用的、或尚未有人租用的任务标记为指定状态"""
+        updated_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        with self._transaction() as conn:
+            for page in pages:
+                conn.execute(
+                    "INSERT INTO jobs (engine, keyword, page, status, worker, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (engine, keyword, page) DO UPDATE SET status = excluded.status, "
+                    "worker = excluded.worker, lease_until = NULL, updated_at = excluded.updated_at "
+                    "WHERE (jobs.status = ? AND jobs.worker = excluded.worker) OR jobs.status = ?",
+                    (engine, keyword, page, status, self.worker_id, updated_at, STATUS_LEASED, STATUS_PENDING)
+                )
+
+    def complete(self, engine, keyword, page):
+        """搜索任务已完成"""
+        self._finish(engine, keyword, [page], STATUS_DONE)
+
+    def skip(self, engine, keyword, pages):
+        """按收益停止翻页后，把剩余的页标记为跳过，其他进程也不再请求"""
+        self._finish(engine, keyword, list(pages), STATUS_SKIPPED)
+
+    def release(self, engine, keyword, page):
+        """搜索失败，释放租约让其他进程（或之后的本进程）重试"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE engine = ? AND keyword = ? AND page = ? AND worker = ?",
+                (STATUS_PENDING, time.strftime("%Y-%m-%d %H:%M:%S"), engine, keyword, page, self.worker_id)
+            )
+
+    def reopen(self, engine, keyword):
+        """
+        本进程已完成或跳过的该关键词的任务重新开放，返回重新开放的任务数；
+        用于搜索结果被丢弃（引擎超时）之后，让其他进程（或之后的本进程）重新搜索
+        """
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE engine = ? AND keyword = ? AND worker = ? AND status IN (?, ?, ?)",
+                (STATUS_PENDING, time.strftime("%Y-%m-%d %H:%M:%S"), engine, keyword, self.worker_id,
+                 STATUS_LEASED, STATUS_DONE, STATUS_SKIPPED)
+            ).rowcount
+
+    def allocate_slot(self, category, limit=None):
+        """
+        原子分配分类中的一个名额，返回该名额的文件编号（从1开始，各进程之间不重复）；
+        分类已达到 limit 时返回 None，limit 为 None 时只分配编号
+        """
+        with self._transaction() as conn:
+            self._heartbeat(conn, time.time())
+            row = conn.execute("SELECT used, next_serial FROM slots WHERE category = ?", (category,)).fetchone()
+            used, serial = row if row is not None else (0, 1)
+            if limit is not None and used >= limit:
+                return None
+            conn.execute(
+                "INSERT OR REPLACE INTO slots (category, used, next_serial) VALUES (?, ?, ?)",
+                (category, used + 1, serial + 1)
+            )
+        self.slots_allocated += 1
+        return serial
+
+    def release_slot(self, category):
+        """下载失败时归还名额；编号不回收，避免和正在写入的文件重名"""
+        with self._transaction() as conn:
+            conn.execute("UPDATE slots SET used = MAX(used - 1, 0) WHERE category = ?", (category,))
+
+    def get_stats(self):
+        """获取队列统计"""
+        with self._lock:
+            statuses = dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            workers = self.conn.execute(
+                "SELECT COUNT(*) FROM workers WHERE heartbeat > ?", (time.time() - self.lease_seconds,)
+            ).fetchone()[0]
+        return {
+            "进程标识": self.worker_id,
+            "加入已有爬取": self.joined,
+            "本轮开始": self.round_started,
+            "活动进程": workers,
+            "本进程租用任务": self.claimed,
+            "被其他进程占用": self.contended,
+            "本进程分配名额": self.slots_allocated,
+            "任务状态": statuses,
+        }
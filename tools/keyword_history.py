@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+关键词收益历史
+记录每个关键词历次搜索结果中的新图片（下载记录中没有的图片）数；
+连续多次搜索都没有新图片的关键词在一段时间内不再搜索，每次运行的关键词集合随之缩小，
+过了重试期后再试一次，以免错过搜索引擎新收录的图片
+"""
+
+import logging
+import time
+from pathlib import Path
+
+from shared_db import FileLock, connect_shared
+from taxonomy import normalize_keyword
+
+# 连续多少次搜索没有新图片后暂停搜索
+DEFAULT_MAX_EMPTY_RUNS = 2
+
+# 暂停搜索的关键词过多少天后重试
+DEFAULT_RETRY_DAYS = 30
+
+
+class KeywordHistory:
+    """关键词收益历史类（线程安全）"""
+
+    def __init__(self, db_path, is_known, max_empty_runs=DEFAULT_MAX_EMPTY_RUNS, retry_days=DEFAULT_RETRY_DAYS):
+        """
+        is_known(url) 判断图片是否已下载过（一般为 DownloadLedger.is_known）；
+        max_empty_runs 为 0 时只记录历史、不跳过关键词
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.is_known = is_known
+        self.max_empty_runs = max_empty_runs
+        self.retry_seconds = retry_days * 24 * 3600
+        self.skipped = 0
+        self.recorded = 0
+
+        # 多个进程可能同时使用同一个图片目录，加锁方式和日志模式见 shared_db
+        self._lock = FileLock(self.db_path)
+        self.conn = connect_shared(self.db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS keyword_history (
+                keyword TEXT PRIMARY KEY,
+                runs INTEGER NOT NULL,
+                new_images INTEGER NOT NULL,
+                empty_runs INTEGER NOT NULL,
+                last_run REAL NOT NULL,
+                last_new REAL
+            )
+        """)
+        self.conn.commit()
+
+    def select(self, keywords):
+        """从关键词列表中去掉连续多次没有新图片、且尚未到重试时间的关键词"""
+        if not self.max_empty_runs:
+            return list(keywords)
+        with self._lock:
+            resting = {
+                keyword for keyword, in self.conn.execute(
+                    "SELECT keyword FROM keyword_history WHERE empty_runs >= ? AND last_run > ?",
+                    (self.max_empty_runs, time.time() - self.retry_seconds)
+                )
+            }
+        selected = [keyword for keyword in keywords if normalize_keyword(keyword) not in resting]
+        self.skipped = len(keywords) - len(selected)
+        if self.skipped:
+            logging.info(f"关键词历史: {self.skipped} 个关键词最近连续 {self.max_empty_runs} 次搜索没有新图片，本次跳过")
+        return selected
+
+    def record(self, keyword, urls):
+        """
+        记录一次搜索的收益：结果中下载记录里没有的图片数；
+        没有任何结果时（搜索失败、引擎熔断或预算用尽）无法判断，不做记录
+        """
+        if not urls:
+            return
+        new_images = sum(1 for url in urls if not self.is_known(url))
+        key = normalize_keyword(keyword)
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO keyword_history (keyword, runs, new_images, empty_runs, last_run, last_new) "
+                "VALUES (?, 1, ?, ?, ?, ?) "
+                "ON CONFLICT (keyword) DO UPDATE SET runs = runs + 1, "
+                "new_images = new_images + excluded.new_images, "
+                "empty_runs = CASE WHEN excluded.new_images > 0 THEN 0 ELSE empty_runs + 1 END, "
+                "last_run = excluded.last_run, last_new = COALESCE(excluded.last_new, last_new)",
+                (key, new_images, 0 if new_images else 1, now, now if new_images else None)
+            )
+            self.recorded += 1
+
+    def get_stats(self):
+        """获取关键词历史统计"""
+        with self._lock:
+            known, resting = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(empty_runs >= ?), 0) FROM keyword_history",
+                (self.max_empty_runs or float('inf'),)
+            ).fetchone()
+        return {
+            "有记录的关键词": known,
+            "连续无新图片": resting,
+            "本次跳过": self.skipped,
+            "本次记录": self.recorded,
+        }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+关键词调度器
+根据关键词预计会填充的分类，优先搜索离目标数量最远的分类，已满分类的关键词不再搜索；
+缺口相同时优先搜索上次运行新图片比例高（或从未搜索过）的关键词
+"""
+
+import logging
+
+
+class KeywordScheduler:
+    """按分类缺口排序关键词的调度器类"""
+
+    def __init__(self, keywords, categorize, counts, target, keyword_yield=None):
+        """
+        categorize(title, keyword) 为爬虫的分类方法，用于预测关键词会填充的分类；
+        counts 为各分类当前数量（含排队中），由爬虫在运行中更新；target 为每类目标数量；
+        keyword_yield(keyword) 返回关键词上次运行的新图片比例，没有记录时返回 None
+        （一般为 PageYieldTracker.get_keyword_yield），只在开始时查询一次
+        """
+        self.keywords = keywords
+        self.counts = counts
+        self.target = target
+        self.categories = [categorize('', keyword) for keyword in keywords]
+        # 没有记录的关键词按全是新图片计算
+        self.yields = []
+        for keyword in keywords:
+            value = keyword_yield(keyword) if keyword_yield is not None else None
+            self.yields.append(1.0 if value is None else value)
+        self.picked = 0
+        self.low_yield_deferred = 0
+
+    def deficit(self, category):
+        """分类距离目标数量的缺口"""
+        return self.target - self.counts.get(category, 0)
+
+    def pick(self, candidates):
+        """
+        从候选关键词序号中选出缺口最大的分类对应的关键词，缺口相同时选上次收益最高的；
+        所有分类都已满时返回 None
+        """
+        best_index = None
+        best_key = (0, 0.0)
+        first_index = None
+        for index in candidates:
+            deficit = self.deficit(self.categories[index])
+            if deficit <= 0:
+                continue
+            if first_index is None or deficit > self.deficit(self.categories[first_index]):
+                first_index = index
+            # 缺口和收益都相同时保留原有（随机打乱后）的顺序
+            key = (deficit, self.yields[index])
+            if key > best_key:
+                best_index = index
+                best_key = key
+        if best_index is not None:
+            self.picked += 1
+            if best_index != first_index:
+                self.low_yield_deferred += 1
+        return best_index
+
+    def get_stats(self):
+        """获取调度统计：已调度的关键词数、因分类已满而跳过的关键词数和因上次收益低而推后的次数"""
+        skipped = sum(1 for category in self.categories if self.deficit(category) <= 0)
+        return {
+            "已调度关键词": self.picked,
+            "分类已满的关键词": skipped,
+            "低收益推后次数": self.low_yield_deferred,
+        }
+
+    def log_stats(self):
+        """在日志中输出调度统计"""
+        stats = self.get_stats()
+        logging.info(
+            f"关键词调度: 已调度 {stats['已调度关键词']} 个，分类已满的关键词 {stats['分类已满的关键词']} 个，"
+            f"低收益推后 {stats['低收益推后次数']} 次"
+        )
@@ -5,15 +5,14 @@
 用于收集书籍创作素材
 """
 
-import os
-import requests
-import time
-import random
-from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
-import json
+import argparse
 import logging
-from pathlib import Path
+import time
+
+from base_crawler import BaseImageCrawler
+from crawl_budget import CrawlBudget, add_budget_arguments
+from crawl_metrics import quiet_console_logging
+from term_classifier import TermClassifier
 
 # 配置日志
 logging.basicConfig(
@@ -25,171 +24,33 @@ logging.basicConfig(
     ]
 )
 
-class LuoXiaoHeiCrawler:
+class LuoXiaoHeiCrawler(BaseImageCrawler):
     """罗小黑战记图片爬虫类"""
     
-    def __init__(self, base_dir="images"):
-        self.base_dir = Path(base_dir)
-        self.luoxiaohei_dir = self.base_dir / "罗小黑战记"
-        self.session = requests.Session()
-        
-        # 设置请求头，模拟浏览器
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.8,en-US;q=0.5,en;q=0.3',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
-        
-        # 创建目录结构
-        self.create_directories()
-        
-    def create_directories(self):
-        """创建图片存储目录"""
-        directories = [
-            self.luoxiaohei_dir / "角色",
-            self.luoxiaohei_dir / "场景",
-            self.luoxiaohei_dir / "剧照",
-            self.luoxiaohei_dir / "壁纸",
-            self.luoxiaohei_dir / "其他"
-        ]
-        
-        for directory in directories:
-            directory.mkdir(parents=True, exist_ok=True)
-            logging.info(f"创建目录: {directory}")
-    
-    def download_image(self, url, filename, save_dir):
-        """下载单张图片"""
-        try:
-            # 随机延迟，避免请求过快
-            time.sleep(random.uniform(1, 3))
-            
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            
-            # 检查是否为图片
-            content_type = response.headers.get('content-type', '')
-            if 'image' not in content_type.lower():
-                logging.warning(f"URL不是图片: {url}")
-                return False
-                
-            # 确定文件扩展名
-            if not filename.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp')):
-                ext = self.get_image_extension(url, content_type)
-                filename = f"{filename}{ext}"
-            
-            filepath = save_dir / filename
-            
-            # 检查文件是否已存在
-            if filepath.exists():
-                logging.info(f"文件已存在，跳过: {filename}")
-                return True
-                
-            # 保存图片
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
-                
-            logging.info(f"下载成功: {filename} -> {save_dir}")
-            return True
-            
-        except Exception as e:
-            logging.error(f"下载失败 {url}: {e}")
-            return False
+    name = "luoxiaohei"
+    dir_name = "罗小黑战记"
     
-    def get_image_extension(self, url, content_type):
-        """根据URL和content-type确定图片扩展名"""
-        # 先尝试从URL获取扩展名
-        parsed_url = urlparse(url)
-        path = parsed_url.path.lower()
-        if path.endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp')):
-            return os.path.splitext(path)[1]
-        
-        # 根据content-type确定扩展名
-        if 'jpeg' in content_type:
-            return '.jpg'
-        elif 'png' in content_type:
-            return '.png'
-        elif 'gif' in content_type:
-            return '.gif'
-        elif 'webp' in content_type:
-            return '.webp'
-        else:
-            return '.jpg'  # 默认使用jpg
+    # 总下载数量上限，多个进程合计计算
+    max_total = 100
+    # 协调队列中总数名额的名称（不会与关键词的编号名额重名）
+    total_slot = "_总数"
     
-    def search_baidu_images(self, keyword, max_pages=3):
-        """百度图片搜索"""
-        images = []
-        base_url = "https://image.baidu.com/search/acjson"
-        
-        for page in range(max_pages):
-            params = {
-                'tn': 'resultjson_com',
-                'word': keyword,
-                'pn': page * 30,
-                'rn': 30,
-                'ct': 1,
-                'ic': 0,
-                'lm': -1,
-                'nc': 1,
-                'ie': 'utf-8',
-                'oe': 'utf-8',
-                'face': 0,
-            }
-            
-            try:
-                response = self.session.get(base_url, params=params, timeout=30)
-                data = response.json()
-                
-                if 'data' in data:
-                    for item in data['data']:
-                        if 'thumbURL' in item and 'middleURL' in item:
-                            images.append({
-                                'thumb_url': item['thumbURL'],
-                                'middle_url': item['middleURL'],
-                                'title': item.get('fromPageTitle', ''),
-                                'keyword': keyword
-                            })
-                
-                logging.info(f"百度搜索 '{keyword}' 第{page+1}页，获取{len(data.get('data', []))}张图片")
-                time.sleep(random.uniform(2, 4))
-                
-            except Exception as e:
-                logging.error(f"百度搜索失败 {keyword} 第{page+1}页: {e}")
-                continue
-        
-        return images
-    
-    def categorize_image(self, title, keyword):
-        """根据标题和关键词对图片进行分类"""
-        title_lower = title.lower()
-        keyword_lower = keyword.lower()
-        
-        # 角色相关关键词
-        character_keywords = ['罗小黑', '小黑', '小白', '嘿咻', '周末', '老君', '无限', '谛听', '风息']
-        if any(char in title_lower or char in keyword_lower for char in character_keywords):
-            return "角色"
-        
-        # 场景相关关键词
-        scene_keywords = ['背景', '场景', '森林', '城市', '建筑', '风景']
-        if any(scene in title_lower or scene in keyword_lower for scene in scene_keywords):
-            return "场景"
+    def __init__(self, base_dir="images", **kwargs):
+        super().__init__(base_dir, **kwargs)
         
-        # 剧照相关关键词
-        still_keywords = ['剧照', '截图', '电影', '动画']
-        if any(still in title_lower or still in keyword_lower for still in still_keywords):
-            return "剧照"
+        # 分类规则编译成多模式自动机，按角色、场景、剧照、壁纸的顺序优先
+        self.classifier = TermClassifier([
+            ("角色", ['罗小黑', '小黑', '小白', '嘿咻', '周末', '老君', '无限', '谛听', '风息']),
+            ("场景", ['背景', '场景', '森林', '城市', '建筑', '风景']),
+            ("剧照", ['剧照', '截图', '电影', '动画']),
+            ("壁纸", ['壁纸', '桌面', 'wallpaper']),
+        ], default="其他")
         
-        # 壁纸相关关键词
-        wallpaper_keywords = ['壁纸', '桌面', 'wallpaper']
-        if any(wallpaper in title_lower or wallpaper in keyword_lower for wallpaper in wallpaper_keywords):
-            return "壁纸"
+        # 创建目录结构
+        self.create_directories()
         
-        return "其他"
-    
-    def run(self):
-        """运行爬虫"""
+    def run(self, resume=False):
+        """运行爬虫（resume=True 时从上次保存的检查点继续）"""
         logging.info("开始爬取罗小黑战记图片...")
         
         # 搜索关键词列表
@@ -202,63 +63,93 @@ class LuoXiaoHeiCrawler:
             "罗小黑战记 动画",
         ]
         
+        completed = []
         total_downloaded = 0
         
-        for keyword in keywords:
-            logging.info(f"搜索关键词: {keyword}")
-            images = self.search_baidu_images(keyword, max_pages=2)
-            
-            for i, img_info in enumerate(images):
-                # 确定图片分类和保存目录
-                category = self.categorize_image(img_info['title'], img_info['keyword'])
-                save_dir = self.luoxiaohei_dir / category
-                
-                # 生成文件名
-                filename = f"{keyword}_{i+1:03d}"
-                
-                # 下载图片（优先下载中等尺寸图片）
-                success = self.download_image(
-                    img_info['middle_url'], 
-                    filename, 
-                    save_dir
-                )
-                
-                if success:
-                    total_downloaded += 1
-                
-                # 控制下载数量，避免过多
-                if total_downloaded >= 100:
-                    logging.info("已下载100张图片，停止下载")
-                    break
-            
-            if total_downloaded >= 100:
-                break
+        state = self.checkpoint.load() if resume else None
+        if state:
+            completed = state["已完成关键词"]
+            total_downloaded = state["总下载数量"]
+            logging.info(f"从检查点继续: 已完成{len(completed)}/{len(keywords)}个关键词，已下载{total_downloaded}张")
+        elif resume:
+            logging.info("未找到检查点，重新开始爬取")
+        
+        # 总数名额由协调队列统一分配，多个进程合计不超过 max_total；各关键词的文件编号同样统一分配
+        full = False
+
+        def search(keyword):
+            return self.search_baidu_images(keyword, max_pages=2)
+
+        def plan(keyword, img_info):
+            nonlocal full
+            # 控制下载数量，避免过多
+            if full:
+                return None
+
+            # 下载记录中已有的URL不再排队
+            if self.ledger.is_known(img_info['middle_url']):
+                return None
+
+            if self.jobs.allocate_slot(self.total_slot, self.max_total) is None:
+                # 本进程和其他进程排队的图片已达到总数上限
+                full = True
+                return None
+
+            # 确定图片分类和保存目录
+            category = self.categorize(img_info['title'], img_info['keyword'])
+            serial = self.jobs.allocate_slot(keyword)
+
+            # 下载图片（优先下载中等尺寸图片）
+            return {
+                'url': img_info['middle_url'],
+                'thumb_url': img_info.get('thumb_url'),
+                'filename': f"{keyword}_{serial:03d}",
+                'keyword': keyword,
+                'save_dir': self.crawl_dir / category
+            }
+
+        def on_result(task, success):
+            nonlocal total_downloaded, full
+            if success:
+                total_downloaded += 1
+            else:
+                # 下载失败，归还总数名额
+                self.jobs.release_slot(self.total_slot)
+                full = False
+
+        self.crawl(
+            keywords, completed, search, plan, on_result,
+            should_stop=lambda: total_downloaded >= self.max_total or self.budget.exhausted() is not None,
+            on_progress=lambda done: self.checkpoint.save(keywords, done, total_downloaded),
+            resume=resume
+        )
+
+        if total_downloaded >= self.max_total:
+            logging.info(f"已下载{self.max_total}张图片，停止下载")
         
-        logging.info(f"爬虫完成！总共下载了 {total_downloaded} 张图片")
+        self.finish(total_downloaded)
         
         # 生成下载报告
         self.generate_report(total_downloaded)
     
+    def slot_counts(self, since):
+        """本轮（since 之后）实际保存的图片总数，继续爬取时用来核对总数名额"""
+        return {self.total_slot: sum(self.catalog.category_counts(self.crawl_dir, since).values())}
+    
     def generate_report(self, total_downloaded):
         """生成下载报告"""
         report = {
             "总下载数量": total_downloaded,
             "下载时间": time.strftime("%Y-%m-%d %H:%M:%S"),
+            **self.component_stats(),
             "分类统计": {}
         }
         
-        # 统计各分类的图片数量
-        for category_dir in self.luoxiaohei_dir.iterdir():
-            if category_dir.is_dir():
-                count = len(list(category_dir.glob("*")))
-                report["分类统计"][category_dir.name] = count
-        
-        # 保存报告
-        report_file = self.luoxiaohei_dir / "下载报告.json"
-        with open(report_file, 'w', encoding='utf-8') as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
+        # 各分类的图片数量直接从图片目录查询
+        for category, stats in self.catalog.category_summary(self.crawl_dir).items():
+            report["分类统计"][category] = stats["总数"]
         
-        logging.info(f"下载报告已保存: {report_file}")
+        self.save_report(report)
         print("\n" + "="*50)
         print("下载完成!")
         print(f"总共下载: {total_downloaded} 张图片")
@@ -269,17 +160,33 @@ class LuoXiaoHeiCrawler:
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="罗小黑战记图片爬虫")
+    parser.add_argument("--resume", action="store_true",
+                       help="从上次中断的检查点继续爬取")
+    parser.add_argument("--keep-originals", action="store_true",
+                       help="转为WebP后另存一份原图到 images/originals")
+    parser.add_argument("--progress", action="store_true",
+                       help="在终端实时显示各引擎的请求延迟、成功率、流量和入库速度")
+    add_budget_arguments(parser)
+    args = parser.parse_args()
+    
+    if args.progress:
+        # 控制台只输出警告和错误，完整日志仍写入日志文件
+        quiet_console_logging()
+    
     print("罗小黑战记图片爬虫")
     print("用于收集书籍创作素材")
     print("-" * 30)
     
     # 创建爬虫实例并运行
-    crawler = LuoXiaoHeiCrawler()
+    crawler = LuoXiaoHeiCrawler(keep_originals=args.keep_originals, live_progress=args.progress,
+                                budget=CrawlBudget.from_args(args))
     
     try:
-        crawler.run()
+        crawler.run(resume=args.resume)
     except KeyboardInterrupt:
         print("\n用户中断了程序")
+        print("进度已保存，使用 --resume 参数可继续爬取")
     except Exception as e:
         print(f"程序运行出错: {e}")
         logging.error(f"程序异常: {e}")
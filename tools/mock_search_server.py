@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟搜索/图片服务器
+模仿百度 acjson 的JSON结果、Bing图片搜索中 img.mimg 的HTML和Unsplash的 napi/search/photos 接口，
+返回按种子生成的合成图片；可配置响应延迟、错误率和周期性的429限流，用于在不访问真实站点的情况下测量爬虫吞吐量
+"""
+
+import argparse
+import io
+import json
+import logging
+import random
+import threading
+import time
+import zlib
+from functools import lru_cache
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from PIL import Image, ImageDraw
+from requests.adapters import HTTPAdapter
+
+# 合成图片的尺寸（宽, 高）和缩略图最长边
+IMAGE_SIZE = (480, 360)
+THUMB_EDGE = 120
+
+# 各搜索引擎结果中图片所在的主机，经 MockRoutingAdapter 转发到本地服务器
+BAIDU_IMAGE_HOSTS = ('img0.baidu.com', 'img1.baidu.com', 'img2.baidu.com')
+BING_IMAGE_HOSTS = ('tse1.mm.bing.net', 'tse2.mm.bing.net')
+UNSPLASH_IMAGE_HOST = 'images.unsplash.com'
+
+# 转发时保存原始主机名的请求头
+ORIGINAL_HOST_HEADER = 'X-Mock-Host'
+
+
+def seed_of(*parts):
+    """由关键词、页码等生成稳定的图片种子"""
+    return zlib.crc32("|".join(str(part) for part in parts).encode('utf-8'))
+
+
+@lru_cache(maxsize=1024)
+def synthetic_image(seed, thumb=False):
+    """按种子生成一张色块图片（JPEG字节），不同种子的感知哈希互不相同"""
+    rng = random.Random(seed)
+    image = Image.new('RGB', IMAGE_SIZE, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    width, height = IMAGE_SIZE
+    for _ in range(12):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randrange(40, 240), y0 + rng.randrange(40, 180)
+        draw.rectangle((x0, y0, x1, y1), fill=tuple(rng.randrange(256) for _ in range(3)))
+    if thumb:
+        image.thumbnail((THUMB_EDGE, THUMB_EDGE))
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=85)
+    return output.getvalue()
+
+
+class FaultProfile:
+    """故障注入配置：响应延迟、随机5xx错误和周期性的429限流"""
+
+    def __init__(self, latency=0.05, jitter=0.5, error_rate=0.0, burst_every=0.0, burst_length=0.0,
+                 retry_after=1, seed=None):
+        """
+        latency 为平均延迟（秒），实际延迟在 ±jitter 比例内随机浮动；
+        error_rate 为返回500的概率；每隔 burst_every 秒有 burst_length 秒所有请求都返回429
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.retry_after = retry_after
+        self.started = time.monotonic()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """本次请求的延迟"""
+        with self._lock:
+            factor = 1 + self._random.uniform(-self.jitter, self.jitter)
+        return max(0.0, self.latency * factor)
+
+    def in_burst(self):
+        """当前是否处于429限流期"""
+        if self.burst_every <= 0 or self.burst_length <= 0:
+            return False
+        return (time.monotonic() - self.started) % self.burst_every < self.burst_length
+
+    def should_fail(self):
+        """本次请求是否返回500"""
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """按路径分派的请求处理类"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logging.debug(f"模拟服务器: {format % args}")
+
+    def do_GET(self):
+        server = self.server
+        parsed = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        host = self.headers.get(ORIGINAL_HOST_HEADER, '')
+        server.count_request(host)
+
+        profile = server.profile
+        time.sleep(profile.delay())
+        if profile.in_burst():
+            self._send(429, b'', 'text/plain', {'Retry-After': str(profile.retry_after)})
+            return
+        if profile.should_fail():
+            self._send(500, b'', 'text/plain')
+            return
+
+        if parsed.path == '/search/acjson':
+            self._send_json(self._baidu(params))
+        elif parsed.path == '/images/search':
+            self._send(200, self._bing(params).encode('utf-8'), 'text/html; charset=utf-8')
+        elif parsed.path == '/napi/search/photos':
+            self._send_json(self._unsplash(params))
+        elif parsed.path.startswith('/mock/'):
+            # 文件名为 <种子>-<结果序号>.jpg，重复图片种子相同而地址不同
+            seed = parsed.path[len('/mock/'):].split('.')[0].split('-')[0]
+            if not seed.isdigit():
+                self._send(404, b'', 'text/plain')
+                return
+            self._send(200, synthetic_image(int(seed), thumb='thumb' in params), 'image/jpeg')
+        elif parsed.path == '/':
+            # DuckDuckGo首页和搜索页，不含图片结果
+            self._send(200, b'<html><body></body></html>', 'text/html; charset=utf-8')
+        else:
+            self._send(404, b'', 'text/plain')
+
+    def _send(self, status, body, content_type, headers=None):
+        """发送完整响应"""
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data):
+        self._send(200, json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json')
+
+    def _image_seed(self, keyword, offset):
+        """结果中第 offset 张图片的种子；按重复率复用前面出现过的图片"""
+        seed = seed_of(keyword, offset)
+        rate = self.server.duplicate_rate
+        if rate > 0 and offset > 0 and random.Random(seed).random() < rate:
+            return seed_of(keyword, random.Random(seed).randrange(offset))
+        return seed
+
+    def _baidu(self, params):
+        """百度 acjson：data 数组，最后一项为空对象，与真实接口一致"""
+        keyword = params.get('word', '')
+        start = int(params.get('pn', 0))
+        count = int(params.get('rn', 30))
+        data = []
+        for offset in range(start, start + count):
+            seed = self._image_seed(keyword, offset)
+            host = BAIDU_IMAGE_HOSTS[offset % len(BAIDU_IMAGE_HOSTS)]
+            data.append({
+                'thumbURL': f"https://{host}/mock/{seed}-{offset}.jpg?thumb=1",
+                'middleURL': f"https://{host}/mock/{seed}-{offset}.jpg",
+                'fromPageTitle': f"{keyword} {offset + 1}",
+            })
+        data.append({})
+        return {'queryExt': keyword, 'listNum': 1000, 'data': data}
+
+    def _bing(self, params):
+        """Bing图片搜索结果页：每张图片一个 img.mimg"""
+        keyword = params.get('q', '')
+        start = int(params.get('first', 1)) - 1
+        count = int(params.get('count', 20))
+        tags = []
+        for offset in range(start, start + count):
+            seed = self._image_seed(keyword, offset)
+            host = BING_IMAGE_HOSTS[offset % len(BING_IMAGE_HOSTS)]
+            tags.append(f'<img class="mimg" src="https://{host}/mock/{seed}-{offset}.jpg" '
+                        f'alt="{escape(keyword)} {offset + 1}">')
+        return f"<html><body>{''.join(tags)}</body></html>"
+
+    def _unsplash(self, params):
+        """Unsplash napi：results 数组，图片地址在 urls.regular"""
+        keyword = params.get('query', '')
+        count = int(params.get('per_page', 20))
+        start = (int(params.get('page', 1)) - 1) * count
+        results = []
+        for offset in range(start, start + count):
+            seed = self._image_seed(keyword, offset)
+            results.append({
+                'urls': {'regular': f"https://{UNSPLASH_IMAGE_HOST}/mock/{seed}-{offset}.jpg"},
+                'alt_description': f"{keyword} {offset + 1}",
+            })
+        return {'total': 1000, 'results': results}
+
+
+class MockSearchServer(ThreadingHTTPServer):
+    """本地模拟搜索/图片服务器，在后台线程中运行"""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, profile=None, duplicate_rate=0.0):
+        """port 为 0 时自动选择空闲端口；duplicate_rate 为结果中重复图片的比例"""
+        super().__init__(('127.0.0.1', port), MockRequestHandler)
+        self.profile = profile or FaultProfile()
+        self.duplicate_rate = duplicate_rate
+        self.requests = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self, host):
+        """按原始主机统计请求数"""
+        with self._lock:
+            self.requests[host] = self.requests.get(host, 0) + 1
+
+    def reset_counts(self):
+        """清空请求统计，返回清空前的值"""
+        with self._lock:
+            counts, self.requests = self.requests, {}
+        return counts
+
+    def start(self):
+        """在后台线程中开始处理请求"""
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止服务器"""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class MockRoutingAdapter(HTTPAdapter):
+    """
+    requests 传输适配器：把所有请求转发到本地模拟服务器，原始主机名放在请求头中，
+    响应的 url 恢复为原始地址，爬虫的按主机限速、并发控制和性能指标都与访问真实站点时一致
+    """
+
+    def __init__(self, base_url, **kwargs):
+        self.base_url = base_url.rstrip('/')
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        original_url = request.url
+        parsed = urlparse(original_url)
+        request.url = f"{self.base_url}{parsed.path or '/'}" + (f"?{parsed.query}" if parsed.query else "")
+        request.headers[ORIGINAL_HOST_HEADER] = parsed.netloc
+        response = super().send(request, **kwargs)
+        response.url = original_url
+        request.url = original_url
+        return response
+
+
+def route_session(session, base_url, pool_size=16):
+    """让会话的所有请求都转发到模拟服务器"""
+    adapter = MockRoutingAdapter(base_url, pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def main():
+    """单独运行模拟服务器，便于用 curl 查看返回的内容"""
+    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="本地模拟搜索/图片服务器")
+    parser.add_argument('--port', type=int, default=8765, help="监听端口（默认 8765）")
+    parser.add_argument('--latency', type=float, default=0.05, help="平均响应延迟（秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="返回500的概率")
+    parser.add_argument('--burst-every', type=float, default=0.0, help="每隔多少秒出现一次429限流")
+    parser.add_argument('--burst-length', type=float, default=0.0, help="每次429限流持续的秒数")
+    parser.add_argument('--duplicate-rate', type=float, default=0.0, help="结果中重复图片的比例")
+    args = parser.parse_args()
+
+    profile = FaultProfile(args.latency, error_rate=args.error_rate,
+                           burst_every=args.burst_every, burst_length=args.burst_length)
+    server = MockSearchServer(args.port, profile, args.duplicate_rate)
+    print(f"模拟服务器已启动: {server.base_url}")
+    print(f"示例: curl '{server.base_url}/search/acjson?{urlencode({'word': '猫', 'pn': 0, 'rn': 3})}'")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
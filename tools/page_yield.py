@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+翻页收益统计
+逐页统计搜索结果中新图片（未下载过、本关键词前几页也未出现过）的比例，
+比例低于阈值时停止翻页；每个关键词各页的收益保存在SQLite中，供下次运行参考
+"""
+
+import logging
+import time
+from pathlib import Path
+
+from download_ledger import normalize_url
+from shared_db import FileLock, connect_shared
+
+# 默认收益阈值：一页中新图片少于该比例时不再请求后续页
+DEFAULT_MIN_YIELD = 0.2
+
+
+class KeywordPaging:
+    """单个关键词一次搜索的翻页过程"""
+
+    def __init__(self, tracker, engine, keyword, max_pages):
+        self.tracker = tracker
+        self.engine = engine
+        self.keyword = keyword
+        self.max_pages = max_pages
+        self.seen = set()
+
+    def add_page(self, page, urls):
+        """记录一页搜索结果，返回是否值得继续翻页"""
+        new_count = 0
+        for url in urls:
+            key = normalize_url(url)
+            if key not in self.seen and not self.tracker.is_known(url):
+                new_count += 1
+            self.seen.add(key)
+
+        page_yield = new_count / len(urls) if urls else 0.0
+        self.tracker.record(self.engine, self.keyword, page, len(urls), new_count)
+
+        remaining_pages = self.max_pages - page - 1
+        if page_yield < self.tracker.min_yield and remaining_pages > 0:
+            self.tracker.note_stop(remaining_pages)
+            logging.info(
+                f"'{self.keyword}' 第{page+1}页新图片比例 {page_yield:.0%}，"
+                f"低于 {self.tracker.min_yield:.0%}，停止翻页"
+            )
+            return False
+        return True
+
+
+class PageYieldTracker:
+    """翻页收益统计类（线程安全）"""
+
+    def __init__(self, db_path, is_known, min_yield=DEFAULT_MIN_YIELD):
+        """
+        is_known(url) 判断图片是否已下载过（一般为 DownloadLedger.is_known）；
+        min_yield 为 0 时只记录收益、不提前停止
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.is_known = is_known
+        self.min_yield = min_yield
+        self.pages_recorded = 0
+        self.keywords_stopped = 0
+        self.pages_skipped = 0
+
+        # 多个进程可能同时使用同一个图片目录，加锁方式和日志模式见 shared_db
+        self._lock = FileLock(self.db_path)
+        self.conn = connect_shared(self.db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS page_yield (
+                engine TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                results INTEGER NOT NULL,
+                new_results INTEGER NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (engine, keyword, page)
+            )
+        """)
+        self.conn.commit()
+
+    def start(self, engine, keyword, max_pages):
+        """开始一个关键词的翻页，返回 KeywordPaging"""
+        return KeywordPaging(self, engine, keyword, max_pages)
+
+    def record(self, engine, keyword, page, results, new_results):
+        """保存一页的收益，覆盖上次运行的记录"""
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO page_yield "
+                "(engine, keyword, page, results, new_results, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (engine, keyword, page, results, new_results, now)
+            )
+            self.pages_recorded += 1
+
+    def note_stop(self, pages_skipped):
+        """记录一次提前停止翻页"""
+        with self._lock:
+            self.keywords_stopped += 1
+            self.pages_skipped += pages_skipped
+
+    def get_keyword_yield(self, keyword, engine=None):
+        """
+        查询关键词上次运行的总体收益（新图片数/结果数），engine 为 None 时合计所有搜索引擎；
+        没有记录时返回 None。关键词调度器据此在缺口相同的分类之间优先搜索收益高的关键词
+        """
+        query = "SELECT SUM(results), SUM(new_results) FROM page_yield WHERE keyword = ?"
+        params = (keyword,)
+        if engine is not None:
+            query += " AND engine = ?"
+            params += (engine,)
+        with self._lock:
+            row = self.conn.execute(query, params).fetchone()
+        results, new_results = row
+        if not results:
+            return None
+        return new_results / results
+
+    def get_stats(self):
+        """获取本次运行的翻页统计"""
+        return {
+            "收益阈值": self.min_yield,
+            "记录页数": self.pages_recorded,
+            "提前停止关键词": self.keywords_stopped,
+            "节省请求页数": self.pages_skipped,
+        }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self.conn.close()
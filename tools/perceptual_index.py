@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片感知哈希索引
+用dHash为图片生成64位指纹，缩放、重新压缩或加水印后的同一张图片指纹只差几位；
+指纹保存在SQLite中，并放入BK树按汉明距离快速查找相似图片
+"""
+
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from gif_convert import is_converted
+from shared_db import FileLock, connect_shared
+
+# 参与索引的图片扩展名
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
+
+# 扫描目录时跳过的子目录（内容库和另存的原图）
+SKIP_DIRS = ('content_store', 'originals')
+
+# 默认相似阈值：指纹汉明距离不超过该值视为近似重复
+DEFAULT_MAX_DISTANCE = 6
+
+
+def image_dhash(image, hash_size=8):
+    """计算已打开图片的差值哈希（dHash），动图取第一帧"""
+    image.seek(0)
+    small = image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = small.tobytes()
+
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def dhash(filepath, hash_size=8):
+    """计算图片文件的差值哈希；无法解码时返回 None"""
+    try:
+        with Image.open(filepath) as image:
+            return image_dhash(image, hash_size)
+    except Exception as e:
+        logging.warning(f"无法计算图片指纹 {filepath}: {e}")
+        return None
+
+
+def hamming(a, b):
+    """两个指纹之间的汉明距离"""
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """按汉明距离组织的BK树，查询时只访问距离可能满足条件的分支"""
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value, item):
+        """加入一个指纹及其对应的条目"""
+        self.size += 1
+        if self.root is None:
+            self.root = (value, [item], {})
+            return
+        node = self.root
+        while True:
+            node_value, items, children = node
+            distance = hamming(value, node_value)
+            if distance == 0:
+                items.append(item)
+                return
+            child = children.get(distance)
+            if child is None:
+                children[distance] = (value, [item], {})
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """返回距离不超过 max_distance 的 (距离, 条目) 列表，按距离排序"""
+        results = []
+        if self.root is None:
+            return results
+        stack = [self.root]
+        while stack:
+            node_value, items, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= max_distance:
+                results.extend((distance, item) for item in items)
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        results.sort(key=lambda result: result[0])
+        return results
+
+
+class PerceptualIndex:
+    """图片感知哈希索引类（线程安全）"""
+
+    def __init__(self, db_path, max_distance=DEFAULT_MAX_DISTANCE):
+        self.db_path = Path(db_path)
+        self.root = self.db_path.parent
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_distance = max_distance
+        self.near_duplicates = 0
+
+        # 多个进程可能同时使用同一个图片目录，加锁方式和日志模式见 shared_db
+        self._lock = FileLock(self.db_path)
+        self.conn = connect_shared(self.db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                path TEXT PRIMARY KEY,
+                dhash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+        # BK树中的图片，以及已读入的最大 rowid（其他进程保存的指纹在查找前补充进来）
+        self.tree = BKTree()
+        self._indexed = set()
+        self._last_rowid = 0
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        """把数据库中新增的指纹（包括其他进程保存的）加入BK树，调用方需持有锁"""
+        rows = self.conn.execute(
+            "SELECT rowid, path, dhash FROM fingerprints WHERE rowid > ? ORDER BY rowid",
+            (self._last_rowid,)
+        ).fetchall()
+        for rowid, path, value in rows:
+            self._add_to_tree(int(value, 16), path)
+            self._last_rowid = rowid
+
+    def _add_to_tree(self, value, path):
+        """把指纹加入BK树，已在树中的图片不重复加入"""
+        if path not in self._indexed:
+            self._indexed.add(path)
+            self.tree.add(value, path)
+
+    def _relative(self, filepath):
+        """把文件路径转换为相对于索引目录的路径"""
+        try:
+            return Path(filepath).resolve().relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return str(Path(filepath).resolve())
+
+    def _absolute(self, path):
+        """索引中的路径对应的实际文件"""
+        return self.root / path
+
+    def fingerprint(self, filepath):
+        """获取文件指纹，文件未变化时直接使用索引中保存的值"""
+        filepath = Path(filepath)
+        stat = filepath.stat()
+        path = self._relative(filepath)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT dhash, size, mtime FROM fingerprints WHERE path = ?", (path,)
+            ).fetchone()
+        if row is not None and row[1] == stat.st_size and row[2] == stat.st_mtime:
+            return int(row[0], 16)
+        return dhash(filepath)
+
+    def _store(self, filepath, value):
+        """保存指纹并加入BK树，调用方需持有锁"""
+        stat = Path(filepath).stat()
+        path = self._relative(filepath)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO fingerprints (path, dhash, size, mtime, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (path, f"{value:016x}", stat.st_size, stat.st_mtime, time.strftime("%Y-%m-%d %H:%M:%S"))
+            )
+        self._add_to_tree(value, path)
+
+    def check_and_add(self, filepath):
+        """
+        新图片入库前的检查：同一目录中已有近似重复的图片时返回该图片路径，
+        否则把新图片加入索引并返回 None；无法解码的图片不加入索引
+        """
+        filepath = Path(filepath)
+        value = dhash(filepath)
+        if value is None:
+            return None
+        with self._lock:
+            similar = self._find_in_dir(value, filepath.parent, exclude=filepath)
+            if similar:
+                self.near_duplicates += 1
+                return similar
+            self._store(filepath, value)
+        return None
+
+    def find_in_dir(self, value, directory):
+        """查找目录中与指纹近似重复、且文件仍然存在的图片，返回其路径或 None"""
+        with self._lock:
+            return self._find_in_dir(value, directory)
+
+    def _find_in_dir(self, value, directory, exclude=None):
+        """find_in_dir 的实现，调用方需持有锁；先补充其他进程新保存的指纹"""
+        self._refresh()
+        directory = Path(directory).resolve()
+        exclude = Path(exclude).resolve() if exclude is not None else None
+        for _, path in self.tree.search(value, self.max_distance):
+            existing = self._absolute(path).resolve()
+            if existing == exclude:
+                continue
+            if existing.parent == directory and existing.exists():
+                return path
+        return None
+
+    def index_tree(self, directory):
+        """把目录中的图片加入索引（文件未变化时不重新计算），返回处理的图片数"""
+        count = 0
+        directory = Path(directory)
+        for filepath in sorted(directory.rglob('*')):
+            if not filepath.is_file() or filepath.suffix.lower() not in IMAGE_SUFFIXES:
+                continue
+            if any(part in SKIP_DIRS for part in filepath.relative_to(directory).parts[:-1]):
+                continue
+            # gif_convert 批量生成的 .gif.webp 与原GIF是同一张动图，只计入原GIF
+            if is_converted(filepath):
+                continue
+            value = self.fingerprint(filepath)
+            if value is None:
+                continue
+            with self._lock:
+                self._store(filepath, value)
+            count += 1
+        return count
+
+    def find_clusters(self, directories):
+        """找出指定目录中的近似重复图片簇，返回按大小排序的文件路径列表"""
+        directories = [Path(directory).resolve() for directory in directories]
+        with self._lock:
+            rows = self.conn.execute("SELECT path, dhash FROM fingerprints").fetchall()
+
+        # 只保留仍然存在且位于指定目录中的图片
+        entries = {}
+        for path, value in rows:
+            filepath = self._absolute(path).resolve()
+            if filepath.exists() and any(directory in filepath.parents for directory in directories):
+                entries[path] = int(value, 16)
+
+        tree = BKTree()
+        for path, value in entries.items():
+            tree.add(value, path)
+
+        # 并查集合并距离在阈值内的图片
+        parent = {path: path for path in entries}
+
+        def find(path):
+            while parent[path] != path:
+                parent[path] = parent[parent[path]]
+                path = parent[path]
+            return path
+
+        for path, value in entries.items():
+            for _, other in tree.search(value, self.max_distance):
+                root_a, root_b = find(path), find(other)
+                if root_a != root_b:
+                    parent[root_b] = root_a
+
+        clusters = {}
+        for path in entries:
+            clusters.setdefault(find(path), []).append(self._absolute(path).as_posix())
+        return sorted(
+            (sorted(paths) for paths in clusters.values() if len(paths) > 1),
+            key=len, reverse=True
+        )
+
+    def get_stats(self):
+        """获取索引统计"""
+        return {
+            "索引图片": self.tree.size,
+            "相似阈值": self.max_distance,
+            "拒绝近似重复": self.near_duplicates,
+        }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self.conn.close()
+
+
+def main():
+    """扫描图片目录，报告近似重复的图片簇"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="报告图片库中的近似重复图片")
+    parser.add_argument('directories', nargs='*', default=['images', 'cache/unused_images_backup'],
+                        help="要扫描的目录（默认 images 和 cache/unused_images_backup）")
+    parser.add_argument('--index', default='images/perceptual_index.db', help="指纹索引文件")
+    parser.add_argument('--distance', type=int, default=DEFAULT_MAX_DISTANCE,
+                        help=f"视为近似重复的最大汉明距离（默认 {DEFAULT_MAX_DISTANCE}）")
+    parser.add_argument('--output', help="把重复簇写入JSON文件")
+    args = parser.parse_args()
+
+    index = PerceptualIndex(args.index, max_distance=args.distance)
+    directories = [Path(directory) for directory in args.directories if Path(directory).is_dir()]
+    for directory in directories:
+        count = index.index_tree(directory)
+        print(f"📂 {directory}: {count} 张图片")
+
+    clusters = index.find_clusters(directories)
+    duplicates = sum(len(cluster) - 1 for cluster in clusters)
+    print(f"🔍 发现 {len(clusters)} 组近似重复图片，可删除 {duplicates} 张")
+    for number, cluster in enumerate(clusters, 1):
+        print(f"\n第{number}组 ({len(cluster)} 张):")
+        for path in cluster:
+            print(f"   {path}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(clusters, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 结果已写入: {args.output}")
+
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应主机限速器
+为每个主机维护一个令牌桶：响应快时逐步提速，遇到429/503或延迟升高时退避
+"""
+
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+# 搜索接口按较低速率起步，图片CDN可以更快
+SEARCH_HOSTS = {
+    'image.baidu.com',
+    'www.bing.com',
+    'unsplash.com',
+    'duckduckgo.com',
+}
+
+# 每类主机的 (初始速率, 最低速率, 最高速率)，单位：请求/秒
+SEARCH_PROFILE = (0.35, 0.05, 1.0)
+CDN_PROFILE = (1.0, 0.1, 8.0)
+
+
+class HostBucket:
+    """单个主机的令牌桶状态"""
+
+    def __init__(self, rate, min_rate, max_rate, capacity):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.latency = None  # 成功请求延迟的滑动平均
+
+    def refill(self, now):
+        """按当前速率补充令牌"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class HostRateLimiter:
+    """自适应主机限速器类"""
+
+    def __init__(self, capacity=2, increase=0.1, decrease=0.5,
+                 latency_factor=2.0, host_profiles=None, metrics=None, budget=None):
+        self.capacity = capacity
+        self.increase = increase          # 每次快速成功后提高的速率比例
+        self.decrease = decrease          # 429/503 时速率乘以该系数
+        self.latency_factor = latency_factor  # 延迟超过平均值该倍数时视为变慢
+        self.host_profiles = host_profiles or {}
+        self.metrics = metrics                # 可选的 CrawlMetrics，记录每个请求的延迟、状态码和流量
+        self.budget = budget                  # 可选的 CrawlBudget，预算用尽时不再发出请求
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def get_host(self, url):
+        """获取URL对应的主机名"""
+        return urlparse(url).netloc.lower()
+
+    def _profile(self, host):
+        """确定主机的速率配置"""
+        if host in self.host_profiles:
+            return self.host_profiles[host]
+        if host in SEARCH_HOSTS:
+            return SEARCH_PROFILE
+        return CDN_PROFILE
+
+    def _bucket(self, host):
+        """获取（必要时创建）主机的令牌桶，调用方需持有锁"""
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate, min_rate, max_rate = self._profile(host)
+            bucket = HostBucket(rate, min_rate, max_rate, self.capacity)
+            self._buckets[host] = bucket
+        return bucket
+
+    def acquire(self, url):
+        """等待直到该主机允许发出下一个请求"""
+        with self._lock:
+            bucket = self._bucket(self.get_host(url))
+            now = time.monotonic()
+            bucket.refill(now)
+            # 预占一个令牌，令牌不足时计算需要等待的时间
+            bucket.tokens -= 1
+            wait = -bucket.tokens / bucket.rate if bucket.tokens < 0 else 0.0
+            wait = max(wait, bucket.blocked_until - now)
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, url, status_code=None, latency=None, retry_after=None):
+        """根据请求结果调整主机速率，status_code 为 None 表示请求异常"""
+        with self._lock:
+            bucket = self._bucket(self.get_host(url))
+            now = time.monotonic()
+
+            if status_code in (429, 503):
+                bucket.rate = max(bucket.min_rate, bucket.rate * self.decrease)
+                pause = retry_after if retry_after is not None else 1.0 / bucket.rate
+                bucket.blocked_until = max(bucket.blocked_until, now + pause)
+                bucket.tokens = min(bucket.tokens, 0)
+                logging.warning(f"主机限流 {self.get_host(url)} ({status_code})，速率降至 {bucket.rate:.2f}/秒")
+                return
+
+            if status_code is None or status_code >= 500:
+                bucket.rate = max(bucket.min_rate, bucket.rate * 0.75)
+                return
+
+            if latency is None:
+                return
+
+            if bucket.latency is not None and latency > bucket.latency * self.latency_factor:
+                # 延迟明显升高，说明服务器变慢
+                bucket.rate = max(bucket.min_rate, bucket.rate * 0.8)
+            else:
+                bucket.rate = min(bucket.max_rate, bucket.rate * (1 + self.increase))
+
+            if bucket.latency is None:
+                bucket.latency = latency
+            else:
+                bucket.latency = bucket.latency * 0.8 + latency * 0.2
+
+    def get(self, session, url, **kwargs):
+        """限速后发出GET请求，并用响应结果调整速率；爬取预算用尽时抛出 BudgetExhausted"""
+        if self.budget is not None:
+            self.budget.charge_request(url)
+        self.acquire(url)
+        start = time.monotonic()
+        try:
+            response = session.get(url, **kwargs)
+        except Exception:
+            self.record(url)
+            if self.metrics is not None:
+                self.metrics.observe_request(url, None, time.monotonic() - start)
+            raise
+        latency = time.monotonic() - start
+        self.record(
+            url,
+            response.status_code,
+            latency,
+            self.parse_retry_after(response.headers.get('Retry-After'))
+        )
+        if self.metrics is not None:
+            self.metrics.observe_request(url, response.status_code, latency)
+            # 流式响应的正文由下载引擎读取时计入
+            if not kwargs.get('stream'):
+                self.metrics.add_bytes(url, len(response.content))
+        if self.budget is not None and not kwargs.get('stream'):
+            self.budget.add_bytes(len(response.content))
+        return response
+
+    def parse_retry_after(self, value):
+        """解析Retry-After头中的秒数"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None
+
+    def get_rates(self):
+        """获取各主机当前速率（请求/秒）"""
+        with self._lock:
+            return {host: round(bucket.rate, 3) for host, bucket in sorted(self._buckets.items())}
+
+    def log_rates(self):
+        """在日志中输出各主机当前速率"""
+        for host, rate in self.get_rates().items():
+            logging.info(f"主机速率: {host} {rate:.2f} 请求/秒")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜索结果缓存
+按 (搜索引擎, 关键词, 页码) 把解析后的搜索结果保存在SQLite中，
+未过期时直接使用，过期后用 ETag/Last-Modified 条件请求重新验证
+"""
+
+import json
+import time
+from pathlib import Path
+
+from shared_db import FileLock, connect_shared
+
+# 默认缓存有效期（秒）
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+class CachedPage:
+    """缓存中的一页搜索结果"""
+
+    def __init__(self, results, etag, last_modified, fetched_at, ttl):
+        self.results = results
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.fresh = time.time() - fetched_at < ttl
+
+
+class SearchCache:
+    """搜索结果缓存类（线程安全）"""
+
+    def __init__(self, db_path, ttl=DEFAULT_TTL):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+        # 多个进程可能同时使用同一个图片目录，加锁方式和日志模式见 shared_db
+        self._lock = FileLock(self.db_path)
+        self.conn = connect_shared(self.db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_pages (
+                engine TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                results TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (engine, keyword, page)
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, engine, keyword, page):
+        """查询缓存，返回 CachedPage 或 None；过期的条目也会返回，用于条件请求"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT results, etag, last_modified, fetched_at FROM search_pages "
+                "WHERE engine = ? AND keyword = ? AND page = ?",
+                (engine, keyword, page)
+            ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        results, etag, last_modified, fetched_at = row
+        cached = CachedPage(json.loads(results), etag, last_modified, fetched_at, self.ttl)
+        if cached.fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return cached
+
+    def conditional_headers(self, cached):
+        """为过期的缓存条目生成条件请求头"""
+        headers = {}
+        if cached is None:
+            return headers
+        if cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+        return headers
+
+    def revalidate(self, engine, keyword, page, cached, response):
+        """服务器返回304时刷新缓存时间并返回 True，表示缓存结果仍可使用"""
+        if cached is None or response.status_code != 304:
+            return False
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE search_pages SET fetched_at = ? WHERE engine = ? AND keyword = ? AND page = ?",
+                (time.time(), engine, keyword, page)
+            )
+        self.revalidated += 1
+        return True
+
+    def put(self, engine, keyword, page, results, response=None):
+        """保存一页搜索结果；空结果不缓存，避免把被拦截的页面当成真实结果"""
+        if not results:
+            return
+        headers = response.headers if response is not None else {}
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO search_pages "
+                "(engine, keyword, page, results, etag, last_modified, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (engine, keyword, page, json.dumps(results, ensure_ascii=False),
+                 headers.get('ETag'), headers.get('Last-Modified'), time.time())
+            )
+
+    def get_stats(self):
+        """获取缓存命中统计"""
+        return {
+            "命中": self.hits,
+            "重新验证": self.revalidated,
+            "未命中": self.misses,
+        }
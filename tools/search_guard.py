@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜索请求保护
+搜索请求遇到连接错误、超时、429或5xx时按带随机抖动的指数退避重试；
+每个搜索引擎一个熔断器，连续失败（含验证码页面、解析失败和第一页没有结果）达到阈值后在冷却期内不再请求该引擎，
+冷却结束后只放行一个试探请求，其他请求等待试探结果；失效的引擎几乎不再消耗时间
+"""
+
+import logging
+import random
+import threading
+import time
+
+import requests
+
+from crawl_budget import BudgetExhausted
+
+# 搜索请求的超时（连接, 读取），单位：秒；失效的主机在连接阶段就尽快失败
+SEARCH_TIMEOUT = (5, 15)
+
+# 可以重试的状态码
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+# 被重定向到验证码页面时，最终地址中出现的标记
+BLOCKED_URL_MARKERS = ('captcha', 'wappass.baidu.com', '/challenge')
+
+# 反爬提示页面开头出现的标记（百度接口拒绝访问时返回的JSON等）
+BLOCKED_TEXT_MARKERS = ('forbid spider access', 'antiflag')
+
+
+class EngineUnavailable(Exception):
+    """搜索引擎处于熔断冷却期"""
+
+
+class EngineBlocked(Exception):
+    """搜索引擎返回了验证码或反爬页面"""
+
+
+def backoff_delay(attempt, base=1.0, cap=30.0, rng=random):
+    """第 attempt 次重试（从0开始）前的等待时间：在 [0, min(cap, base·2^attempt)] 内均匀取值"""
+    return rng.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def is_blocked(response):
+    """响应是否为验证码或反爬页面"""
+    url = (response.url or '').lower()
+    if any(marker in url for marker in BLOCKED_URL_MARKERS):
+        return True
+    text = response.text[:1000].lower() if response.content else ''
+    return any(marker in text for marker in BLOCKED_TEXT_MARKERS)
+
+
+class CircuitBreaker:
+    """单个搜索引擎的熔断器"""
+
+    def __init__(self, failure_threshold, cooldown, max_cooldown):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.failures = 0        # 连续失败次数
+        self.trips = 0           # 连续熔断次数，冷却时间随之加倍
+        self.open_until = 0.0
+        self.total_trips = 0
+        self.skipped = 0
+        self.probe = None        # 半开状态下发出试探请求的线程
+        self.probe_until = 0.0   # 试探请求迟迟没有结果时，超过该时间改由其他线程试探
+
+    def is_open(self, now):
+        return now < self.open_until
+
+    def is_half_open(self, now):
+        """冷却期已过、但还没有请求成功过"""
+        return self.failures >= self.failure_threshold and not self.is_open(now)
+
+    def record_failure(self, now):
+        """记录一次失败，返回本次是否触发熔断"""
+        self.failures += 1
+        self.probe = None
+        # 冷却结束后的试探请求再次失败时立即重新熔断
+        if self.failures < self.failure_threshold:
+            return False
+        cooldown = min(self.max_cooldown, self.cooldown * (2 ** self.trips))
+        self.open_until = now + cooldown
+        self.trips += 1
+        self.total_trips += 1
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+        self.probe = None
+
+
+class SearchGuard:
+    """搜索请求保护类（线程安全）：重试 + 按引擎熔断"""
+
+    def __init__(self, session, limiter, retries=2, base_delay=1.0, max_delay=30.0,
+                 failure_threshold=3, cooldown=60.0, max_cooldown=600.0, probe_timeout=60.0, metrics=None):
+        self.session = session
+        self.limiter = limiter
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.probe_timeout = probe_timeout
+        self.retried = 0
+        self._breakers = {}
+        self._lock = threading.Lock()
+        # 试探请求有结果时唤醒等待的线程
+        self._probe_done = threading.Condition(self._lock)
+        self._random = random.Random()
+        if metrics is not None:
+            metrics.register_gauge('crawler_open_circuits', "处于熔断冷却期的搜索引擎数", self.open_count)
+
+    def _breaker(self, engine):
+        """获取（必要时创建）引擎的熔断器，调用方需持有锁"""
+        breaker = self._breakers.get(engine)
+        if breaker is None:
+            breaker = CircuitBreaker(self.failure_threshold, self.cooldown, self.max_cooldown)
+            self._breakers[engine] = breaker
+        return breaker
+
+    def available(self, engine):
+        """引擎当前是否可以请求；熔断期内返回 False 并计入跳过次数，爬取预算不再允许时同样返回 False"""
+        budget = self.limiter.budget
+        if budget is not None and not budget.allows(engine):
+            return False
+        with self._lock:
+            breaker = self._breaker(engine)
+            if breaker.is_open(time.monotonic()):
+                breaker.skipped += 1
+                return False
+            return True
+
+    def _acquire_probe(self, engine):
+        """
+        冷却期结束后（半开状态）只让一个线程发出试探请求，其他线程等待试探结果：
+        试探成功后照常请求，再次熔断时抛出 EngineUnavailable
+        """
+        me = threading.get_ident()
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                breaker = self._breaker(engine)
+                if breaker.is_open(now):
+                    breaker.skipped += 1
+                    raise EngineUnavailable(f"搜索引擎 {engine} 处于熔断冷却期")
+                if not breaker.is_half_open(now):
+                    return
+                if breaker.probe in (None, me) or now >= breaker.probe_until:
+                    breaker.probe = me
+                    breaker.probe_until = now + self.probe_timeout
+                    return
+                self._probe_done.wait(breaker.probe_until - now)
+
+    def get(self, engine, url, **kwargs):
+        """
+        经限速器发出搜索请求，可重试的错误按指数退避重试；
+        引擎处于熔断期时抛出 EngineUnavailable，遇到验证码页面时抛出 EngineBlocked（不重试）。
+        请求成功只说明引擎有响应，结果是否可用由调用方通过 record_result 报告
+        （304 表示缓存的结果仍然有效，直接计为成功）
+        """
+        if not self.available(engine):
+            raise EngineUnavailable(f"搜索引擎 {engine} 处于熔断冷却期")
+        self._acquire_probe(engine)
+        kwargs.setdefault('timeout', SEARCH_TIMEOUT)
+
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                response = self.limiter.get(self.session, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last:
+                    raise
+                self._wait(engine, attempt, e)
+                continue
+
+            if response.status_code in RETRY_STATUS:
+                if last:
+                    response.raise_for_status()
+                self._wait(engine, attempt, f"HTTP {response.status_code}")
+                continue
+            if is_blocked(response):
+                raise EngineBlocked(f"{engine} 返回验证码页面: {response.url}")
+            if response.status_code == 304:
+                self._record_success(engine)
+            return response
+
+    def _wait(self, engine, attempt, reason):
+        """重试前退避等待"""
+        with self._lock:
+            self.retried += 1
+            delay = backoff_delay(attempt, self.base_delay, self.max_delay, self._random)
+        logging.info(f"{engine}搜索请求失败（{reason}），{delay:.1f}秒后重试")
+        time.sleep(delay)
+
+    def record_result(self, engine, results, first_page=True):
+        """
+        报告一次搜索的解析结果：有结果时关闭熔断器；第一页没有结果计为一次失败，
+        后面的页没有结果（已到最后一页）不算失败
+        """
+        if results or not first_page:
+            self._record_success(engine)
+        else:
+            self.record_failure(engine, "第一页没有解析到图片")
+
+    def _record_success(self, engine):
+        """引擎正常返回，关闭熔断器"""
+        with self._lock:
+            self._breaker(engine).record_success()
+            self._probe_done.notify_all()
+
+    def record_failure(self, engine, error):
+        """报告一次搜索失败；熔断期内被跳过、或因爬取预算用尽而未发出的请求不计入"""
+        if isinstance(error, (EngineUnavailable, BudgetExhausted)):
+            with self._lock:
+                # 试探请求没有发出，交给其他线程试探
+                breaker = self._breaker(engine)
+                if breaker.probe == threading.get_ident():
+                    breaker.probe = None
+                    self._probe_done.notify_all()
+            return
+        with self._lock:
+            breaker = self._breaker(engine)
+            tripped = breaker.record_failure(time.monotonic())
+            cooldown = breaker.open_until - time.monotonic()
+            self._probe_done.notify_all()
+        if tripped:
+            logging.warning(f"搜索引擎 {engine} 连续失败 {breaker.failures} 次（{error}），"
+                            f"暂停使用 {cooldown:.0f} 秒")
+
+    def open_count(self):
+        """处于熔断冷却期的引擎数"""
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for breaker in self._breakers.values() if breaker.is_open(now))
+
+    def get_stats(self):
+        """获取重试和熔断统计"""
+        now = time.monotonic()
+        with self._lock:
+            engines = {
+                engine: {
+                    "状态": "熔断" if breaker.is_open(now) else "半开" if breaker.is_half_open(now) else "正常",
+                    "连续失败": breaker.failures,
+                    "熔断次数": breaker.total_trips,
+                    "跳过请求": breaker.skipped,
+                }
+                for engine, breaker in sorted(self._breakers.items())
+            }
+            return {"重试次数": self.retried, "搜索引擎": engines}
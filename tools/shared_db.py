@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片目录中共享的SQLite数据库
+多个爬虫进程（也可以是共享文件系统的多台机器）同时使用同一个图片目录时，
+下载记录、图片目录、搜索缓存等数据库统一使用回滚日志模式（网络文件系统上无法使用WAL的共享内存），
+并在数据库旁的锁文件上加 fcntl 锁，部分网络文件系统上SQLite自身的锁并不可靠
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows 上没有 fcntl，只依靠 SQLite 自身的文件锁
+    fcntl = None
+
+# 等待其他进程释放数据库锁的最长时间（秒）
+BUSY_TIMEOUT = 60
+
+
+def connect_shared(db_path, **kwargs):
+    """打开共享数据库：可在多个线程中使用，回滚日志模式"""
+    conn = sqlite3.connect(str(db_path), timeout=BUSY_TIMEOUT, check_same_thread=False, **kwargs)
+    conn.execute("PRAGMA journal_mode=DELETE")
+    return conn
+
+
+# 每个锁文件在本进程中只打开一次：fcntl 的记录锁属于进程，同一进程关闭该文件的任何一个描述符
+# 都会释放进程持有的锁，因此描述符一直保持打开；同一锁文件的所有 FileLock 共用一个线程锁
+_lock_files = {}
+_lock_files_guard = threading.Lock()
+
+
+def _shared_lock_file(path):
+    """返回本进程中该锁文件共用的 (线程锁, 文件对象)"""
+    key = str(Path(path).resolve())
+    with _lock_files_guard:
+        entry = _lock_files.get(key)
+        if entry is None:
+            entry = (threading.Lock(), open(path, 'a') if fcntl is not None else None)
+            _lock_files[key] = entry
+        return entry
+
+
+class FileLock:
+    """
+    共享数据库的锁：线程锁 + 锁文件（数据库文件名加 .lock）上的 fcntl 锁，用法与 threading.Lock 相同；
+    同一进程中同一数据库的多个 FileLock 共用一个线程锁和一个一直打开的锁文件描述符，
+    彼此之间互斥，也不会因为关闭文件而意外释放其他线程持有的锁
+    """
+
+    def __init__(self, db_path):
+        db_path = Path(db_path)
+        self.path = db_path.with_name(db_path.name + ".lock")
+        self._thread_lock, self._file = _shared_lock_file(self.path)
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._file is None:
+            return self
+        try:
+            fcntl.lockf(self._file, fcntl.LOCK_EX)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            if self._file is not None:
+                fcntl.lockf(self._file, fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分类表
+各爬虫的分类、分类词语、关键词扩展规则和通用关键词保存在 taxonomies/ 下的JSON文件中；
+扩展出的搜索关键词经规范化后去重，同一个词出现在多个分类、或扩展后与其他关键词相同时只搜索一次
+"""
+
+import argparse
+import json
+import re
+import unicodedata
+from pathlib import Path
+
+from term_classifier import TermClassifier
+
+# 随爬虫一起提供的分类表目录
+TAXONOMY_DIR = Path(__file__).resolve().parent / "taxonomies"
+
+# 扩展模板中代表分类词语的占位符
+TERM_PLACEHOLDER = "{词}"
+
+
+def normalize_keyword(keyword):
+    """规范化关键词：统一全角半角、大小写，合并多余空白"""
+    keyword = unicodedata.normalize('NFKC', keyword).lower()
+    return re.sub(r'\s+', ' ', keyword).strip()
+
+
+class Taxonomy:
+    """分类表类"""
+
+    def __init__(self, data, source=None):
+        self.source = source
+        self.categories = {category: list(terms) for category, terms in data["分类"].items()}
+        self.default = data["默认分类"]
+        self.priority_terms = data.get("优先词", {})
+        self.expansion_rules = data.get("扩展规则", [{"模板": [TERM_PLACEHOLDER]}])
+        self.general_keywords = data.get("通用关键词", [])
+        self.generated = 0
+        self.duplicates = 0
+
+        for category in list(self.priority_terms) + [self.default]:
+            if category not in self.categories:
+                raise ValueError(f"分类表 {source} 中没有分类: {category}")
+
+    @classmethod
+    def load(cls, path):
+        """从JSON文件读取分类表；path 只给出名称时在 taxonomies/ 中查找"""
+        path = Path(path)
+        # 当前目录中的同名目录（例如爬虫的下载目录）不是分类表
+        if not path.suffix and not path.is_file():
+            path = TAXONOMY_DIR / f"{path.name}.json"
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), source=path)
+
+    def classifier(self):
+        """
+        编译分类用的多模式自动机：先匹配优先词（如动图），再按分类表的顺序匹配各分类的词语；
+        有优先词的分类不再参与按词语匹配
+        """
+        rules = list(self.priority_terms.items())
+        rules += [(category, terms) for category, terms in self.categories.items()
+                  if category not in self.priority_terms]
+        return TermClassifier(rules, default=self.default)
+
+    def _templates(self, category, term):
+        """适用于某个分类词语的扩展模板"""
+        for rule in self.expansion_rules:
+            if "分类" in rule and category not in rule["分类"]:
+                continue
+            if "包含" in rule and rule["包含"] not in term:
+                continue
+            yield from rule["模板"]
+
+    def expand_keywords(self):
+        """
+        按扩展规则生成搜索关键词，再加上通用关键词；
+        规范化后相同的关键词只保留第一次出现的写法
+        """
+        candidates = [
+            template.replace(TERM_PLACEHOLDER, term)
+            for category, terms in self.categories.items()
+            for term in terms
+            for template in self._templates(category, term)
+        ] + list(self.general_keywords)
+
+        keywords = []
+        seen = set()
+        for keyword in candidates:
+            key = normalize_keyword(keyword)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            keywords.append(keyword.strip())
+
+        self.generated = len(candidates)
+        self.duplicates = len(candidates) - len(keywords)
+        return keywords
+
+    def get_stats(self):
+        """获取关键词扩展统计"""
+        return {
+            "分类表": str(self.source) if self.source else None,
+            "生成关键词": self.generated,
+            "重复关键词": self.duplicates,
+        }
+
+
+def main():
+    """列出分类表扩展出的关键词和其中的重复项"""
+    parser = argparse.ArgumentParser(description="分类表：查看扩展出的搜索关键词")
+    parser.add_argument('taxonomy', help="分类表名称（animal、cell、human_body）或JSON文件路径")
+    parser.add_argument('--list', action='store_true', help="列出全部关键词")
+    args = parser.parse_args()
+
+    taxonomy = Taxonomy.load(args.taxonomy)
+    keywords = taxonomy.expand_keywords()
+    classifier = taxonomy.classifier()
+    if args.list:
+        for keyword in keywords:
+            print(f"  {classifier.classify('', keyword)}\t{keyword}")
+    stats = taxonomy.get_stats()
+    print(f"{len(taxonomy.categories)} 个分类，生成 {stats['生成关键词']} 个关键词，"
+          f"去掉重复 {stats['重复关键词']} 个，实际搜索 {len(keywords)} 个")
+
+
+if __name__ == "__main__":
+    main()
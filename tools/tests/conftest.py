@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""爬虫公共模块的测试：tools/ 下的模块都是平铺的脚本，测试前把 tools/ 加入模块搜索路径"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
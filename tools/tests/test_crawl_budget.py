@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""crawl_budget 的测试：各项预算用尽后不再发出请求"""
+
+import pytest
+
+import crawl_budget
+from crawl_budget import BudgetExhausted, CrawlBudget
+
+BAIDU = "https://image.baidu.com/search/acjson"
+BAIDU_IMAGE = "https://img0.bdimg.com/a.jpg"
+BING = "https://www.bing.com/images/search"
+
+
+def test_unlimited_budget_never_runs_out():
+    budget = CrawlBudget()
+    for _ in range(100):
+        budget.charge_request(BAIDU)
+    budget.add_bytes(10 ** 9)
+    assert budget.exhausted() is None
+    assert budget.get_stats()["各引擎请求数"] == {"baidu": 100}
+
+
+def test_request_limit_is_per_engine_including_image_hosts():
+    budget = CrawlBudget(max_requests=2)
+    budget.charge_request(BING)
+    budget.charge_request(BAIDU)
+    budget.charge_request(BAIDU_IMAGE)
+    with pytest.raises(BudgetExhausted):
+        budget.charge_request(BAIDU)
+    assert not budget.allows_url(BAIDU_IMAGE)
+
+    # 用到的引擎中还有可以请求的，整体预算没有用尽
+    assert budget.exhausted() is None
+    assert budget.allows('bing')
+    budget.charge_request(BING)
+    assert budget.exhausted() == "各引擎请求数达到 2"
+    assert budget.get_stats()["拒绝的请求"] == 2
+
+
+def test_bandwidth_limit_stops_all_engines():
+    budget = CrawlBudget(max_mb=1)
+    budget.charge_request(BAIDU)
+    budget.add_bytes(1024 * 1024 - 1)
+    assert budget.exhausted() is None
+    budget.add_bytes(1)
+    assert budget.exhausted() == "下载流量达到 1MB"
+    assert not budget.allows('bing')
+    with pytest.raises(BudgetExhausted):
+        budget.charge_request(BING)
+
+
+def test_time_limit(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(crawl_budget.time, 'monotonic', lambda: now[0])
+    budget = CrawlBudget(max_minutes=1)
+    now[0] += 59
+    assert budget.exhausted() is None
+    now[0] += 1
+    assert budget.exhausted() == "运行时间达到 1 分钟"
+
+
+def test_disk_limit_is_checked_at_intervals(monkeypatch, tmp_path):
+    now = [1000.0]
+    used = [5 * 1024 * 1024]
+    monkeypatch.setattr(crawl_budget.time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(CrawlBudget, '_disk_used', lambda self: used[0])
+    budget = CrawlBudget(max_disk_mb=2)
+    budget.start(tmp_path)
+
+    used[0] += 2 * 1024 * 1024
+    # 查询间隔未到时沿用上次的磁盘用量
+    assert budget.exhausted() is None
+    now[0] += crawl_budget.DISK_CHECK_INTERVAL
+    assert budget.exhausted() == "磁盘增长达到 2MB"
+    assert budget.get_stats()["磁盘增长(MB)"] == 2.0
+
+
+def test_exhaustion_is_sticky_until_restart():
+    budget = CrawlBudget(max_mb=1)
+    budget.add_bytes(2 * 1024 * 1024)
+    assert budget.exhausted() is not None
+    assert budget.get_stats()["停止原因"] == "下载流量达到 1MB"
+
+    # 新的一轮重新计数
+    budget.start()
+    assert budget.exhausted() is None
+    budget.charge_request(BAIDU)
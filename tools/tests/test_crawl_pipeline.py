@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""爬取流水线的测试：爬虫对本地模拟搜索服务器完整运行（与 crawl_benchmark 相同的方式）"""
+
+import hashlib
+import json
+
+import pytest
+from PIL import Image
+
+import rate_limiter
+import search_guard
+from crawl_benchmark import run_crawler
+from mock_search_server import FaultProfile, MockSearchServer
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # 爬虫模块导入时在当前目录创建日志文件
+    monkeypatch.chdir(tmp_path)
+    # 本地服务器不需要按真实搜索引擎的速率起步，重试也不必等待（只影响本进程中运行的爬虫）
+    monkeypatch.setattr(rate_limiter, 'SEARCH_PROFILE', (5.0, 0.05, 20.0))
+    monkeypatch.setattr(search_guard, 'backoff_delay', lambda *args: 0.0)
+    return tmp_path
+
+
+def start_server(**kwargs):
+    return MockSearchServer(profile=FaultProfile(0.0, seed=0, **kwargs), duplicate_rate=0.1).start()
+
+
+def saved_images(crawl_dir):
+    """各分类目录中保存的图片，{分类: [文件, ...]}"""
+    return {
+        category.name: sorted(path for path in category.iterdir() if path.suffix == '.webp')
+        for category in crawl_dir.iterdir() if category.is_dir()
+    }
+
+
+def test_crawl_fills_categories_up_to_limit(workdir):
+    server = start_server()
+    try:
+        result = run_crawler('animal', server, workdir, keywords=3, per_category=2)
+    finally:
+        server.stop()
+
+    crawl_dir = workdir / "animal" / "images" / "动物"
+    images = saved_images(crawl_dir)
+    assert result["入库图片"] == sum(len(paths) for paths in images.values()) > 0
+    assert all(len(paths) <= 2 for paths in images.values())
+    for paths in images.values():
+        for path in paths:
+            with Image.open(path) as image:
+                assert image.format == 'WEBP'
+
+    report = json.loads((crawl_dir / "下载报告.json").read_text(encoding='utf-8'))
+    assert report["总下载数量"] == result["入库图片"]
+    # 正常结束时删除检查点
+    assert not (crawl_dir / "爬取进度.json").exists()
+
+
+def test_second_run_skips_known_images(workdir):
+    server = start_server()
+    try:
+        first = run_crawler('animal', server, workdir, keywords=3, per_category=2)
+        second = run_crawler('animal', server, workdir, keywords=3, per_category=2)
+    finally:
+        server.stop()
+
+    images = [path for paths in saved_images(workdir / "animal" / "images" / "动物").values() for path in paths]
+    assert len(images) == first["入库图片"] + second["入库图片"]
+    # 第二次运行由下载记录和内容库跳过第一次已保存的图片
+    digests = [hashlib.sha256(path.read_bytes()).hexdigest() for path in images]
+    assert len(set(digests)) == len(digests)
+
+
+def test_server_errors_do_not_stop_the_crawl(workdir):
+    server = start_server(error_rate=0.3)
+    try:
+        result = run_crawler('animal', server, workdir, keywords=3, per_category=2)
+    finally:
+        server.stop()
+    # 出错的搜索和下载请求由重试和下一个关键词补上
+    assert result["入库图片"] > 0
+    assert result["引擎指标"]["baidu"]["5xx比例"] > 0
+
+
+def test_two_workers_share_category_limits(workdir):
+    server = start_server()
+    try:
+        result = run_crawler('animal', server, workdir, keywords=3, per_category=2, workers=2)
+    finally:
+        server.stop()
+
+    images = saved_images(workdir / "animal" / "images" / "动物")
+    assert result["入库图片"] == sum(len(paths) for paths in images.values()) > 0
+    # 名额由协调队列分配，两个进程合计也不超过分类上限，文件名也不重复
+    assert all(len(paths) <= 2 for paths in images.values())
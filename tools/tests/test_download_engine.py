@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""download_engine 的测试：残留临时文件的清理"""
+
+import os
+import time
+
+from download_engine import DownloadEngine
+
+
+def test_sweep_removes_only_stale_spool_files(tmp_path):
+    category = tmp_path / "猫科"
+    category.mkdir()
+    stale = [category / ".download_abc.part", category / ".猫_001.webp.part"]
+    fresh = category / ".download_def.part"
+    image = category / "猫_001.webp"
+    for path in stale + [fresh, image]:
+        path.write_bytes(b"data")
+    old = time.time() - 7200
+    for path in stale + [image]:
+        os.utime(path, (old, old))
+
+    assert DownloadEngine().sweep_spool_files(tmp_path) == 2
+    assert not any(path.exists() for path in stale)
+    assert fresh.exists() and image.exists()
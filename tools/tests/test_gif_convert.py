@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""gif_convert 的测试：输出文件名、HTML引用更新和批量转换的出错处理"""
+
+import sys
+
+from PIL import Image
+
+import gif_convert
+from gif_convert import convert_gif, converted_path, is_converted, rewrite_html
+
+
+def make_gif(path, frames=3):
+    images = [Image.new('RGB', (32, 32), (index * 60, 0, 0)) for index in range(frames)]
+    images[0].save(path, save_all=True, append_images=images[1:], duration=80, loop=0)
+    return path
+
+
+def test_convert_does_not_touch_unrelated_webp(tmp_path):
+    gif_path = make_gif(tmp_path / "猫.gif")
+    unrelated = tmp_path / "猫.webp"
+    Image.new('RGB', (8, 8)).save(unrelated, 'WEBP')
+    before = unrelated.read_bytes()
+
+    size, outputs = convert_gif(gif_path)
+    assert outputs == [str(tmp_path / "猫.gif.webp")]
+    assert unrelated.read_bytes() == before
+    with Image.open(outputs[0]) as image:
+        assert image.n_frames == 3
+    assert is_converted(outputs[0])
+    assert not is_converted(unrelated)
+    assert not is_converted(gif_path)
+
+
+def test_rewrite_html_uses_converted_webp(tmp_path):
+    make_gif(tmp_path / "猫.gif")
+    make_gif(tmp_path / "狗.gif")
+    convert_gif(tmp_path / "猫.gif")
+    # 只有同名的普通WebP、没有转换结果时不改写
+    Image.new('RGB', (8, 8)).save(tmp_path / "狗.webp", 'WEBP')
+    html = tmp_path / "chapter.html"
+    html.write_text('<img src="猫.gif"><img src="狗.gif">', encoding='utf-8')
+
+    assert rewrite_html(html) == 1
+    content = html.read_text(encoding='utf-8')
+    assert '<source srcset="猫.gif.webp" type="image/webp">' in content
+    assert '<img src="狗.gif">' in content and '狗.webp' not in content
+    # 再次运行不重复包裹
+    assert rewrite_html(html) == 0
+
+
+def test_batch_continues_after_corrupt_gif(tmp_path, monkeypatch, capsys):
+    make_gif(tmp_path / "a.gif")
+    (tmp_path / "b.gif").write_bytes(b"GIF89a not really a gif")
+    make_gif(tmp_path / "c.gif")
+    monkeypatch.setattr(sys, 'argv', ['gif_convert.py', str(tmp_path)])
+
+    gif_convert.main()
+    assert converted_path(tmp_path / "a.gif").exists()
+    assert converted_path(tmp_path / "c.gif").exists()
+    assert not converted_path(tmp_path / "b.gif").exists()
+    assert "1 个GIF转换失败" in capsys.readouterr().out
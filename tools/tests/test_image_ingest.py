@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""image_ingest 的测试：颜色模式、尺寸校验和动图处理（直接调用 normalize_image，不启动进程池）"""
+
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from image_ingest import (REJECT_BAD_ASPECT, REJECT_TOO_SMALL, REJECT_UNDECODABLE, IngestRejected,
+                          normalize_image)
+
+
+def ingest(source, target, max_edge=800):
+    path, size, digest = normalize_image(source, target, max_edge, 80, 100, 4.0)
+    return Path(path)
+
+
+def save_animation(path, format, frames=3, size=(200, 200)):
+    images = [Image.effect_noise(size, 40 + index * 30).convert('RGB') for index in range(frames)]
+    images[0].save(path, format, save_all=True, append_images=images[1:], duration=100, loop=0)
+    return path
+
+
+def truncate(path, ratio=0.8):
+    data = path.read_bytes()
+    path.write_bytes(data[:int(len(data) * ratio)])
+    return path
+
+
+@pytest.mark.parametrize("mode, expected", [
+    ('RGB', 'RGB'), ('L', 'RGB'), ('CMYK', 'RGB'), ('RGBA', 'RGBA'), ('LA', 'RGBA'),
+])
+def test_modes_are_converted_to_webp(tmp_path, mode, expected):
+    source = tmp_path / "source.bin"
+    Image.new(mode, (300, 200)).save(source, 'TIFF')
+    path = ingest(source, tmp_path / "图片.jpg")
+    assert path.name == "图片.webp"
+    with Image.open(path) as image:
+        assert image.format == 'WEBP'
+        assert image.mode == expected
+
+
+def test_palette_transparency_keeps_alpha(tmp_path):
+    source = tmp_path / "source.bin"
+    image = Image.new('P', (200, 200), 0)
+    image.info['transparency'] = 0
+    image.save(source, 'PNG', transparency=0)
+    with Image.open(ingest(source, tmp_path / "a.png")) as result:
+        assert result.mode == 'RGBA'
+
+
+def test_large_image_is_resized_and_exif_dropped(tmp_path):
+    source = tmp_path / "source.bin"
+    exif = Image.Exif()
+    exif[0x010F] = "camera"
+    Image.new('RGB', (2000, 1000)).save(source, 'JPEG', exif=exif)
+    with Image.open(ingest(source, tmp_path / "a.jpg")) as result:
+        assert result.size == (800, 400)
+        assert not result.getexif()
+
+
+@pytest.mark.parametrize("size, reason", [((50, 300), REJECT_TOO_SMALL), ((1000, 200), REJECT_BAD_ASPECT)])
+def test_size_gates(tmp_path, size, reason):
+    source = tmp_path / "source.bin"
+    Image.new('RGB', size).save(source, 'PNG')
+    with pytest.raises(IngestRejected) as error:
+        ingest(source, tmp_path / "a.png")
+    assert error.value.args[0] == reason
+    assert list(tmp_path.iterdir()) == [source]
+
+
+def test_truncated_still_image_is_rejected(tmp_path):
+    source = tmp_path / "source.bin"
+    Image.effect_noise((300, 300), 60).convert('RGB').save(source, 'PNG')
+    truncate(source)
+    with pytest.raises(IngestRejected) as error:
+        ingest(source, tmp_path / "a.png")
+    assert error.value.args[0] == REJECT_UNDECODABLE
+
+
+def test_animated_gif_becomes_animated_webp(tmp_path):
+    source = save_animation(tmp_path / "source.bin", 'GIF')
+    path = ingest(source, tmp_path / "动图.gif")
+    assert path.name == "动图.webp"
+    with Image.open(path) as image:
+        assert image.format == 'WEBP'
+        assert image.n_frames == 3
+
+
+def test_animated_png_is_kept_as_is(tmp_path):
+    source = save_animation(tmp_path / "source.bin", 'PNG')
+    data = source.read_bytes()
+    path = ingest(source, tmp_path / "动图.png")
+    assert path.name == "动图.png"
+    assert path.read_bytes() == data
+    assert not source.exists()
+
+
+@pytest.mark.parametrize("format, name", [('GIF', "动图.gif"), ('PNG', "动图.png")])
+def test_truncated_later_frame_is_rejected(tmp_path, format, name):
+    source = truncate(save_animation(tmp_path / "source.bin", format))
+    # 第一帧完好，只有后面的帧被截断
+    with Image.open(source) as image:
+        image.load()
+    with pytest.raises(IngestRejected) as error:
+        ingest(source, tmp_path / name)
+    assert error.value.args[0] == REJECT_UNDECODABLE
+    assert not (tmp_path / name).exists()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""job_queue 的测试：租用、加入、继续爬取、名额分配和心跳"""
+
+import time
+
+import pytest
+
+from job_queue import JobQueue
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    """在同一个数据库上创建多个进程的队列，测试结束时全部退出，停止心跳线程"""
+    queues = []
+
+    def factory(worker_id, **kwargs):
+        queue = JobQueue(tmp_path / "job_queue.db", worker_id=worker_id, **kwargs)
+        queues.append(queue)
+        return queue
+
+    yield factory
+    for queue in queues:
+        queue.leave()
+
+
+def test_claim_is_exclusive_until_released(make_queue):
+    first = make_queue("a")
+    second = make_queue("b")
+    first.join()
+    second.join()
+
+    assert first.claim('baidu', '猫', 0)
+    assert not second.claim('baidu', '猫', 0)
+
+    first.release('baidu', '猫', 0)
+    assert second.claim('baidu', '猫', 0)
+    second.complete('baidu', '猫', 0)
+    assert not first.claim('baidu', '猫', 0)
+
+
+def test_expired_lease_can_be_taken_over(make_queue):
+    first = make_queue("a", lease_seconds=-1)
+    second = make_queue("b", lease_seconds=-1)
+    first.join()
+    assert first.claim('baidu', '猫', 0)
+    assert second.claim('baidu', '猫', 0)
+
+
+def test_skipped_pages_are_not_claimed(make_queue):
+    queue = make_queue("a")
+    queue.join()
+    assert queue.claim('baidu', '猫', 0)
+    queue.complete('baidu', '猫', 0)
+    queue.skip('baidu', '猫', range(1, 3))
+    assert not queue.claim('baidu', '猫', 1)
+    assert not queue.claim('baidu', '猫', 2)
+
+
+def test_new_round_clears_previous_jobs(make_queue):
+    queue = make_queue("a")
+    queue.join()
+    queue.claim('baidu', '猫', 0)
+    queue.complete('baidu', '猫', 0)
+    queue.leave()
+
+    assert not make_queue("b").join()
+    assert make_queue("c").claim('baidu', '猫', 0)
+
+
+def test_join_running_round_keeps_jobs(make_queue):
+    first = make_queue("a")
+    first.join()
+    first.claim('baidu', '猫', 0)
+    first.complete('baidu', '猫', 0)
+
+    second = make_queue("b")
+    assert second.join()
+    assert not second.claim('baidu', '猫', 0)
+
+
+def test_resume_reopens_only_unfinished_keywords(make_queue):
+    queue = make_queue("a")
+    queue.join()
+    for keyword in ('猫', '狗'):
+        queue.claim('baidu', keyword, 0)
+        queue.complete('baidu', keyword, 0)
+    queue.leave()
+
+    resumed = make_queue("b")
+    resumed.join(resume=True, completed=['猫'])
+    assert not resumed.claim('baidu', '猫', 0)
+    assert resumed.claim('baidu', '狗', 0)
+
+
+def test_slot_limit_and_release(make_queue):
+    queue = make_queue("a")
+    queue.join()
+    assert [queue.allocate_slot('猫科', 2) for _ in range(3)] == [1, 2, None]
+
+    queue.release_slot('猫科')
+    # 名额归还后可以再分配，但文件编号不回收
+    assert queue.allocate_slot('猫科', 2) == 3
+
+
+def test_resume_reconciles_slots_with_saved_images(make_queue):
+    queue = make_queue("a")
+    queue.join()
+    for _ in range(3):
+        queue.allocate_slot('猫科', 3)
+    queue.leave()
+
+    # 中断时只保存了1张，其余2个名额已分配但没有下载成功
+    resumed = make_queue("b")
+    seen = []
+
+    def count_slots(since):
+        seen.append(since)
+        return {'猫科': 1}
+
+    resumed.join(resume=True, count_slots=count_slots)
+    assert seen == [queue.round_started]
+    assert resumed.allocate_slot('猫科', 3) == 4
+    assert resumed.allocate_slot('猫科', 3) == 5
+    assert resumed.allocate_slot('猫科', 3) is None
+
+
+def test_heartbeat_keeps_idle_worker_alive(make_queue):
+    # 租约3秒，心跳每秒更新一次；期间不租用任务，模拟长时间下载
+    busy = make_queue("a", lease_seconds=3)
+    busy.join()
+    busy.claim('baidu', '猫', 0)
+    busy.complete('baidu', '猫', 0)
+    time.sleep(4)
+
+    newcomer = make_queue("b", lease_seconds=3)
+    assert newcomer.join()
+    assert not newcomer.claim('baidu', '猫', 0)
+
+
+def test_reopen_returns_own_finished_jobs_to_pending(make_queue):
+    first = make_queue("a")
+    second = make_queue("b")
+    first.join()
+    second.join()
+    for page in range(2):
+        first.claim('bing', '猫', page)
+        first.complete('bing', '猫', page)
+    first.skip('bing', '猫', [2])
+    second.claim('bing', '狗', 0)
+    second.complete('bing', '狗', 0)
+
+    # 搜索结果被丢弃后重新开放，只影响本进程在该关键词上的任务
+    assert first.reopen('bing', '猫') == 3
+    assert first.reopen('bing', '狗') == 0
+    assert all(second.claim('bing', '猫', page) for page in range(3))
+    assert not first.claim('bing', '狗', 0)
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""keyword_scheduler 的测试：按分类缺口和上次收益选择关键词"""
+
+from keyword_scheduler import KeywordScheduler
+from page_yield import PageYieldTracker
+
+
+def categorize(title, keyword):
+    return keyword.split('-')[0]
+
+
+def test_largest_deficit_first_and_full_categories_skipped():
+    counts = {'猫': 3, '狗': 1}
+    scheduler = KeywordScheduler(['猫-a', '狗-a', '鸟-a'], categorize, counts, 3)
+    assert scheduler.pick([0, 1, 2]) == 2
+    counts['鸟'] = 3
+    assert scheduler.pick([0, 1]) == 1
+    counts['狗'] = 3
+    assert scheduler.pick([0]) is None
+    assert scheduler.get_stats()["分类已满的关键词"] == 3
+
+
+def test_equal_deficit_prefers_higher_last_yield(tmp_path):
+    tracker = PageYieldTracker(tmp_path / "page_yield.db", lambda url: False)
+    tracker.record('baidu', '猫-旧', 0, 30, 3)
+    tracker.record('baidu', '猫-好', 0, 30, 20)
+    tracker.record('bing', '猫-好', 0, 20, 20)
+    assert tracker.get_keyword_yield('猫-好') == 0.8
+    assert tracker.get_keyword_yield('猫-好', 'baidu') == 20 / 30
+    assert tracker.get_keyword_yield('猫-新') is None
+
+    keywords = ['猫-旧', '猫-好', '猫-新']
+    scheduler = KeywordScheduler(keywords, categorize, {}, 5, keyword_yield=tracker.get_keyword_yield)
+    # 从未搜索过的关键词按全是新图片计算，其次是上次收益高的
+    assert scheduler.pick([0, 1, 2]) == 2
+    assert scheduler.pick([0, 1]) == 1
+    assert scheduler.pick([0]) == 0
+    assert scheduler.get_stats()["低收益推后次数"] == 2
+    tracker.close()
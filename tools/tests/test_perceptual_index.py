@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""perceptual_index 的测试：BK树按汉明距离查找与暴力查找一致，近似重复图片的检测"""
+
+import random
+
+import pytest
+from PIL import Image
+
+from perceptual_index import BKTree, PerceptualIndex, hamming
+
+
+def flip_bits(value, count, rng):
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+@pytest.mark.parametrize("max_distance", [0, 3, 6, 12])
+def test_bk_tree_search_matches_brute_force(max_distance):
+    rng = random.Random(max_distance)
+    # 若干簇相近的指纹加上随机指纹，其中有完全相同的值
+    centers = [rng.getrandbits(64) for _ in range(20)]
+    values = [flip_bits(rng.choice(centers), rng.randint(0, 10), rng) for _ in range(400)]
+    values += [rng.getrandbits(64) for _ in range(200)] + centers[:5]
+
+    tree = BKTree()
+    for item, value in enumerate(values):
+        tree.add(value, item)
+    assert tree.size == len(values)
+
+    for query in centers + [rng.getrandbits(64) for _ in range(10)]:
+        results = tree.search(query, max_distance)
+        expected = sorted(
+            (hamming(query, value), item) for item, value in enumerate(values)
+            if hamming(query, value) <= max_distance
+        )
+        assert sorted(results) == expected
+        assert [distance for distance, _ in results] == sorted(distance for distance, _ in results)
+
+
+def test_empty_tree():
+    assert BKTree().search(0, 64) == []
+
+
+def save_pattern(path, size=(240, 180), quality=95, extent=(-2.0, -1.2, 1.0, 1.2)):
+    image = Image.effect_mandelbrot(size, extent, 60).convert('RGB')
+    image.save(path, 'JPEG', quality=quality)
+    return path
+
+
+def test_near_duplicate_in_same_directory_is_rejected(tmp_path):
+    (tmp_path / "猫").mkdir()
+    (tmp_path / "狗").mkdir()
+    index = PerceptualIndex(tmp_path / "perceptual_index.db")
+
+    original = save_pattern(tmp_path / "猫" / "a.jpg")
+    assert index.check_and_add(original) is None
+    # 缩小并重新压缩后只差几位
+    assert index.check_and_add(save_pattern(tmp_path / "猫" / "b.jpg", (120, 90), 40)) == "猫/a.jpg"
+    # 内容不同的图片
+    assert index.check_and_add(save_pattern(tmp_path / "猫" / "d.jpg", extent=(-0.8, 0.0, -0.6, 0.2))) is None
+    # 其他分类目录中的同一张图不算重复
+    assert index.check_and_add(save_pattern(tmp_path / "狗" / "a.jpg")) is None
+    # 已删除的图片不再算重复
+    original.unlink()
+    assert index.check_and_add(save_pattern(tmp_path / "猫" / "c.jpg")) is None
+    assert index.get_stats()["拒绝近似重复"] == 1
+    index.close()
+
+
+def test_other_process_fingerprints_are_seen(tmp_path):
+    first = PerceptualIndex(tmp_path / "perceptual_index.db")
+    second = PerceptualIndex(tmp_path / "perceptual_index.db")
+    assert first.check_and_add(save_pattern(tmp_path / "a.jpg")) is None
+    assert second.check_and_add(save_pattern(tmp_path / "b.jpg", quality=50)) == "a.jpg"
+    first.close()
+    second.close()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""rate_limiter 的测试：快速成功时提速，限流、出错和延迟升高时退避"""
+
+import pytest
+
+import rate_limiter
+from crawl_budget import BudgetExhausted, CrawlBudget
+from rate_limiter import CDN_PROFILE, SEARCH_PROFILE, HostRateLimiter
+
+SEARCH = "https://image.baidu.com/search/acjson"
+CDN = "https://img0.bdimg.com/a.jpg"
+
+
+class FakeClock:
+    """替代 time.monotonic 和 time.sleep，sleep 只推进时间并记录等待时长"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(rate_limiter.time, 'sleep', clock.sleep)
+    return clock
+
+
+def rate(limiter, url):
+    return limiter.get_rates()[limiter.get_host(url)]
+
+
+def test_profiles_by_host(clock):
+    limiter = HostRateLimiter(host_profiles={'cdn.example.com': (2.0, 1.0, 4.0)})
+    limiter.record(SEARCH)
+    limiter.record(CDN)
+    limiter.record("https://cdn.example.com/a.jpg")
+    rates = limiter.get_rates()
+    assert rates['image.baidu.com'] == round(SEARCH_PROFILE[0] * 0.75, 3)
+    assert rates['img0.bdimg.com'] == round(CDN_PROFILE[0] * 0.75, 3)
+    assert rates['cdn.example.com'] == 1.5
+
+
+def test_fast_successes_increase_rate_up_to_max(clock):
+    limiter = HostRateLimiter(increase=0.5)
+    for _ in range(50):
+        limiter.record(CDN, 200, 0.1)
+    assert rate(limiter, CDN) == CDN_PROFILE[2]
+
+
+def test_throttling_halves_rate_and_honours_retry_after(clock):
+    limiter = HostRateLimiter()
+    limiter.record(CDN, 429, 0.1, retry_after=5)
+    assert rate(limiter, CDN) == CDN_PROFILE[0] * 0.5
+
+    limiter.acquire(CDN)
+    assert clock.sleeps == [pytest.approx(5)]
+
+
+def test_backoff_never_goes_below_min_rate(clock):
+    limiter = HostRateLimiter()
+    for _ in range(20):
+        limiter.record(SEARCH, 503)
+    assert rate(limiter, SEARCH) == SEARCH_PROFILE[1]
+
+
+def test_latency_spike_slows_down(clock):
+    limiter = HostRateLimiter(increase=0.1)
+    limiter.record(CDN, 200, 0.1)
+    before = rate(limiter, CDN)
+    limiter.record(CDN, 200, 0.5)
+    assert rate(limiter, CDN) == round(before * 0.8, 3)
+
+
+def test_acquire_spaces_requests_at_current_rate(clock):
+    limiter = HostRateLimiter(capacity=2)
+    # 令牌桶满时可以连续发出 capacity 个请求，之后按速率（1次/秒）等待
+    for _ in range(4):
+        limiter.acquire(CDN)
+    assert clock.sleeps == [pytest.approx(1.0), pytest.approx(1.0)]
+
+
+def test_budget_is_charged_before_request(clock):
+    class Session:
+        calls = 0
+
+        def get(self, url, **kwargs):
+            Session.calls += 1
+            raise AssertionError("预算用尽后不应发出请求")
+
+    limiter = HostRateLimiter(budget=CrawlBudget(max_requests=0))
+    with pytest.raises(BudgetExhausted):
+        limiter.get(Session(), SEARCH)
+    assert Session.calls == 0
+
+
+def test_parse_retry_after():
+    limiter = HostRateLimiter()
+    assert limiter.parse_retry_after("3") == 3.0
+    assert limiter.parse_retry_after("-1") == 0.0
+    assert limiter.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") is None
+    assert limiter.parse_retry_after(None) is None
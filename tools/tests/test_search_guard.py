@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""search_guard 的测试：熔断器的关闭、熔断、半开试探和空结果的计数"""
+
+import threading
+import time
+
+import pytest
+
+from search_guard import EngineBlocked, EngineUnavailable, SearchGuard
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, text='{}', url='https://image.baidu.com/search/acjson'):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.url = url
+        self.headers = {}
+
+
+class FakeLimiter:
+    """按顺序返回预设的响应；gate 不为 None 时请求在此等待，模拟慢的试探请求"""
+
+    budget = None
+
+    def __init__(self, responses=None, gate=None):
+        self.responses = list(responses or [])
+        self.gate = gate
+        self.calls = 0
+
+    def get(self, session, url, **kwargs):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        return self.responses.pop(0) if self.responses else FakeResponse()
+
+
+def make_guard(limiter=None, **kwargs):
+    kwargs.setdefault('failure_threshold', 2)
+    kwargs.setdefault('cooldown', 0.05)
+    return SearchGuard(None, limiter or FakeLimiter(), base_delay=0, max_delay=0, **kwargs)
+
+
+def trip(guard, engine='baidu'):
+    for _ in range(guard.failure_threshold):
+        guard.record_result(engine, [])
+
+
+def test_empty_first_page_counts_as_failure():
+    guard = make_guard()
+    trip(guard)
+    assert not guard.available('baidu')
+    assert guard.get_stats()["搜索引擎"]["baidu"]["状态"] == "熔断"
+    with pytest.raises(EngineUnavailable):
+        guard.get('baidu', 'https://image.baidu.com/search/acjson')
+
+
+def test_empty_later_page_is_not_a_failure():
+    guard = make_guard()
+    guard.record_result('baidu', [], first_page=True)
+    for _ in range(5):
+        guard.record_result('baidu', [], first_page=False)
+    assert guard.available('baidu')
+    assert guard.get_stats()["搜索引擎"]["baidu"]["连续失败"] == 0
+
+
+def test_blocked_page_raises_and_trips():
+    limiter = FakeLimiter([FakeResponse(url='https://wappass.baidu.com/captcha')] * 2)
+    guard = make_guard(limiter)
+    for _ in range(2):
+        with pytest.raises(EngineBlocked) as error:
+            guard.get('baidu', 'https://image.baidu.com/search/acjson')
+        guard.record_failure('baidu', error.value)
+    assert not guard.available('baidu')
+
+
+def test_retry_then_success():
+    limiter = FakeLimiter([FakeResponse(503), FakeResponse(200)])
+    guard = make_guard(limiter)
+    assert guard.get('baidu', 'https://image.baidu.com/search/acjson').status_code == 200
+    assert limiter.calls == 2
+    assert guard.get_stats()["重试次数"] == 1
+
+
+def test_half_open_lets_one_probe_through():
+    gate = threading.Event()
+    limiter = FakeLimiter(gate=gate)
+    guard = make_guard(limiter)
+    trip(guard)
+    time.sleep(0.06)
+    assert guard.get_stats()["搜索引擎"]["baidu"]["状态"] == "半开"
+
+    results = []
+
+    def request():
+        guard.get('baidu', 'https://image.baidu.com/search/acjson')
+        guard.record_result('baidu', ['image'])
+        results.append(threading.get_ident())
+
+    threads = [threading.Thread(target=request) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    # 只有试探请求发出，其他线程在等待
+    assert limiter.calls == 1
+
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(results) == 3
+    assert limiter.calls == 3
+    assert guard.get_stats()["搜索引擎"]["baidu"]["状态"] == "正常"
+
+
+def test_failed_probe_reopens_and_waiters_give_up():
+    gate = threading.Event()
+    limiter = FakeLimiter(gate=gate)
+    guard = make_guard(limiter, cooldown=0.05, max_cooldown=10)
+    trip(guard)
+    time.sleep(0.06)
+
+    errors = []
+
+    def probe():
+        guard.get('baidu', 'https://image.baidu.com/search/acjson')
+        guard.record_result('baidu', [])
+
+    def waiter():
+        try:
+            guard.get('baidu', 'https://image.baidu.com/search/acjson')
+        except EngineUnavailable as e:
+            errors.append(e)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    time.sleep(0.05)
+    waiting = threading.Thread(target=waiter)
+    waiting.start()
+    time.sleep(0.05)
+
+    gate.set()
+    prober.join(5)
+    waiting.join(5)
+    assert len(errors) == 1
+    assert limiter.calls == 1
+    assert guard.get_stats()["搜索引擎"]["baidu"]["熔断次数"] == 2
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""shared_db 的测试：同一进程和不同进程之间的锁文件互斥"""
+
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+import shared_db
+from shared_db import FileLock
+
+
+def test_locks_on_same_database_share_one_file(tmp_path):
+    first = FileLock(tmp_path / "a.db")
+    second = FileLock(tmp_path / "a.db")
+    assert first._file is second._file
+    assert first._thread_lock is second._thread_lock
+    assert FileLock(tmp_path / "b.db")._file is not first._file
+
+
+def test_locks_on_same_database_exclude_each_other(tmp_path):
+    first = FileLock(tmp_path / "a.db")
+    second = FileLock(tmp_path / "a.db")
+    entered = threading.Event()
+
+    def hold_second():
+        with second:
+            entered.set()
+
+    with first:
+        thread = threading.Thread(target=hold_second)
+        thread.start()
+        assert not entered.wait(0.2)
+    thread.join(5)
+    assert entered.is_set()
+
+
+def hold_lock(path, ready, release):
+    with FileLock(path):
+        ready.set()
+        release.wait(10)
+
+
+@pytest.mark.skipif(shared_db.fcntl is None, reason="需要 fcntl")
+def test_lock_excludes_other_process(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    ready, release = context.Event(), context.Event()
+    process = context.Process(target=hold_lock, args=(tmp_path / "a.db", ready, release))
+    process.start()
+    try:
+        assert ready.wait(30)
+        lock_file = open(tmp_path / "a.db.lock", 'a')
+        with pytest.raises(OSError):
+            shared_db.fcntl.lockf(lock_file, shared_db.fcntl.LOCK_EX | shared_db.fcntl.LOCK_NB)
+        lock_file.close()
+
+        # 本进程另外打开、关闭同一个锁文件后，FileLock 仍能等到对方释放后加锁
+        release.set()
+        start = time.time()
+        with FileLock(tmp_path / "a.db"):
+            assert time.time() - start < 10
+    finally:
+        release.set()
+        process.join(10)
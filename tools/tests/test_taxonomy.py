@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""taxonomy 的测试：按名称加载 taxonomies/ 中的分类表"""
+
+from taxonomy import Taxonomy
+
+
+def test_load_by_name_ignores_same_named_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "animal").mkdir()
+    taxonomy = Taxonomy.load("animal")
+    assert taxonomy.categories
+    assert taxonomy.default in taxonomy.categories
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""term_classifier 的测试：自动机分类结果与逐词查找（naive_classify）一致"""
+
+import random
+
+import pytest
+
+from term_classifier import TermClassifier, naive_classify, synthetic_rules, synthetic_texts
+
+RULES = [
+    ("猫科", ["猫", "狮子", "Tiger"]),
+    ("犬科", ["狗", "狼"]),
+    ("鸟类", ["鸟", "老鹰"]),
+    ("猫科", ["豹"]),
+]
+
+
+@pytest.mark.parametrize("texts, expected", [
+    (("一只小猫",), "猫科"),
+    (("WHITE TIGER",), "猫科"),
+    (("狼和狗",), "犬科"),
+    # 多个分类同时命中时取排在前面的规则
+    (("老鹰抓狗",), "犬科"),
+    (("雪豹",), "猫科"),
+    (("", "老鹰"), "鸟类"),
+    (("大象", None), "其他"),
+])
+def test_classify_examples(texts, expected):
+    classifier = TermClassifier(RULES, "其他")
+    assert classifier.classify(*texts) == expected
+    assert naive_classify(RULES, "其他", *texts) == expected
+
+
+def test_overlapping_terms_follow_priority():
+    # 低优先级的词是高优先级词的一部分，或出现在失配指针上
+    rules = [("长", ["abcd"]), ("短", ["bc"]), ("后缀", ["cde"])]
+    classifier = TermClassifier(rules, "无")
+    for text in ["abcd", "xbcx", "abcde", "abce", "cde", "aabcd", "ab"]:
+        assert classifier.classify(text) == naive_classify(rules, "无", text)
+
+
+def test_empty_terms_are_ignored():
+    classifier = TermClassifier([("空", [""]), ("猫科", ["猫"])], "其他")
+    assert classifier.term_count == 1
+    assert classifier.classify("狗") == "其他"
+    assert classifier.classify("猫") == "猫科"
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_matches_naive_on_synthetic_rules(seed):
+    rng = random.Random(seed)
+    rules = synthetic_rules(40, 25, rng)
+    texts = synthetic_texts(rules, 500, rng)
+    classifier = TermClassifier(rules, "其他")
+    for title, keyword in zip(texts, reversed(texts)):
+        assert classifier.classify(title, keyword) == naive_classify(rules, "其他", title, keyword)
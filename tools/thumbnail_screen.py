@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缩略图筛选
+下载原图前先取搜索结果中的缩略图，计算感知哈希并检查尺寸比例，
+重复或不合格的候选只花费几KB的缩略图流量，不再下载原图
+"""
+
+import io
+import logging
+import threading
+
+from PIL import Image
+
+from image_ingest import DEFAULT_MAX_ASPECT
+from perceptual_index import image_dhash
+
+# 拒绝原因
+REASON_DUPLICATE = "近似重复"
+REASON_TOO_SMALL = "尺寸过小"
+REASON_BAD_ASPECT = "比例异常"
+
+
+class ThumbnailScreener:
+    """缩略图筛选类（线程安全）"""
+
+    def __init__(self, session, limiter, ledger, phash_index, min_side=60, max_aspect=DEFAULT_MAX_ASPECT):
+        """
+        min_side 为缩略图短边的最小像素数（过小的多为图标）；
+        max_aspect 为长边与短边之比的上限（过大的多为横幅或长截图），默认与入库校验相同，
+        缩略图筛选不会拒绝入库校验能够通过的图片
+        """
+        self.session = session
+        self.limiter = limiter
+        self.ledger = ledger
+        self.phash_index = phash_index
+        self.min_side = min_side
+        self.max_aspect = max_aspect
+
+        self.screened = 0
+        self.passed = 0
+        self.thumb_bytes = 0
+        self.rejections = {}
+        self._lock = threading.Lock()
+
+    def screen(self, thumb_url, url, save_dir):
+        """
+        用缩略图判断是否值得下载原图，返回 True 表示继续下载
+
+        缩略图请求失败或无法解码时不做判断，直接放行；被拒绝的URL记入下载记录，下次不再处理
+        """
+        try:
+            response = self.limiter.get(self.session, thumb_url, timeout=15)
+            response.raise_for_status()
+            data = response.content
+        except Exception as e:
+            logging.debug(f"缩略图获取失败，直接下载原图 {thumb_url}: {e}")
+            return True
+
+        reason, similar = self._check(data, save_dir)
+        with self._lock:
+            self.screened += 1
+            self.thumb_bytes += len(data)
+            if reason is None:
+                self.passed += 1
+            else:
+                self.rejections[reason] = self.rejections.get(reason, 0) + 1
+        if reason is None:
+            return True
+
+        if similar:
+            self.ledger.mark_duplicate(url, similar)
+            logging.info(f"缩略图筛选：近似重复，跳过原图 {url} (相似 {similar})")
+        else:
+            self.ledger.mark_rejected(url)
+            logging.info(f"缩略图筛选：{reason}，跳过原图 {url}")
+        return False
+
+    def _check(self, data, save_dir):
+        """检查缩略图，返回 (拒绝原因或 None, 近似重复的已有图片或 None)"""
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                width, height = image.size
+                value = image_dhash(image)
+        except Exception:
+            # 缩略图格式无法识别时不做判断，交给原图下载后的检查
+            return None, None
+
+        short_side, long_side = sorted((width, height))
+        if short_side < self.min_side:
+            return REASON_TOO_SMALL, None
+        if long_side / short_side > self.max_aspect:
+            return REASON_BAD_ASPECT, None
+
+        similar = self.phash_index.find_in_dir(value, save_dir)
+        if similar:
+            return REASON_DUPLICATE, similar
+        return None, None
+
+    def get_stats(self):
+        """获取筛选统计"""
+        with self._lock:
+            return {
+                "筛选": self.screened,
+                "通过": self.passed,
+                "拒绝原因": dict(self.rejections),
+                "缩略图流量(KB)": round(self.thumb_bytes / 1024, 1),
+            }